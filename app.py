@@ -4,14 +4,29 @@ from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, current_user
 
 from control import transcription_bp
+from commands import analytics_cli, models_cli, audio_cli, jobs_cli, server_cli
 from config import Config
 from backend.src.database import db
 from routes import auth_blueprint
+import cpu_scheduler
+import compiled_models
+import summary_cache
 
 # Factory function to create the Flask app
-def create_app():
+def create_app(config_overrides=None):
     app = Flask(__name__, template_folder='frontend/src/templates', static_folder='frontend/src/static')
     app.config.from_object(Config)
+    app.config.update(config_overrides or {})  # E.g. a separate database for the load test
+
+    # Share the cores among the server processes and their pipelines instead of every pipeline using all of them
+    cpu_scheduler.configure_app_process(app.config)
+
+    # Load the compiled graphs of the models instead of running them eagerly, see `flask models compile`
+    if app.config.get("USE_COMPILED_MODELS"):
+        compiled_models.enable(app.config.get("COMPILED_MODELS_DIR"))
+
+    # Share the cached titles and summaries between the processes and across restarts
+    summary_cache.configure(app.config.get("SUMMARY_CACHE_PATH") or None, app.config.get("SUMMARY_CACHE_MAX_BYTES"))
 
     # Initialize extensions
     db.init_app(app)  # Initializes the database extension (Ensure `db` is properly defined in `src.database`)
@@ -32,6 +47,13 @@ def create_app():
     app.register_blueprint(transcription_bp)  # Ensure `transcription_bp` is correctly defined in `transcription_control`
     app.register_blueprint(auth_blueprint)  # Ensure `auth_blueprint` is correctly defined in `auth.routes`
 
+    # Register CLI commands
+    app.cli.add_command(analytics_cli)  # Maintenance of the analytics, e.g. `flask analytics recompute`
+    app.cli.add_command(models_cli)  # Evaluation of the AI models, e.g. `flask models benchmark-profiles`
+    app.cli.add_command(audio_cli)  # Maintenance of the stored audio files, e.g. `flask audio migrate-codec`
+    app.cli.add_command(jobs_cli)  # Workers of the transcription job queue, e.g. `flask jobs work`
+    app.cli.add_command(server_cli)  # Capacity tests of the web server, e.g. `flask server load-test`
+
     return app
 
 # Create the app
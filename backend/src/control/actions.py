@@ -1,28 +1,67 @@
 import os
+from datetime import datetime
+from contextlib import nullcontext
 from sqlite3 import IntegrityError
 from analytics import Analytics
-from models import AudioTranscription
+from transcriber import Model
+from profiles import get_profile
+from models import AudioTranscription, AnalyticsArtifact, TranscriptionJob, UserUsage, UserDailyUsage
 import utils.utils as utils
-from pydub import AudioSegment
+import audio_loader
+from flask import current_app
+from sqlalchemy import exc, update
+from singleflight import SingleFlight
+import search_index
+import profiling
+import cancellation
+import cancellation_requests
 from backend.src.database import db
 
 # Path to the stored raw audio files and transcriptions
 AUDIO_FOLDER = "src/static/output/raw_audio/"
 TRANSCRIPTION_FOLDER = "src/static/output/transcription/"
 
+# Persisted analytics artifacts with the AudioTranscription column they are stored in and the Analytics method
+# which generates them
+ARTIFACT_STAGES = {
+    "speed_graphics": ("speech_speed_graphic_path", Analytics.generate_plot_wpm),
+    "pitch_graphics": ("pitch_graphic_path", Analytics.analyze_pitch),
+    "energy_graphics": ("energy_graphic_path", Analytics.analyze_energy),
+    "improved_text": ("improved_text_path", Analytics.improve_text),
+    "title": ("title", Analytics.get_title),
+    "summary": ("summary", Analytics.get_summary),
+}
+
+# Expensive artifacts which are only generated on first access through /get-analytics in the lazy analytics mode
+LAZY_ARTIFACTS = ("pitch_graphics", "energy_graphics", "improved_text", "summary")
+
+# Deduplicates the lazy generation of artifacts when several viewers request the same recording concurrently
+_lazy_artifact_flights = SingleFlight()
+
 class UnauthorizedUserException(Exception):
     """
     Custom exception when unauthorized user tries to access database
     """
     pass
 
+def get_chart_params():
+    """
+    Returns the format and resolution of the graphics configured for the app, as keyword arguments of `Analytics`
+    and `Analytics.get_artifact_fingerprint`.
+    """
+    return {"chart_format": current_app.config.get("CHART_FORMAT", Analytics.CHART_FORMAT),
+            "chart_dpi": current_app.config.get("CHART_DPI", Analytics.CHART_DPI)}
+
 def store_audio(file):
     """
     Return a unique filename under which the audio file is stored.
 
-    If the file object contains a name, extract it and check the database if the name is already used.
-    If so, append a (1), (2), ... to the filename so it is unique.
+    If the file object contains a name, extract it and check the database if the name is already used by a
+    recording or by a queued or running job, whose recording is not saved yet.
+    If so, append a (1), (2), ... to the filename so it is unique. The file is created exclusively, so uploads of
+    the same name stored at the same time, e.g. in a batch or by several processes, do not overwrite each other.
     If no name is provided, generate a proprietary filename including the current timestamp with the utils file.
+    The audio is stored with the codec configured in `AUDIO_STORAGE_CODEC`, converting it if needed.
 
     Args:
         file (werkzeug.datastructures.FileStorage): audio file name inserted by the user
@@ -40,35 +79,57 @@ def store_audio(file):
     # Base filename and extension
     base_name, extension = filename.rsplit('.', 1) if '.' in filename else (filename, '')
 
+    # Extension of the codec the recording is stored with
+    codec_name = current_app.config.get("AUDIO_STORAGE_CODEC", "wav")
+    storage_extension = audio_loader.get_codec(codec_name)["extension"]
+
+    def is_name_taken(name):
+        # The output files are named after the recording without extension, so a name is taken in every codec
+        paths = [os.path.join(AUDIO_FOLDER, f"{name}.{codec['extension']}") for codec in audio_loader.AUDIO_CODECS.values()]
+        return (db.session.query(AudioTranscription).filter(AudioTranscription.audio_path.in_(paths)).first()
+                or db.session.query(TranscriptionJob).filter(TranscriptionJob.audio_path.in_(paths),
+                                                             TranscriptionJob.status.in_(("queued", "running"))).first())
+
+    def reserve(path):
+        # Creates the empty file, unless another upload stored or reserved it in the meantime
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
     # Ensure unique filename
     unique_filename = filename
-    audio_filepath = os.path.join(AUDIO_FOLDER, f"{unique_filename}.wav")
     counter = 1
-    try:
-        while db.session.query(AudioTranscription).filter_by(audio_path=audio_filepath).first():
-            unique_filename = f"{base_name}({counter}){'.' + extension if extension else ''}"
-            audio_filepath = os.path.join(AUDIO_FOLDER, f"{unique_filename}.wav")
-            counter += 1
-    except Exception as e:
-        raise IOError(f"Database query failed: {e}")
+    while True:
+        try:
+            name_taken = is_name_taken(unique_filename)
+        except Exception as e:
+            raise IOError(f"Database query failed: {e}")
+        audio_filepath = os.path.join(AUDIO_FOLDER, f"{unique_filename}.{storage_extension}")
+        if not name_taken and reserve(audio_filepath):
+            break
+        unique_filename = f"{base_name}({counter}){'.' + extension if extension else ''}"
+        counter += 1
 
     # Save temporary file
-    temp_filepath = os.path.join(AUDIO_FOLDER, f"temp_{unique_filename}.wav")
+    temp_filepath = os.path.join(AUDIO_FOLDER, f"temp_{unique_filename}.{extension or 'upload'}")
     try:
         file.save(temp_filepath)
 
-        # Convert to .wav if needed
-        if extension.lower() not in ['wav']:
-            audio = AudioSegment.from_file(temp_filepath)
-            audio.export(audio_filepath, format="wav")
+        # Convert to the storage codec if needed
+        if extension.lower() != storage_extension:
+            audio_loader.encode_audio(temp_filepath, audio_filepath, codec_name)
             os.remove(temp_filepath)  # Remove the temporary file after conversion
         else:
-            # Rename the temporary file to the final path
-            os.rename(temp_filepath, audio_filepath)
+            # Replace the reserved file with the temporary file
+            os.replace(temp_filepath, audio_filepath)
 
         return audio_filepath
 
     except Exception as e:
+        if os.path.exists(audio_filepath):
+            os.remove(audio_filepath)  # Release the reserved name
         raise IOError(f"Invalid file: {e}")
 
     finally:
@@ -76,17 +137,23 @@ def store_audio(file):
         if os.path.exists(temp_filepath):
             os.remove(temp_filepath)
 
-def transcribe_and_analyse(transcriber, current_user, audio_filepath):
+def transcribe_and_analyse(transcriber, current_user, audio_filepath, profile_name=None):
     """
     Transcribe the audio file, perform analytics on the transcription, and save the results to the database.
 
     This function handles the process of transcribing an audio file, generating various analytics from the transcription,
     and storing the results in the database. It raises appropriate exceptions if any step fails during the process.
 
+    If the `ANALYTICS_MODE` config is "lazy", only the transcription and the cheap metadata (title, speech speed,
+    length, ...) are generated. The artifacts in `LAZY_ARTIFACTS` are left empty and generated by `get_analytics`
+    on first access.
+
     Args:
         transcriber (Transcriber): An instance of the `Transcriber` class that is responsible for transcribing the audio file.
         current_user (User): The authenticated user who requested the transcription and analysis.
         audio_filepath (str): The path to the audio file that needs to be transcribed and analyzed.
+        profile_name (str): The quality profile determining the generated analytics and their decoding settings.
+                            None selects the default profile. The transcriber should be loaded for the same profile.
 
     Returns:
         None
@@ -100,21 +167,92 @@ def transcribe_and_analyse(transcriber, current_user, audio_filepath):
 
     # Transcribe the audio file
     try:
-        transcription_filepath, segments, word_count, language = transcriber.transcribe_raw_audio(audio_filepath)
+        transcription = transcriber.transcribe_raw_audio(audio_filepath)
     except Exception as e:
         raise RuntimeError(f"Failed to transcribe the audio file: {str(e)}")
 
+    analyse_transcription(transcriber, current_user, audio_filepath, transcription, profile_name)
+
+def transcribe_and_analyse_batch(transcriber, current_user, audio_filepaths, profile_name=None):
+    """
+    Transcribe several audio files together, perform analytics on each transcription, and save the results.
+
+    The audio files are transcribed with `Model.transcribe_raw_audio_batch`, which runs Whisper on batches of
+    short clips. The analysis and the stored database entries of each file are the same as in `transcribe_and_analyse`.
+    A failure of one file does not abort the others.
+
+    Args:
+        transcriber (Transcriber): An instance of the `Transcriber` class that is responsible for transcribing the audio files.
+        current_user (User): The authenticated user who requested the transcription and analysis.
+        audio_filepaths (list of str): The paths to the audio files that need to be transcribed and analyzed.
+        profile_name (str): The quality profile of the analysis, see `transcribe_and_analyse`.
+
+    Returns:
+        dict: Maps each audio file path to None on success or to the error message of its failure.
+
+    Raises:
+        RuntimeError: If the batch transcription fails as a whole.
+    """
+    try:
+        transcriptions = transcriber.transcribe_raw_audio_batch(
+            audio_filepaths, batch_size=current_app.config.get("TRANSCRIPTION_BATCH_SIZE", 8))
+    except Exception as e:
+        raise RuntimeError(f"Failed to transcribe the audio files: {str(e)}")
+
+    errors = {}
+    for audio_filepath, transcription in zip(audio_filepaths, transcriptions):
+        try:
+            if isinstance(transcription, Exception):
+                raise RuntimeError(f"Failed to transcribe the audio file: {str(transcription)}")
+            analyse_transcription(transcriber, current_user, audio_filepath, transcription, profile_name)
+            errors[audio_filepath] = None
+        except Exception as e:
+            errors[audio_filepath] = str(e)
+
+    return errors
+
+def analyse_transcription(transcriber, current_user, audio_filepath, transcription, profile_name=None):
+    """
+    Perform analytics on the transcription of an audio file and save the results to the database.
+
+    Args:
+        transcriber (Transcriber): An instance of the `Transcriber` class which transcribed the audio file.
+        current_user (User): The authenticated user who requested the transcription and analysis.
+        audio_filepath (str): The path to the transcribed audio file.
+        transcription (tuple): The transcription as returned by `Model.transcribe_raw_audio`.
+        profile_name (str): The quality profile of the analysis, see `transcribe_and_analyse`.
+
+    Returns:
+        None
+
+    Raises:
+        RuntimeError: If analytics generation fails, or any unexpected error occurs during the process.
+    """
+    transcription_filepath, segments, word_count, language = transcription
+
+    # Persist the segments so the analytics can be regenerated later without transcribing again
+    try:
+        segments_filepath = transcriber.save_segments_to_file(segments, audio_filepath)
+    except Exception as e:
+        raise RuntimeError(f"Failed to save the transcription segments: {str(e)}")
+
     # Create a new analytics object and process the data
-    analytics = Analytics(audio_filepath, transcription_filepath, segments, word_count, language)
+    profile_name = profile_name or current_app.config.get("QUALITY_PROFILE")
+    profile = get_profile(profile_name)
+    analytics = Analytics(audio_filepath, transcription_filepath, segments, word_count, language,
+                          bart_num_beams=profile["bart_num_beams"], **get_chart_params())
+    lazy = current_app.config.get("ANALYTICS_MODE") == "lazy"
+    artifacts = [artifact for artifact in ARTIFACT_STAGES
+                 if artifact in profile["stages"] and not (lazy and artifact in LAZY_ARTIFACTS)]
 
     try:
-        # Generate all analytics and gather the required data
+        # Generate the analytics of the profile, the expensive ones are deferred in lazy mode
         speech_speed_graphic_path = analytics.generate_plot_wpm()
         title, language, audio_length, created_at, word_count = analytics.get_general_info()
-        summary = analytics.get_summary()
-        pitch_graphic_path = analytics.analyze_pitch()
-        energy_graphic_path = analytics.analyze_energy()
-        improved_text_path = analytics.improve_text()
+        summary = analytics.get_summary() if "summary" in artifacts else None
+        pitch_graphic_path = analytics.analyze_pitch() if "pitch_graphics" in artifacts else None
+        energy_graphic_path = analytics.analyze_energy() if "energy_graphics" in artifacts else None
+        improved_text_path = analytics.improve_text() if "improved_text" in artifacts else None
     except RuntimeError as e:
         raise RuntimeError(f"Failed to generate analytics: {str(e)}")
     except Exception as e:
@@ -135,12 +273,18 @@ def transcribe_and_analyse(transcriber, current_user, audio_filepath):
         "audio_length": audio_length,
         "word_count": word_count,
         "summary": summary,
+        "segments_filepath": segments_filepath,
+        "artifacts": artifacts,
+        "profile": profile_name,
     }
 
+    # A cancelled pipeline stops before its recording is saved, saved recordings are removed by `cleanup` instead.
+    # The database is checked as well, for a cancellation requested by another process since its last poll.
+    cancellation_requests.check()
+
     # Save data to the database
     try:
-        save_info_to_database(audio_data)
-        return
+        audio_recording = save_info_to_database(audio_data)
     except IntegrityError as e:
         raise RuntimeError(f"Error: {str(e)}") # Error during data upload to database
     except UnauthorizedUserException:
@@ -148,6 +292,42 @@ def transcribe_and_analyse(transcriber, current_user, audio_filepath):
     except Exception as e:
         raise RuntimeError(f"Failed to save audio data to the database: {str(e)}")
 
+    # Index the segments for the full-text search over the user's recordings
+    try:
+        search_index.index_recording(audio_recording.id, audio_recording.user_id, segments)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise RuntimeError(f"Failed to index the transcription for search: {str(e)}")
+
+def _ensure_usage_rows(user_id, languages):
+    """
+    Creates the missing usage rows of a user's languages in their own transaction, so the transaction saving or
+    deleting a recording only increments existing rows, which is atomic across processes. The session must not
+    hold pending changes. An empty row left behind by a failed save counts nothing.
+    """
+    for language in languages:
+        if db.session.get(UserUsage, (user_id, language)) is None:
+            try:
+                db.session.add(UserUsage(user_id=user_id, language=language))
+                db.session.commit()
+            except exc.IntegrityError:
+                db.session.rollback()  # Created by a concurrent request meanwhile
+
+def _add_usage(user_id, language, recording_count, audio_seconds, word_count):
+    """
+    Adds to the usage totals of a user's language within the current transaction. The row must exist, see
+    `_ensure_usage_rows`.
+    """
+    db.session.execute(
+        update(UserUsage)
+        .where(UserUsage.user_id == user_id, UserUsage.language == language)
+        .values(recording_count=UserUsage.recording_count + recording_count,
+                audio_seconds=UserUsage.audio_seconds + audio_seconds,
+                word_count=UserUsage.word_count + word_count)
+        .execution_options(synchronize_session=False)
+    )
+
 def save_info_to_database(audio_data):
     """
     Save audio transcription and analysis information to the database.
@@ -172,9 +352,15 @@ def save_info_to_database(audio_data):
             - audio_length (float): The length of the audio in seconds.
             - word_count (int): The word count of the transcription.
             - summary (str): AI-generated summary of the transcription.
+            - segments_filepath (str): Path to the persisted transcription segments.
+            - artifacts (list of str): Names of the analytics artifacts which were generated.
+            - profile (str): Name of the quality profile the recording was analyzed with.
+
+    The usage totals of the user (see `get_usage`) are updated in the same transaction. Failed and cancelled jobs of
+    the user, whose uploads were not saved as recordings, are deleted with their audio files as well.
 
     Returns:
-        None
+        AudioTranscription: The saved database entry.
 
     Raises:
         UnauthorizedUserException: If the user is not authenticated.
@@ -187,6 +373,9 @@ def save_info_to_database(audio_data):
     if not current_user.is_authenticated:
         raise UnauthorizedUserException() # If the user is not authenticated, raise an error
 
+    usage_language = audio_data["language"] or ""
+    _ensure_usage_rows(current_user.id, [usage_language])
+
     # Create a new AudioTranscription object with the given data
     audio_recording = AudioTranscription(
         user_id=current_user.id,  # Associate the recording with the user's ID
@@ -201,15 +390,25 @@ def save_info_to_database(audio_data):
         language=audio_data["language"],  # Language of the audio and transcription
         audio_length=audio_data["audio_length"],  # Length of the transcription in seconds
         word_count=audio_data["word_count"],  # Number of words in the respective transcription
-        summary=audio_data["summary"]  # AI-generated summary of the transcription.
+        summary=audio_data["summary"],  # AI-generated summary of the transcription.
+        segments_path=audio_data["segments_filepath"],  # Path to the persisted transcription segments
+        profile=audio_data["profile"]  # Quality profile the recording was analyzed with
     )
 
+    # Record the version and parameters with which each analytics artifact was generated
+    bart_num_beams = get_profile(audio_data["profile"])["bart_num_beams"]
+    chart_params = get_chart_params()
+    for artifact in audio_data["artifacts"]:
+        version, params_hash = Analytics.get_artifact_fingerprint(artifact, bart_num_beams, **chart_params)
+        audio_recording.artifacts.append(AnalyticsArtifact(artifact=artifact, version=version, params_hash=params_hash))
+
     try:
         # Add the new record to the database session
         db.session.add(audio_recording)
+        _add_usage(current_user.id, usage_language, 1, audio_data["audio_length"] or 0.0, audio_data["word_count"] or 0)
         # Commit the changes to save the record in the database and return
         db.session.commit()
-        return
+        return audio_recording
     except IntegrityError:
         # If any exception happens during the update of the database, raise an error
         db.session.rollback()
@@ -219,6 +418,9 @@ def cleanup(current_user, audio_filepath=None):
     """
     Delete audio files either for a specific file (if `audio_filepath` is provided) or for all files of a user.
 
+    The usage totals of the user (see `get_usage`) are updated in the same transaction. Failed and cancelled jobs of
+    the user, whose uploads were not saved as recordings, are deleted with their audio files as well.
+
     Args:
         current_user (User): The user requesting to delete the files.
         audio_filepath (str, optional): Path to a specific audio file to delete. If None, delete all files for the user.
@@ -248,10 +450,10 @@ def cleanup(current_user, audio_filepath=None):
                     'improved_text_path',
                     'energy_graphic_path',
                     'pitch_graphic_path',
-                    'improved_text_path'
+                    'segments_path'
                 ]:
                     file_path = getattr(file, attribute, None)
-                    if os.path.isfile(file_path):
+                    if file_path and os.path.isfile(file_path):
                         os.remove(file_path)
         except Exception as cleanup_error:
             raise RuntimeError(f"Error during cleanup of files: {str(cleanup_error)}")
@@ -261,16 +463,45 @@ def cleanup(current_user, audio_filepath=None):
         if audio_filepath:
             # Query for a specific audio file for the current user
             files_to_delete = AudioTranscription.query.filter_by(audio_path=audio_filepath, user_id=current_user.id).all()
-            # Delete the specific file(s)
-            db.session.query(AudioTranscription).filter_by(audio_path=audio_filepath, user_id=current_user.id).delete()
         else:
             # Query for all files belonging to the current user
             files_to_delete = AudioTranscription.query.filter_by(user_id=current_user.id).all()
-            # Delete all user files
-            db.session.query(AudioTranscription).filter_by(user_id=current_user.id).delete()
+
+        # Query for the jobs of the user which ended without a recording, but not for simulated jobs
+        from job_queue import TRANSCRIPTION_QUEUE  # Imported here, as the job queue uses the actions
+        unfinished_jobs = TranscriptionJob.query.filter(TranscriptionJob.user_id == current_user.id,
+                                                        TranscriptionJob.queue == TRANSCRIPTION_QUEUE,
+                                                        TranscriptionJob.status.in_(("failed", "cancelled")))
+        if audio_filepath:
+            unfinished_jobs = unfinished_jobs.filter(TranscriptionJob.audio_path == audio_filepath)
+        unfinished_jobs = unfinished_jobs.all()
+
+        _ensure_usage_rows(current_user.id, {file.language or "" for file in files_to_delete})
+
+        # Remove the recordings from the full-text search index. It is removed before the usage totals are
+        # updated, because a process creates the index on its own connection on first use, which would wait for
+        # the write lock of the uncommitted updates on SQLite.
+        recording_ids = [file.id for file in files_to_delete]
+        search_index.remove_recordings(recording_ids)
+
+        # Subtract the recordings from the usage totals of their languages. Rows dropping to zero are kept, as a
+        # concurrent save may have ensured the row and increments it after this commit; `get_usage` skips them.
+        for file in files_to_delete:
+            _add_usage(current_user.id, file.language or "", -1, -(file.audio_length or 0.0), -(file.word_count or 0))
+
+        # Delete the artifact records and finished jobs before the recordings they reference
+        db.session.query(AnalyticsArtifact).filter(AnalyticsArtifact.recording_id.in_(recording_ids)).delete()
+        db.session.query(TranscriptionJob).filter(TranscriptionJob.recording_id.in_(recording_ids)).delete()
+        db.session.query(TranscriptionJob).filter(
+            TranscriptionJob.id.in_([job.id for job in unfinished_jobs])).delete(synchronize_session=False)
+        # Delete the specific file(s) or all user files
+        db.session.query(AudioTranscription).filter(AudioTranscription.id.in_(recording_ids)).delete()
 
         # Delete the files from the local filesystem
         cleanup_filesystem(files_to_delete)
+        for job in unfinished_jobs:
+            discard_audio(job.audio_path)
+        profiling.remove_profiles(recording_ids)
 
         # Commit the database changes
         db.session.commit()
@@ -280,6 +511,361 @@ def cleanup(current_user, audio_filepath=None):
         db.session.rollback()
         raise IntegrityError(f"Failed to update database: {str(e)}")
 
+def get_stale_artifacts(recording):
+    """
+    Determine which analytics artifacts of a recording were generated with an outdated version or parameters.
+
+    Artifacts without a stored fingerprint (e.g. recordings created before artifacts were versioned) are stale.
+    Only the artifacts of the recording's quality profile are considered.
+
+    Args:
+        recording (AudioTranscription): The recording to check.
+
+    Returns:
+        list of str: The names of the stale artifacts.
+    """
+    stored_artifacts = {artifact.artifact: artifact for artifact in recording.artifacts}
+    stale_artifacts = []
+    profile = get_profile(recording.profile)
+    chart_params = get_chart_params()
+
+    for artifact in ARTIFACT_STAGES:
+        if artifact not in profile["stages"]:
+            continue
+
+        version, params_hash = Analytics.get_artifact_fingerprint(artifact, profile["bart_num_beams"], **chart_params)
+        stored_artifact = stored_artifacts.get(artifact)
+        if stored_artifact is None or stored_artifact.version != version or stored_artifact.params_hash != params_hash:
+            stale_artifacts.append(artifact)
+
+    return stale_artifacts
+
+def recompute_artifacts(recording, artifacts):
+    """
+    Regenerate the given analytics artifacts of a recording from its persisted inputs and update the database.
+
+    The audio file, transcription and persisted segments are reused, so the recording is not transcribed again
+    and all artifacts which are not listed are left untouched. The speech speed graphic requires the persisted
+    segments and is skipped for recordings which do not have them. A file of an artifact which is stored under a
+    new path, e.g. after `CHART_FORMAT` changed, replaces the previous file, which is removed after the commit.
+
+    Args:
+        recording (AudioTranscription): The recording whose artifacts shall be regenerated.
+        artifacts (list of str): The names of the artifacts to regenerate.
+
+    Returns:
+        list of str: The names of the artifacts which were regenerated.
+
+    Raises:
+        RuntimeError: If an artifact cannot be regenerated or the database update fails.
+    """
+    artifacts = [artifact for artifact in artifacts if artifact != "speed_graphics" or recording.segments_path]
+    if not artifacts:
+        return []
+
+    try:
+        profile = get_profile(recording.profile)
+        chart_params = get_chart_params()
+        segments = Model.load_segments_from_file(recording.segments_path) if recording.segments_path else []
+        analytics = Analytics(recording.audio_path, recording.transcription_path, segments,
+                              recording.word_count, recording.language, bart_num_beams=profile["bart_num_beams"],
+                              **chart_params)
+
+        # Without usable content the pitch and energy plots show a placeholder, as during the initial analysis
+        if recording.segments_path:
+            analytics.no_recording_content = not analytics.calculate_wpm()
+        else:
+            analytics.no_recording_content = not recording.word_count
+
+        stored_artifacts = {artifact.artifact: artifact for artifact in recording.artifacts}
+        replaced_paths = []
+        for artifact in artifacts:
+            column, generate = ARTIFACT_STAGES[artifact]
+            previous_value = getattr(recording, column)
+            setattr(recording, column, generate(analytics))
+            if column.endswith("_path") and previous_value and previous_value != getattr(recording, column):
+                replaced_paths.append(previous_value)
+
+            # Store the fingerprint of the regenerated artifact
+            version, params_hash = Analytics.get_artifact_fingerprint(artifact, profile["bart_num_beams"],
+                                                                      **chart_params)
+            stored_artifact = stored_artifacts.get(artifact)
+            if stored_artifact is None:
+                recording.artifacts.append(AnalyticsArtifact(artifact=artifact, version=version, params_hash=params_hash))
+            else:
+                stored_artifact.version = version
+                stored_artifact.params_hash = params_hash
+                stored_artifact.generated_at = datetime.now()
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise RuntimeError(f"Failed to recompute analytics of {recording.audio_path}: {str(e)}")
+
+    # Remove the files of the previous paths only once the new paths are stored
+    for path in replaced_paths:
+        if os.path.isfile(path):
+            os.remove(path)
+    return artifacts
+
+def convert_recording_codec(recording, codec_name):
+    """
+    Re-encode the stored audio file of a recording with another storage codec and update its path in the database.
+
+    The output files are named after the recording without extension, so only the audio file changes. The old
+    audio file is removed after the new path was committed.
+
+    Args:
+        recording (AudioTranscription): The recording whose audio file shall be converted.
+        codec_name (str): The name of the target codec, one of `audio_loader.AUDIO_CODECS`.
+
+    Returns:
+        str: The path of the converted audio file, or None if the audio file already uses the codec.
+
+    Raises:
+        ValueError: If the codec is not supported.
+        RuntimeError: If the conversion or the database update fails.
+    """
+    extension = audio_loader.get_codec(codec_name)["extension"]
+    old_filepath = recording.audio_path
+    new_filepath = f"{os.path.splitext(old_filepath)[0]}.{extension}"
+    if new_filepath == old_filepath:
+        return None
+
+    try:
+        audio_loader.encode_audio(old_filepath, new_filepath, codec_name)
+        recording.audio_path = new_filepath
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if os.path.isfile(new_filepath):
+            os.remove(new_filepath)
+        raise RuntimeError(f"Failed to convert {old_filepath} to {codec_name}: {str(e)}")
+
+    os.remove(old_filepath)
+    return new_filepath
+
+def get_user_recording(current_user, audio_filepath):
+    """
+    Returns the recording of the authenticated user stored under an audio file path.
+
+    Args:
+        current_user (User): The authenticated user.
+        audio_filepath (str): The path to the audio file of the recording.
+
+    Returns:
+        AudioTranscription: The recording.
+
+    Raises:
+        UnauthorizedUserException: If the user has no recording with this audio file.
+    """
+    recording = AudioTranscription.query.filter_by(audio_path=audio_filepath, user_id=current_user.id).first()
+    if recording is None:
+        raise UnauthorizedUserException(f"No recording {audio_filepath} found for the current user.")
+    return recording
+
+def get_daily_audio_seconds(current_user):
+    """
+    Returns the seconds of audio the user uploaded today, counted against the daily quota.
+
+    The seconds are read from the user's daily ledger, see `add_daily_audio_seconds`, so deleted recordings stay
+    counted and admitted uploads are counted before their recordings are saved.
+
+    Args:
+        current_user (User): The authenticated user.
+
+    Returns:
+        float: The total length of today's admitted uploads of the user.
+    """
+    daily_usage = db.session.get(UserDailyUsage, (current_user.id, datetime.now().date()))
+    return daily_usage.audio_seconds if daily_usage is not None else 0.0
+
+def add_daily_audio_seconds(current_user, audio_seconds, commit=True):
+    """
+    Adds the audio seconds of an admitted or queued upload to the user's ledger of today. The ledger is never
+    decremented. The session must not hold pending changes.
+
+    Args:
+        current_user (User): The authenticated user.
+        audio_seconds (float): The duration of the uploaded audio.
+        commit (bool): Whether the increment is committed. Defaults to True. Otherwise it is committed or rolled
+                       back with the caller's transaction, e.g. together with the queued job of the upload.
+    """
+    today = datetime.now().date()
+    # Create the row of the day in its own transaction, so the increment is atomic across processes
+    if db.session.get(UserDailyUsage, (current_user.id, today)) is None:
+        try:
+            db.session.add(UserDailyUsage(user_id=current_user.id, day=today))
+            db.session.commit()
+        except exc.IntegrityError:
+            db.session.rollback()  # Created by a concurrent request meanwhile
+
+    db.session.execute(
+        update(UserDailyUsage)
+        .where(UserDailyUsage.user_id == current_user.id, UserDailyUsage.day == today)
+        .values(audio_seconds=UserDailyUsage.audio_seconds + audio_seconds)
+        .execution_options(synchronize_session=False)
+    )
+    if commit:
+        db.session.commit()
+
+def get_usage(current_user):
+    """
+    Returns the usage overview of the user from their usage totals, without reading their recordings.
+
+    Args:
+        current_user (User): The authenticated user.
+
+    Returns:
+        dict: The total number of "recordings", "audio_minutes" and "words", the "average_wpm" (words per minute of
+              audio over all recordings, None without audio) and per language, most recorded first, the
+              "languages" with their "language" (None if not detected), "recordings", "audio_minutes" and "words".
+    """
+    rows = (UserUsage.query.filter_by(user_id=current_user.id)
+            .order_by(UserUsage.audio_seconds.desc(), UserUsage.language).all())
+
+    audio_seconds = sum(row.audio_seconds for row in rows)
+    word_count = sum(row.word_count for row in rows)
+    return {
+        "recordings": sum(row.recording_count for row in rows),
+        "audio_minutes": audio_seconds / 60,
+        "words": word_count,
+        "average_wpm": word_count / (audio_seconds / 60) if audio_seconds > 0 else None,
+        "languages": [{
+            "language": row.language or None,
+            "recordings": row.recording_count,
+            "audio_minutes": row.audio_seconds / 60,
+            "words": row.word_count,
+        } for row in rows if row.recording_count > 0],
+    }
+
+def rebuild_usage():
+    """
+    Recomputes the usage totals of all users from their recordings, e.g. for recordings stored before the totals
+    were maintained.
+
+    Returns:
+        int: The number of usage rows.
+    """
+    totals = (db.session.query(AudioTranscription.user_id, db.func.coalesce(AudioTranscription.language, ""),
+                               db.func.count(AudioTranscription.id),
+                               db.func.coalesce(db.func.sum(AudioTranscription.audio_length), 0.0),
+                               db.func.coalesce(db.func.sum(AudioTranscription.word_count), 0))
+              .group_by(AudioTranscription.user_id, db.func.coalesce(AudioTranscription.language, "")).all())
+    try:
+        UserUsage.query.delete()
+        db.session.add_all([UserUsage(user_id=user_id, language=language, recording_count=recording_count,
+                                      audio_seconds=audio_seconds, word_count=word_count)
+                            for user_id, language, recording_count, audio_seconds, word_count in totals])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise RuntimeError(f"Failed to rebuild the usage totals: {str(e)}")
+    return len(totals)
+
+def discard_audio(audio_filepath):
+    """
+    Removes a stored audio file which will not be analyzed, e.g. because it was rejected, with all partial outputs.
+
+    Args:
+        audio_filepath (str): The path to the stored audio file.
+    """
+    if audio_filepath:
+        utils.remove_output_files(utils.get_audio_filename(audio_filepath))
+
+def discard_unsaved_audio(audio_filepaths):
+    """
+    Removes the stored audio files of a cancelled batch whose recordings were not saved yet, with their partial outputs.
+
+    Args:
+        audio_filepaths (list of str): The paths to the stored audio files of the batch.
+    """
+    saved_filepaths = {path for path, in db.session.query(AudioTranscription.audio_path)
+                       .filter(AudioTranscription.audio_path.in_(audio_filepaths))}
+    for audio_filepath in audio_filepaths:
+        if audio_filepath not in saved_filepaths:
+            discard_audio(audio_filepath)
+
+def get_pipeline_keys(current_user, audio_filepath, upload_id=None):
+    """
+    Returns the keys under which the pipeline of an upload is registered for cancellation, see `cancel_pipelines`.
+
+    Args:
+        current_user (User): The user who uploaded the audio file.
+        audio_filepath (str): The path to the stored audio file.
+        upload_id (str): The ID the client generated for the upload. Defaults to None.
+
+    Returns:
+        list of tuple: The keys.
+    """
+    keys = [("user", current_user.id), ("recording", current_user.id, audio_filepath)]
+    if upload_id:
+        keys.append(("upload", current_user.id, upload_id))
+    return keys
+
+def cancel_pipelines(current_user, audio_filepath=None, upload_id=None):
+    """
+    Cancels the pipelines of a recording of the user which are still running or queued, or of all their recordings.
+
+    Pipelines running in this process stop at their next check and remove their partial outputs themselves. The
+    cancellation is also stored as request in the database, so pipelines of other server processes stop within
+    `cancellation_requests.POLL_INTERVAL` seconds. Queued jobs are cancelled and their audio files removed here.
+    Running jobs are cancelled in the database, their workers notice it with the next renewal of the lease and
+    remove the partial outputs.
+
+    Args:
+        current_user (User): The user requesting the cancellation.
+        audio_filepath (str, optional): The path to the stored audio file of the recording. If neither it nor an
+                                        `upload_id` is given, the pipelines of all recordings are cancelled.
+        upload_id (str, optional): The ID the client generated for an upload whose path it does not know yet.
+
+    Returns:
+        int: The number of cancelled pipelines of this process and jobs. Pipelines of other server processes are
+             not counted.
+    """
+    cancellation_requests.request_cancellation(current_user.id, audio_filepath, upload_id)
+
+    cancelled_count = 0
+    if upload_id:
+        cancelled_count += cancellation.cancel(("upload", current_user.id, upload_id))
+
+    # Imported here, as the job queue uses the actions; simulated jobs of the user are not cancelled
+    from job_queue import TRANSCRIPTION_QUEUE
+    if audio_filepath:
+        cancelled_count += cancellation.cancel(("recording", current_user.id, audio_filepath))
+        jobs = TranscriptionJob.query.filter_by(user_id=current_user.id, queue=TRANSCRIPTION_QUEUE,
+                                                audio_path=audio_filepath)
+    elif not upload_id:
+        cancelled_count += cancellation.cancel(("user", current_user.id))
+        jobs = TranscriptionJob.query.filter_by(user_id=current_user.id, queue=TRANSCRIPTION_QUEUE)
+    else:
+        return cancelled_count
+
+    active_jobs = (jobs.filter(TranscriptionJob.status.in_(("queued", "running")))
+                   .with_entities(TranscriptionJob.id, TranscriptionJob.status, TranscriptionJob.audio_path).all())
+    for job_id, status, job_audio_filepath in active_jobs:
+        # Only cancel the job in the status it was read in, a job claimed meanwhile is cleaned up by its worker
+        cancelled = (TranscriptionJob.query.filter_by(id=job_id, status=status)
+                     .update({"status": "cancelled", "finished_at": datetime.now()}, synchronize_session=False))
+        db.session.commit()
+        if cancelled and status == "queued":
+            discard_audio(job_audio_filepath)  # No worker will process the stored upload
+        cancelled_count += cancelled
+
+    return cancelled_count
+
+def query_user_recordings(user_id):
+    """
+    Returns the query of all recordings of a user, from which the file lists and the export are read.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        Query: The query of the user's AudioTranscription rows.
+    """
+    return AudioTranscription.query.filter_by(user_id=user_id)
+
 def get_user_files(current_user):
     """
     Fetches the file paths for audio recordings, transcriptions, and improved texts for the authenticated user.
@@ -296,7 +882,7 @@ def get_user_files(current_user):
     """
     try:
         # Query the database for all audio recordings of the current user
-        audio_recordings = AudioTranscription.query.filter_by(user_id=current_user.id).all()
+        audio_recordings = query_user_recordings(current_user.id).all()
 
         # Create a list of file paths and creation timestamps
         audio_files = [recording.audio_path for recording in audio_recordings]
@@ -313,21 +899,86 @@ def get_user_files(current_user):
     except Exception as e:
         raise RuntimeError(f"Error during loading of file lists: {str(e)}")
 
-def get_analytics(audio_filepath):
+def search_recordings(current_user, query, limit=20):
+    """
+    Search the transcriptions of the user's recordings for the given terms.
+
+    Args:
+        current_user (User): The authenticated user whose recordings are searched.
+        query (str): The search terms. All terms must occur in a matching transcription segment.
+        limit (int): The maximum number of results. Defaults to 20.
+
+    Returns:
+        list of dict: The matching segments, best match first, each with the 'recording' (audio file path),
+                      'title', 'start' and 'end' time in seconds and a 'snippet' with the matches in <mark> tags.
+
+    Raises:
+        RuntimeError: If an error occurs during the search.
+    """
+    try:
+        hits = search_index.search(current_user.id, query, limit)
+        recordings = {
+            recording.id: recording for recording in
+            AudioTranscription.query.filter(AudioTranscription.id.in_({hit["recording_id"] for hit in hits})).all()
+        }
+
+        return [
+            {
+                'recording': recordings[hit["recording_id"]].audio_path,
+                'title': recordings[hit["recording_id"]].title,
+                'start': hit["start"],
+                'end': hit["end"],
+                'snippet': hit["snippet"],
+            }
+            for hit in hits if hit["recording_id"] in recordings
+        ]
+    except Exception as e:
+        raise RuntimeError(f"Error during search of transcriptions: {str(e)}")
+
+def _recompute_admitted(admit, recording, artifacts):
+    """
+    Regenerates artifacts of a recording with `recompute_artifacts` within the context returned by `admit`.
+    """
+    with admit():
+        return recompute_artifacts(recording, artifacts)
+
+def get_analytics(current_user, audio_filepath, admit=nullcontext):
     """
     Extract relevant analytics data from the AudioTranscription object.
 
+    Artifacts which were deferred in the lazy analytics mode are generated on this first access, within the context
+    returned by `admit`, e.g. a pipeline slot of the admission control. Concurrent requests for the same recording
+    within a process share a single generation and read its result from the database.
+
     Args:
+        current_user (User): The authenticated user.
         audio_filepath (str): The path to the audio file for which analytics are requested.
+        admit (callable): Returns the context in which deferred artifacts are generated. Defaults to no admission.
 
     Returns:
         dict: A dictionary containing the extracted analytics data.
 
     Raises:
+        UnauthorizedUserException: If the user has no recording with this audio file.
         RuntimeError: If an error occurs during extraction of information from the database.
     """
+    target_database_entry = get_user_recording(current_user, audio_filepath)
+
+    # Generate the deferred artifacts of the lazy analytics mode. Errors of the admission and the cancellation of
+    # the generation are raised to the caller.
+    profile = get_profile(target_database_entry.profile)
+    missing_artifacts = [artifact for artifact in LAZY_ARTIFACTS if artifact in profile["stages"]
+                         and getattr(target_database_entry, ARTIFACT_STAGES[artifact][0]) is None]
+    generated_here = True
+    if missing_artifacts:
+        _, generated_here = _lazy_artifact_flights.do(target_database_entry.audio_path, _recompute_admitted, admit,
+                                                      target_database_entry, missing_artifacts)
+
     try:
-        target_database_entry = db.session.query(AudioTranscription).filter_by(audio_path=audio_filepath).first()
+        if not generated_here:
+            # Another request generated the artifacts, load them from the database
+            db.session.refresh(target_database_entry)
+
         return {
             'created_at': target_database_entry.created_at,
             'transcribed_text_path': target_database_entry.transcription_path,
@@ -0,0 +1,230 @@
+import math
+import time
+import threading
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from flask import current_app
+import cancellation
+
+# Assumed duration of a pipeline in seconds until the first pipelines finished, used to estimate waiting times
+DEFAULT_PIPELINE_SECONDS = 60.0
+
+# Weight of the latest pipeline duration in the moving average of the durations
+DURATION_SMOOTHING = 0.2
+
+# Seconds between the checks of the cancellation token of a waiting request
+CANCELLATION_POLL_INTERVAL = 1.0
+
+# Guards the creation of the controller of an app by concurrent requests
+_controller_lock = threading.Lock()
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a pipeline cannot be admitted, because the wait queue is full, the request waited too long or the
+    user's quota is exhausted.
+
+    Attributes:
+        retry_after (int): Seconds after which the client may try again.
+    """
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _Ticket:
+    """
+    A request waiting in the admission queue.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+class AdmissionController:
+    """
+    Limits the number of transcription pipelines running concurrently in a process.
+
+    Requests beyond the limit wait in a bounded first-in-first-out queue. Requests are rejected when the queue is
+    full or their waiting time runs out, with an estimate of when a retry is likely to be admitted. The audio
+    seconds of admitted and waiting pipelines are reserved against the daily quota of their user, so concurrent
+    uploads cannot exceed it together.
+    """
+
+    def __init__(self, max_concurrent, max_queued):
+        """
+        Args:
+            max_concurrent (int): The maximum number of pipelines running at the same time.
+            max_queued (int): The maximum number of requests waiting for a free slot.
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._condition = threading.Condition()
+        self._running = 0
+        self._waiting = deque()
+        self._reserved_seconds = defaultdict(float)
+        self._average_seconds = DEFAULT_PIPELINE_SECONDS
+
+    def _estimate_wait(self, position):
+        """
+        Estimates the seconds until the request at a queue position (0 for the head) is admitted.
+        """
+        return int(math.ceil(self._average_seconds * (position // self.max_concurrent + 1)))
+
+    def check_capacity(self):
+        """
+        Rejects a request early if the wait queue is full, before its upload is stored.
+
+        Raises:
+            AdmissionRejected: If the wait queue is full.
+        """
+        with self._condition:
+            if self._running >= self.max_concurrent and len(self._waiting) >= self.max_queued:
+                raise AdmissionRejected("Too many recordings are being analyzed, please try again later.",
+                                        self._estimate_wait(len(self._waiting)))
+
+    def check_quota(self, user_id, audio_seconds, used_seconds, quota_seconds):
+        """
+        Rejects a request whose audio would exceed the user's daily quota, without waiting for a pipeline slot.
+
+        Args:
+            user_id (int): The ID of the user.
+            audio_seconds (float): The duration of the audio to process.
+            used_seconds (float): The audio seconds the user already processed today.
+            quota_seconds (float): The daily quota of audio seconds per user, 0 for no quota.
+
+        Raises:
+            AdmissionRejected: If the quota is exhausted.
+        """
+        with self._condition:
+            self._check_quota(user_id, audio_seconds, used_seconds, quota_seconds)
+
+    def _check_quota(self, user_id, audio_seconds, used_seconds, quota_seconds):
+        """
+        Raises AdmissionRejected if the audio exceeds the quota, including the reserved seconds. Must be called with
+        the condition held.
+        """
+        if quota_seconds and used_seconds + self._reserved_seconds.get(user_id, 0.0) + audio_seconds > quota_seconds:
+            raise AdmissionRejected(f"Daily quota of {quota_seconds / 60:.0f} minutes of audio exceeded.",
+                                    _seconds_until_midnight())
+
+    @contextmanager
+    def admit(self, user_id, audio_seconds=0.0, used_seconds=0.0, quota_seconds=0.0, timeout=300.0, charge=None):
+        """
+        Waits for a free pipeline slot and holds it while the context is active. A request whose cancellation token
+        (see `cancellation.activate`) is cancelled leaves the wait queue.
+
+        Args:
+            user_id (int): The ID of the user running the pipeline.
+            audio_seconds (float): The duration of the audio to process. Defaults to 0.
+            used_seconds (float): The audio seconds the user already processed today. Defaults to 0.
+            quota_seconds (float): The daily quota of audio seconds per user. Defaults to 0, no quota.
+            timeout (float): The maximum number of seconds to wait for a slot. Defaults to 300.
+            charge (callable): Called with the audio seconds once the pipeline is admitted, to add them to the
+                               user's used seconds, after which they are no longer reserved. Defaults to None, the
+                               seconds stay reserved until the pipeline finished.
+
+        Raises:
+            AdmissionRejected: If the quota is exhausted, the wait queue is full or no slot became free in time.
+            cancellation.PipelineCancelled: If the request was cancelled while waiting.
+        """
+        token = cancellation.get_current_token()
+        ticket = _Ticket(user_id)
+        with self._condition:
+            self._check_quota(user_id, audio_seconds, used_seconds, quota_seconds)
+
+            if self._running >= self.max_concurrent or self._waiting:
+                if len(self._waiting) >= self.max_queued:
+                    raise AdmissionRejected("Too many recordings are being analyzed, please try again later.",
+                                            self._estimate_wait(len(self._waiting)))
+
+                self._waiting.append(ticket)
+                self._reserved_seconds[user_id] += audio_seconds
+                deadline = time.monotonic() + timeout
+                while self._waiting[0] is not ticket or self._running >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or (token is not None and token.cancelled):
+                        position = self._waiting.index(ticket)
+                        self._waiting.remove(ticket)
+                        self._release_reservation(user_id, audio_seconds)
+                        self._condition.notify_all()
+                        if remaining > 0:
+                            raise cancellation.PipelineCancelled()
+                        raise AdmissionRejected("Waited too long for the analysis, please try again later.",
+                                                self._estimate_wait(position))
+                    # Wake up regularly to notice a cancellation, which does not notify the condition
+                    self._condition.wait(min(remaining, CANCELLATION_POLL_INTERVAL) if token else remaining)
+
+                self._waiting.popleft()
+                self._condition.notify_all()  # The next request may be admitted as well if more slots are free
+            else:
+                self._reserved_seconds[user_id] += audio_seconds
+
+            self._running += 1
+
+        start = time.monotonic()
+        reserved_seconds = audio_seconds
+        try:
+            if charge is not None:
+                charge(audio_seconds)
+                # The charged seconds are counted in the used seconds of the following requests
+                with self._condition:
+                    self._release_reservation(user_id, reserved_seconds)
+                    reserved_seconds = 0.0
+            yield
+        finally:
+            with self._condition:
+                self._running -= 1
+                if reserved_seconds:
+                    self._release_reservation(user_id, reserved_seconds)
+                self._average_seconds += DURATION_SMOOTHING * (time.monotonic() - start - self._average_seconds)
+                self._condition.notify_all()
+
+    def _release_reservation(self, user_id, audio_seconds):
+        """
+        Releases reserved audio seconds of a user. Must be called with the condition held.
+        """
+        self._reserved_seconds[user_id] -= audio_seconds
+        if self._reserved_seconds[user_id] <= 0:
+            del self._reserved_seconds[user_id]
+
+    def get_status(self, user_id):
+        """
+        Returns the load of the pipelines and the queue positions of a user's waiting requests.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            dict: The number of 'running' pipelines, the 'capacity', the number of 'queued' requests, the 1-based
+                  queue 'positions' of the user's requests and the 'estimated_wait_seconds' of the first of them.
+        """
+        with self._condition:
+            positions = [position for position, ticket in enumerate(self._waiting, start=1)
+                         if ticket.user_id == user_id]
+            return {
+                "running": self._running,
+                "capacity": self.max_concurrent,
+                "queued": len(self._waiting),
+                "positions": positions,
+                "estimated_wait_seconds": self._estimate_wait(positions[0] - 1) if positions else 0,
+            }
+
+def _seconds_until_midnight():
+    """
+    Returns the seconds until the daily quotas reset at local midnight.
+    """
+    now = time.localtime()
+    return (23 - now.tm_hour) * 3600 + (59 - now.tm_min) * 60 + (60 - now.tm_sec)
+
+def get_admission_controller():
+    """
+    Returns the admission controller of the current app, creating it from the app's config on first use.
+
+    The controller limits the pipelines of one process; with several server processes, each of them admits up
+    to `MAX_CONCURRENT_PIPELINES` pipelines.
+    """
+    extensions = current_app.extensions
+    with _controller_lock:
+        if "admission" not in extensions:
+            extensions["admission"] = AdmissionController(current_app.config.get("MAX_CONCURRENT_PIPELINES", 2),
+                                                          current_app.config.get("MAX_QUEUED_PIPELINES", 8))
+        return extensions["admission"]
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from werkzeug.datastructures import FileStorage
+import cpu_scheduler
+
+# Extensions of the files picked up by a bulk import
+AUDIO_EXTENSIONS = (".wav", ".flac", ".opus", ".ogg", ".mp3", ".m4a", ".aac", ".webm", ".mp4")
+
+# File name of the manifest written into the imported directory unless another path is given
+DEFAULT_MANIFEST_NAME = ".bulk_import_manifest.jsonl"
+
+# Flask app, quality profile and transcriber of a worker process, set up once by `_init_worker`
+_worker = {}
+
+def find_audio_files(directory, recursive=False):
+    """
+    Returns the audio files of a directory in a stable order.
+
+    Args:
+        directory (str): The directory to search.
+        recursive (bool): Whether to include the files of subdirectories. Defaults to False.
+
+    Returns:
+        list of str: The absolute paths of the audio files, sorted by path.
+    """
+    audio_files = []
+    for root, directories, filenames in os.walk(directory):
+        audio_files.extend(os.path.abspath(os.path.join(root, filename)) for filename in filenames
+                           if os.path.splitext(filename)[1].lower() in AUDIO_EXTENSIONS)
+        if not recursive:
+            break
+    return sorted(audio_files)
+
+def get_import_filename(source_filepath, directory):
+    """
+    Returns the name under which an imported file is stored: its path relative to the imported directory, with the
+    subdirectories joined by underscores, so files of the same name in different subdirectories (e.g. "a/talk.wav"
+    and "b/talk.wav") are stored as distinct recordings "a_talk.wav" and "b_talk.wav".
+
+    Args:
+        source_filepath (str): The absolute path of the imported file.
+        directory (str): The imported directory.
+
+    Returns:
+        str: The file name.
+    """
+    relative_path = os.path.relpath(source_filepath, os.path.abspath(directory))
+    return "_".join(relative_path.split(os.sep))
+
+def load_manifest(manifest_path):
+    """
+    Reads the entries of a bulk import manifest.
+
+    The manifest is a JSON Lines file with one entry per processed file. A file processed several times, e.g. after
+    a failure, has several entries of which the last one counts. A truncated last line of an interrupted run is ignored.
+
+    Args:
+        manifest_path (str): The path of the manifest.
+
+    Returns:
+        dict: The last entry per source file path.
+    """
+    entries = {}
+    if not os.path.isfile(manifest_path):
+        return entries
+
+    with open(manifest_path, 'r') as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry["source"]] = entry
+    return entries
+
+def _append_to_manifest(manifest_file, entry):
+    """
+    Appends an entry to the manifest and flushes it to disk, so it survives an interruption of the run.
+    """
+    manifest_file.write(json.dumps(entry) + "\n")
+    manifest_file.flush()
+    os.fsync(manifest_file.fileno())
+
+def _init_worker(profile_name, plans, pin_affinity):
+    """
+    Sets up a worker process: creates the Flask app and loads the models of the quality profile once.
+
+    Each worker takes its own plan from the queue of CPU plans and only uses its share of the cores, so the workers
+    do not oversubscribe them.
+    """
+    # Size the thread pools before the app imports torch and librosa
+    cpu_scheduler.configure_process(plans.get(), pin_affinity)
+
+    from app import app
+    from profiles import get_profile
+    from transcriber import Model
+
+    context = app.app_context()
+    context.push()
+
+    _worker["app"] = app
+    _worker["context"] = context
+    _worker["profile_name"] = profile_name
+    _worker["transcriber"] = Model.for_profile(get_profile(profile_name))
+
+def _import_file(source_filepath, filename, user_id):
+    """
+    Stores, transcribes and analyzes one audio file in a worker process under the name from `get_import_filename`.
+    `store_audio` reserves the stored file exclusively, so workers storing files of the same name do not overwrite
+    or remove each other's files.
+
+    Returns:
+        dict: The manifest entry of the file with its "status" ("done" or "failed"), the stored "audio_path",
+              the audio "duration" and the processing time in "seconds", or the "error" of a failure.
+    """
+    import actions
+    import utils.utils as utils
+    from models import AudioTranscription, User
+    from backend.src.database import db
+
+    start = time.perf_counter()
+    entry = {"source": source_filepath}
+    audio_filepath = None
+
+    try:
+        user = db.session.get(User, user_id)
+        with open(source_filepath, 'rb') as stream:
+            audio_filepath = actions.store_audio(FileStorage(stream=stream, filename=filename))
+
+        actions.transcribe_and_analyse(_worker["transcriber"], user, audio_filepath, _worker["profile_name"])
+
+        recording = AudioTranscription.query.filter_by(audio_path=audio_filepath).first()
+        entry.update(status="done", audio_path=audio_filepath, duration=recording.audio_length or 0.0)
+    except Exception as e:
+        db.session.rollback()
+        # Remove the stored audio and partial outputs of this file, so a retry starts from scratch
+        if audio_filepath and not AudioTranscription.query.filter_by(audio_path=audio_filepath).first():
+            utils.remove_output_files(utils.get_audio_filename(audio_filepath))
+        entry.update(status="failed", error=str(e))
+    finally:
+        db.session.remove()
+
+    entry["seconds"] = time.perf_counter() - start
+    return entry
+
+def run_bulk_import(directory, user_id, profile_name, worker_count=2, manifest_path=None, recursive=False,
+                    on_progress=None, pin_affinity=False):
+    """
+    Imports all audio files of a directory for a user with the `store_audio` → `transcribe_and_analyse` pipeline.
+
+    The files are processed by a pool of spawned worker processes, each of which loads its own models once. Every
+    processed file is recorded in a manifest, so an interrupted run skips the files already imported when it is
+    started again. Files which failed are retried.
+
+    Args:
+        directory (str): The directory containing the audio files.
+        user_id (int): The ID of the user who owns the imported recordings.
+        profile_name (str): The quality profile of the analysis.
+        worker_count (int): The number of worker processes. Defaults to 2.
+        manifest_path (str): The path of the manifest. Defaults to `DEFAULT_MANIFEST_NAME` in the directory.
+        recursive (bool): Whether to include the files of subdirectories. Defaults to False.
+        on_progress (callable): Called with the manifest entry of every processed file. Defaults to None.
+        pin_affinity (bool): Whether each worker is pinned to its share of the cores. Defaults to False.
+
+    Returns:
+        dict: The number of files "done", "failed" and "skipped" (imported by a previous run), the imported
+              "audio_seconds" and the "wall_seconds" of the run.
+    """
+    manifest_path = manifest_path or os.path.join(directory, DEFAULT_MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    audio_files = find_audio_files(directory, recursive)
+    pending_files = [path for path in audio_files if manifest.get(path, {}).get("status") != "done"]
+    summary = {"done": 0, "failed": 0, "skipped": len(audio_files) - len(pending_files),
+               "audio_seconds": 0.0, "wall_seconds": 0.0}
+    if not pending_files:
+        return summary
+
+    worker_count = max(1, min(worker_count, len(pending_files)))
+    context = multiprocessing.get_context("spawn")
+    plans = context.Queue()
+    for plan in cpu_scheduler.plan_workers(worker_count):
+        plans.put(plan)
+
+    start = time.perf_counter()
+    # Spawned workers do not inherit the parent's loaded models, database connections or threads
+    executor = ProcessPoolExecutor(max_workers=worker_count, mp_context=context,
+                                   initializer=_init_worker, initargs=(profile_name, plans, pin_affinity))
+    with executor, open(manifest_path, 'a') as manifest_file:
+        futures = [executor.submit(_import_file, path, get_import_filename(path, directory), user_id)
+                   for path in pending_files]
+        for future in as_completed(futures):
+            entry = future.result()
+            _append_to_manifest(manifest_file, entry)
+
+            summary[entry["status"]] += 1
+            summary["audio_seconds"] += entry.get("duration", 0.0)
+            if on_progress:
+                on_progress(entry)
+
+    summary["wall_seconds"] = time.perf_counter() - start
+    return summary
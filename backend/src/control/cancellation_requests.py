@@ -0,0 +1,143 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from models import CancellationRequest
+from backend.src.database import db
+import cancellation
+
+# Seconds between the checks of each server process for cancellation requests received by other processes
+POLL_INTERVAL = 1.0
+
+# Age after which requests are removed, no pipeline runs that long
+REQUEST_RETENTION = timedelta(days=1)
+
+# Watcher of this process, see `start_watcher`
+_watcher = None
+_watcher_lock = threading.Lock()
+
+def get_request_keys(request):
+    """
+    Returns the keys of the pipelines cancelled by a request, see `actions.get_pipeline_keys`.
+
+    Args:
+        request (CancellationRequest): The request.
+
+    Returns:
+        list of tuple: The keys.
+    """
+    keys = []
+    if request.upload_id:
+        keys.append(("upload", request.user_id, request.upload_id))
+    if request.audio_path:
+        keys.append(("recording", request.user_id, request.audio_path))
+    if not keys:
+        keys.append(("user", request.user_id))
+    return keys
+
+def request_cancellation(user_id, audio_filepath=None, upload_id=None):
+    """
+    Stores a request to cancel the pipelines of a user, which every server process applies to its running
+    pipelines within `POLL_INTERVAL` seconds. Requests older than `REQUEST_RETENTION` are removed.
+
+    Args:
+        user_id (int): The ID of the user.
+        audio_filepath (str): The path to the audio file of the cancelled pipeline. Defaults to None.
+        upload_id (str): The ID the client generated for the cancelled upload. Defaults to None.
+            Without path and upload ID all pipelines of the user are cancelled.
+    """
+    CancellationRequest.query.filter(CancellationRequest.created_at < datetime.now() - REQUEST_RETENTION).delete()
+    db.session.add(CancellationRequest(user_id=user_id, audio_path=audio_filepath, upload_id=upload_id))
+    db.session.commit()
+
+def _query_requests(tokens):
+    """
+    Returns the requests which may cancel any of the tokens: those of their users since the oldest of them was
+    registered.
+    """
+    user_ids = {key[1] for token in tokens for key in token.keys}
+    registered_at = min(token.registered_at for token in tokens)
+    return (CancellationRequest.query
+            .filter(CancellationRequest.user_id.in_(user_ids), CancellationRequest.created_at >= registered_at)
+            .all())
+
+def _cancels(request, token):
+    """
+    Returns whether a request cancels the pipeline of a token: it matches one of its keys and was stored after the
+    pipeline started, so a new upload of the user is not cancelled by an older request.
+    """
+    return (request.created_at >= token.registered_at
+            and any(key in token.keys for key in get_request_keys(request)))
+
+def apply_requests(tokens=None):
+    """
+    Cancels the pipelines of this process for which a cancellation was requested, e.g. by another process.
+
+    Args:
+        tokens (list of CancellationToken): The tokens to check. Defaults to None, all registered tokens.
+
+    Returns:
+        int: The number of cancelled pipelines.
+    """
+    if tokens is None:
+        tokens = cancellation.get_registered_tokens()
+    tokens = [token for token in tokens if token.keys and not token.cancelled]
+    if not tokens:
+        return 0
+
+    requests = _query_requests(tokens)
+    cancelled_count = 0
+    for token in tokens:
+        if any(_cancels(request, token) for request in requests):
+            token.cancel()
+            cancelled_count += 1
+    return cancelled_count
+
+def check():
+    """
+    Stops the pipeline of the current thread if it was cancelled in this process or a cancellation was requested
+    for it by another process. Unlike `cancellation.check`, it queries the database, e.g. once before the results
+    of the pipeline are saved.
+
+    Raises:
+        cancellation.PipelineCancelled: If the pipeline of the current thread was cancelled.
+    """
+    token = cancellation.get_current_token()
+    if token is not None:
+        apply_requests([token])
+        token.raise_if_cancelled()
+
+class _Watcher(threading.Thread):
+    """
+    Applies the cancellation requests to the running pipelines of this process every `POLL_INTERVAL` seconds. The
+    database is only queried while pipelines are running.
+    """
+
+    def __init__(self, app):
+        super().__init__(daemon=True)
+        self.app = app
+        self.pid = os.getpid()
+
+    def run(self):
+        # The thread has its own app context and therefore its own database session
+        while True:
+            time.sleep(POLL_INTERVAL)
+            if not cancellation.get_registered_tokens():
+                continue
+            with self.app.app_context():
+                try:
+                    apply_requests()
+                except Exception:
+                    db.session.rollback()  # Try again with the next poll
+
+def start_watcher():
+    """
+    Starts the watcher of the cancellation requests in this process, unless it is running. A process forked from
+    a process with a watcher starts its own.
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None or _watcher.pid != os.getpid():
+            _watcher = _Watcher(current_app._get_current_object())
+            _watcher.start()
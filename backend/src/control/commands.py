@@ -0,0 +1,399 @@
+import os
+import socket
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from models import AudioTranscription, User
+from profiles import QUALITY_PROFILES, get_profile
+from transcriber import Model, ENGLISH_ONLY_MODELS
+from backend.src.database import db
+import search_index
+import audio_loader
+import benchmark
+import cpu_scheduler
+import compiled_models
+import transformer
+import summary_cache
+import actions
+import bulk_import
+import job_queue
+import queue_simulation
+import load_test
+
+# Command group for maintenance of the analytics, available as `flask analytics ...`
+analytics_cli = AppGroup('analytics', help='Maintain the analytics of stored recordings.')
+
+# Command group for the AI models, available as `flask models ...`
+models_cli = AppGroup('models', help='Evaluate and prepare the AI models.')
+
+# Command group for the stored audio files, available as `flask audio ...`
+audio_cli = AppGroup('audio', help='Maintain the stored audio files.')
+
+# Command group for the queued transcription jobs, available as `flask jobs ...`
+jobs_cli = AppGroup('jobs', help='Process the queued transcription jobs.')
+
+# Command group for capacity tests of the web server, available as `flask server ...`
+server_cli = AppGroup('server', help='Test the capacity of the web server.')
+
+@analytics_cli.command('recompute')
+@click.option('--user-id', type=int, default=None, help='Only recompute recordings of this user.')
+@click.option('--force', is_flag=True, help='Regenerate all artifacts, not only the stale ones.')
+@click.option('--dry-run', is_flag=True, help='Only list the stale artifacts without regenerating them.')
+def recompute(user_id, force, dry_run):
+    """
+    Regenerate stale analytics artifacts of the stored recordings.
+
+    An artifact is stale if it was generated with another version or other parameters than the current
+    analytics code uses. Only stale artifacts are regenerated from the persisted audio, transcription and
+    segments; the recordings are not transcribed again.
+    """
+    query = AudioTranscription.query
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+
+    regenerated_count = 0
+    failed_count = 0
+
+    for recording in query.order_by(AudioTranscription.id).all():
+        artifacts = list(actions.ARTIFACT_STAGES) if force else actions.get_stale_artifacts(recording)
+        if not artifacts:
+            continue
+
+        if dry_run:
+            click.echo(f"{recording.audio_path}: {', '.join(artifacts)}")
+            continue
+
+        try:
+            regenerated = actions.recompute_artifacts(recording, artifacts)
+            regenerated_count += len(regenerated)
+            click.echo(f"{recording.audio_path}: regenerated {', '.join(regenerated) or 'nothing'}")
+        except RuntimeError as e:
+            failed_count += 1
+            click.echo(str(e), err=True)
+
+    if not dry_run:
+        click.echo(f"Regenerated {regenerated_count} artifacts, {failed_count} recordings failed.")
+
+@analytics_cli.command('reindex-search')
+def reindex_search():
+    """
+    Rebuild the full-text search index from the persisted transcription segments of all recordings.
+    """
+    indexed_count = 0
+    for recording in AudioTranscription.query.order_by(AudioTranscription.id).all():
+        if not recording.segments_path:
+            click.echo(f"{recording.audio_path}: no persisted segments, skipped", err=True)
+            continue
+
+        search_index.index_recording(recording.id, recording.user_id,
+                                     Model.load_segments_from_file(recording.segments_path))
+        db.session.commit()
+        indexed_count += 1
+
+    click.echo(f"Indexed {indexed_count} recordings.")
+
+@analytics_cli.command('rebuild-usage')
+def rebuild_usage():
+    """
+    Recompute the usage totals of all users from their stored recordings.
+
+    The totals are maintained with each saved and deleted recording; rebuilding them is only needed for
+    recordings stored before the totals existed.
+    """
+    row_count = actions.rebuild_usage()
+    click.echo(f"Rebuilt {row_count} usage totals.")
+
+@models_cli.command('benchmark-profiles')
+@click.argument('audio_filepath', type=click.Path(exists=True, dir_okay=False))
+@click.option('--reference', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Text file with the correct transcript. Defaults to the transcript of the "best" profile.')
+@click.option('--profiles', default=','.join(QUALITY_PROFILES), show_default=True,
+              help='Comma-separated quality profiles to compare.')
+def benchmark_profiles(audio_filepath, reference, profiles):
+    """
+    Compare latency and quality of the quality profiles on an audio file.
+    """
+    reference_text = None
+    if reference:
+        with open(reference, 'r') as file:
+            reference_text = file.read()
+
+    results = benchmark.benchmark_profiles(audio_filepath, reference_text, profiles.split(','))
+
+    stages = ["load", "transcription", "speed_graphics", "title", "summary",
+              "pitch_graphics", "energy_graphics", "improved_text", "total"]
+    click.echo(f"{'profile':<10}" + "".join(f"{stage:>16}" for stage in stages) + f"{'WER':>8}{'summary F1':>12}")
+    for result in results:
+        latencies = "".join(f"{result[stage]:>15.2f}s" if stage in result else f"{'-':>16}" for stage in stages)
+        summary_f1 = f"{result['summary_f1']:>12.2f}" if result["summary_f1"] is not None else f"{'-':>12}"
+        click.echo(f"{result['profile']:<10}{latencies}{result['wer']:>8.2%}{summary_f1}")
+
+@models_cli.command('benchmark-threads')
+@click.argument('audio_filepath', type=click.Path(exists=True, dir_okay=False))
+@click.option('--layouts', default=None,
+              help='Comma-separated layouts of WORKERSxTHREADS, e.g. "1x8,2x4,4x2". '
+                   'Defaults to all power-of-two worker counts sharing the available cores.')
+@click.option('--profile', 'profile_name', default='balanced', show_default=True,
+              type=click.Choice(list(QUALITY_PROFILES)), help='Quality profile of the pipeline.')
+@click.option('--tasks', 'task_count', type=click.IntRange(min=1), default=None,
+              help='Pipeline runs per layout. Defaults to twice the largest worker count.')
+@click.option('--pin', is_flag=True, help='Pin each worker to its share of the cores (Linux only).')
+def benchmark_threads(audio_filepath, layouts, profile_name, task_count, pin):
+    """
+    Compare the throughput of layouts of worker processes and torch threads per worker.
+    """
+    if layouts:
+        try:
+            layouts = [tuple(int(count) for count in layout.lower().split('x')) for layout in layouts.split(',')]
+        except ValueError:
+            raise click.BadParameter("Layouts must have the form WORKERSxTHREADS.", param_hint='--layouts')
+    else:
+        core_count = len(cpu_scheduler.get_available_cores())
+        layouts = [(2 ** power, max(1, core_count // 2 ** power)) for power in range(core_count.bit_length())]
+
+    results = benchmark.benchmark_thread_layouts(audio_filepath, layouts, profile_name, task_count, pin)
+
+    click.echo(f"{'workers':>8}{'threads':>8}{'tasks':>7}{'wall':>10}{'tasks/min':>11}{'x realtime':>12}")
+    for result in results:
+        click.echo(f"{result['workers']:>8}{result['threads']:>8}{result['tasks']:>7}{result['wall_seconds']:>9.1f}s"
+                   f"{result['tasks_per_minute']:>11.2f}{result['realtime_factor']:>12.2f}")
+
+@models_cli.command('compile')
+@click.option('--profiles', default=','.join(QUALITY_PROFILES), show_default=True,
+              help='Comma-separated quality profiles whose Whisper models are compiled.')
+@click.option('--skip-bart', is_flag=True, help='Do not compile the BART encoder.')
+def compile_models(profiles, skip_bart):
+    """
+    Trace the Whisper and BART encoders and store their frozen graphs in COMPILED_MODELS_DIR.
+
+    With USE_COMPILED_MODELS enabled, the models load these graphs instead of running their encoders eagerly.
+    Compile again after upgrading torch, whisper or transformers; stale artifacts are ignored.
+    """
+    directory = current_app.config.get("COMPILED_MODELS_DIR")
+
+    whisper_models = []
+    for profile_name in profiles.split(','):
+        try:
+            name = get_profile(profile_name)["whisper_model"]
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--profiles')
+        # English speech is transcribed with the English-only variant, see `Model.get_model_for_language`
+        for model_name in (name, f"{name}.en") if name in ENGLISH_ONLY_MODELS else (name,):
+            if model_name not in whisper_models:
+                whisper_models.append(model_name)
+
+    components = [(model_name, compiled_models.compile_whisper_encoder) for model_name in whisper_models]
+    if not skip_bart:
+        components.append((transformer.models[transformer.model_name], compiled_models.compile_bart_encoder))
+
+    failed_count = 0
+    for model_name, compile_component in components:
+        try:
+            click.echo(f"{model_name}: {compile_component(model_name, directory)}")
+        except Exception as e:
+            failed_count += 1
+            click.echo(f"{model_name}: compilation failed: {str(e)}", err=True)
+
+    click.echo(f"Compiled {len(components) - failed_count} models, {failed_count} failed.")
+
+@models_cli.command('summary-cache')
+@click.option('--clear', is_flag=True, help='Remove all cached titles and summaries.')
+def summary_cache_stats(clear):
+    """
+    Show the hit rate and size of the cache of generated titles and summaries.
+    """
+    if clear:
+        summary_cache.clear()
+        click.echo("Cleared the summary cache.")
+        return
+
+    stats = summary_cache.get_stats()
+    click.echo(f"Hits: {stats['memory_hits']} in memory, {stats['disk_hits']} on disk. Misses: {stats['misses']}. "
+               f"Hit rate: {stats['hit_rate']:.1%}.")
+    if stats["disk_entries"] is not None:
+        click.echo(f"On disk: {stats['disk_entries']} summaries, {stats['disk_bytes'] / 2**20:.1f} MB.")
+
+@audio_cli.command('migrate-codec')
+@click.option('--codec', type=click.Choice(list(audio_loader.AUDIO_CODECS)), default=None,
+              help='Target codec. Defaults to the configured AUDIO_STORAGE_CODEC.')
+@click.option('--dry-run', is_flag=True, help='Only list the recordings which would be converted.')
+def migrate_codec(codec, dry_run):
+    """
+    Convert the stored audio files of all recordings to the storage codec.
+    """
+    codec = codec or current_app.config.get("AUDIO_STORAGE_CODEC", "wav")
+    extension = "." + audio_loader.get_codec(codec)["extension"]
+
+    converted_count = 0
+    failed_count = 0
+    saved_bytes = 0
+
+    for recording in AudioTranscription.query.order_by(AudioTranscription.id).all():
+        if os.path.splitext(recording.audio_path)[1] == extension:
+            continue
+
+        if dry_run:
+            click.echo(recording.audio_path)
+            continue
+
+        old_size = os.path.getsize(recording.audio_path) if os.path.isfile(recording.audio_path) else 0
+        try:
+            new_filepath = actions.convert_recording_codec(recording, codec)
+        except RuntimeError as e:
+            failed_count += 1
+            click.echo(str(e), err=True)
+            continue
+
+        converted_count += 1
+        saved_bytes += old_size - os.path.getsize(new_filepath)
+        click.echo(f"{new_filepath}: {old_size / 2**20:.1f} MB -> {os.path.getsize(new_filepath) / 2**20:.1f} MB")
+
+    if not dry_run:
+        click.echo(f"Converted {converted_count} recordings to {codec}, saved {saved_bytes / 2**20:.1f} MB, "
+                   f"{failed_count} recordings failed.")
+
+@audio_cli.command('import')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--user', 'user_name', required=True, help='Username or email of the owner of the recordings.')
+@click.option('--profile', 'profile_name', default=None,
+              help='Quality profile of the analysis. Defaults to the configured QUALITY_PROFILE.')
+@click.option('--workers', type=click.IntRange(min=1), default=2, show_default=True,
+              help='Number of worker processes, each loading its own models.')
+@click.option('--manifest', type=click.Path(dir_okay=False), default=None,
+              help=f'Progress manifest. Defaults to {bulk_import.DEFAULT_MANIFEST_NAME} in the directory.')
+@click.option('--recursive', is_flag=True, help='Include the audio files of subdirectories.')
+def import_directory(directory, user_name, profile_name, workers, manifest, recursive):
+    """
+    Store, transcribe and analyze all audio files of a directory for a user.
+
+    Progress is recorded in a manifest, so an interrupted import resumes with the files not yet imported when it is
+    started again with the same arguments.
+    """
+    user = User.query.filter((User.username == user_name) | (User.email == user_name)).first()
+    if user is None:
+        raise click.BadParameter(f"Unknown user: {user_name}", param_hint='--user')
+
+    profile_name = profile_name or current_app.config.get("QUALITY_PROFILE")
+    try:
+        get_profile(profile_name)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--profile')
+
+    def print_progress(entry):
+        if entry["status"] == "done":
+            click.echo(f"{entry['source']}: {entry['duration']:.0f}s of audio in {entry['seconds']:.0f}s")
+        else:
+            click.echo(f"{entry['source']}: failed: {entry['error']}", err=True)
+
+    summary = bulk_import.run_bulk_import(directory, user.id, profile_name, workers, manifest, recursive,
+                                          print_progress, current_app.config.get("CPU_AFFINITY", False))
+
+    click.echo(f"Imported {summary['done']} files, {summary['failed']} failed, "
+               f"{summary['skipped']} already imported before.")
+    if summary["wall_seconds"] > 0:
+        throughput = summary["audio_seconds"] / summary["wall_seconds"]
+        click.echo(f"Throughput: {summary['audio_seconds'] / 3600:.2f} audio hours in "
+                   f"{summary['wall_seconds'] / 3600:.2f} hours ({throughput:.2f} audio hours per hour).")
+
+@jobs_cli.command('work')
+@click.option('--worker-id', default=None, help='Unique ID of the worker. Defaults to the host name and process ID.')
+@click.option('--max-jobs', type=click.IntRange(min=1), default=None, help='Stop after this number of jobs.')
+@click.option('--burst', is_flag=True, help='Stop when no jobs are queued or running.')
+@click.option('--poll-interval', type=float, default=2.0, show_default=True,
+              help='Seconds to wait before polling again when no job is queued.')
+def work(worker_id, max_jobs, burst, poll_interval):
+    """
+    Claim and process queued transcription jobs.
+
+    Any number of workers on any number of machines can share the database. Jobs of crashed workers are taken
+    over by other workers after their lease of JOB_LEASE_SECONDS expired.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+    def print_job(job_id, error):
+        click.echo(f"Job {job_id}: {'failed: ' + error if error else 'done'}", err=bool(error))
+
+    click.echo(f"Worker {worker_id} started.")
+    try:
+        processed_count = job_queue.run_worker(
+            worker_id, lease_seconds=current_app.config.get("JOB_LEASE_SECONDS", 60), poll_interval=poll_interval,
+            max_attempts=current_app.config.get("JOB_MAX_ATTEMPTS", 3), max_jobs=max_jobs, until_empty=burst,
+            on_job=print_job)
+    except KeyboardInterrupt:
+        # The lease of an interrupted job expires and the job is taken over by another worker
+        click.echo(f"Worker {worker_id} interrupted.")
+        return
+    click.echo(f"Worker {worker_id} processed {processed_count} jobs.")
+
+@jobs_cli.command('simulate')
+@click.option('--nodes', type=click.IntRange(min=1), default=4, show_default=True, help='Number of worker processes.')
+@click.option('--jobs', 'job_count', type=click.IntRange(min=1), default=40, show_default=True,
+              help='Number of simulated jobs.')
+@click.option('--work-seconds', type=float, default=0.2, show_default=True, help='Processing time per job.')
+@click.option('--lease-seconds', type=float, default=2.0, show_default=True, help='Duration of a lease.')
+@click.option('--no-crash', is_flag=True, help='Do not crash a node while it holds a lease.')
+@click.option('--configured-database', is_flag=True,
+              help='Use the configured database instead of a temporary SQLite database, e.g. to check PostgreSQL. '
+                   'The simulated jobs are owned by the first user.')
+def simulate(nodes, job_count, work_seconds, lease_seconds, no_crash, configured_database):
+    """
+    Simulate several worker nodes on this machine to check the job queue.
+
+    The nodes are separate processes processing simulated jobs which only sleep. By default one node crashes
+    while holding a lease, so its job must be taken over after the lease expired. Fails with a non-zero exit
+    status if a job is lost or not done, so the command serves as automated check. It runs against a temporary
+    SQLite database unless `--configured-database` is given.
+    """
+    if configured_database:
+        user = User.query.order_by(User.id).first()
+        if user is None:
+            raise click.ClickException("The simulated jobs need an owner, register a user first.")
+
+        result = queue_simulation.simulate_nodes(user.id, nodes, job_count, work_seconds, lease_seconds,
+                                                 not no_crash)
+    else:
+        result = queue_simulation.simulate_nodes_in_temporary_database(nodes, job_count, work_seconds,
+                                                                       lease_seconds, not no_crash)
+
+    click.echo(f"{result['done']}/{result['jobs']} jobs done by {nodes} nodes ({result['crashed']} crashed) in "
+               f"{result['wall_seconds']:.1f}s, {result['jobs_per_second']:.1f} jobs/s.")
+    click.echo(f"Lost jobs: {result['lost']}, jobs completed twice: {result['duplicates']}.")
+    if result["lost"] or result["done"] != result["jobs"]:
+        raise click.ClickException("Not all simulated jobs were completed.")
+
+@server_cli.command('load-test')
+@click.option('--users', 'user_count', type=click.IntRange(min=1), default=8, show_default=True,
+              help='Number of concurrent users.')
+@click.option('--iterations', type=click.IntRange(min=1), default=3, show_default=True,
+              help='Recordings uploaded per user.')
+@click.option('--audio-seconds', type=click.FloatRange(min=1), default=10.0, show_default=True,
+              help='Duration of the synthetic recordings.')
+@click.option('--list-polls', type=click.IntRange(min=0), default=3, show_default=True,
+              help='/list-files requests after each upload.')
+@click.option('--think-seconds', type=click.FloatRange(min=0), default=0.5, show_default=True,
+              help='Maximum random pause between the requests of a user.')
+@click.option('--transcription-latency', type=click.FloatRange(min=0), default=2.0, show_default=True,
+              help='Seconds a stub transcription takes.')
+@click.option('--summary-latency', type=click.FloatRange(min=0), default=0.5, show_default=True,
+              help='Seconds a stub title or summary takes.')
+@click.option('--improve-latency', type=click.FloatRange(min=0), default=1.0, show_default=True,
+              help='Seconds a stub text improvement takes.')
+@click.option('--max-concurrent', type=click.IntRange(min=1), default=None,
+              help='MAX_CONCURRENT_PIPELINES of the tested app. Defaults to the configured value.')
+def run_load_test(user_count, iterations, audio_seconds, list_polls, think_seconds, transcription_latency,
+                  summary_latency, improve_latency, max_concurrent):
+    """
+    Simulate concurrent dashboard users against the app with stub models and report the latencies.
+
+    The app runs in this process with a temporary database, so the configured database is not touched. Whisper and
+    BART are replaced by stubs sleeping for the given latencies; everything else runs as in production.
+    """
+    config_overrides = {"MAX_CONCURRENT_PIPELINES": max_concurrent} if max_concurrent else None
+    result = load_test.run_load_test(user_count, iterations, audio_seconds, list_polls, think_seconds,
+                                     transcription_latency, summary_latency, improve_latency, config_overrides)
+
+    click.echo(f"{user_count} users, {result['wall_seconds']:.1f}s, {result['requests_per_second']:.2f} requests/s")
+    click.echo(f"{'endpoint':<26}{'count':>7}{'errors':>8}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for endpoint, stats in result["endpoints"].items():
+        click.echo(f"{endpoint:<26}{stats['count']:>7}{stats['errors']:>8}{stats['throughput']:>8.2f}"
+                   + "".join(f"{stats[key]:>8.2f}s" for key in ("p50", "p95", "p99", "max")))
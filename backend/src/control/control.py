@@ -1,19 +1,104 @@
+import os
+from functools import partial
+from contextlib import contextmanager
 from flask import Blueprint,render_template
 from flask_login import login_required, current_user
 from transcriber import Model
+from profiles import get_profile
 import actions
-from flask import jsonify, request
+import audio_loader
+import job_queue
+import admission
+import profiling
+import cancellation
+import cancellation_requests
+import export
+from flask import jsonify, request, current_app, send_file, Response, stream_with_context
+from datetime import datetime
 
 # Create a Blueprint for transcription routes
 transcription_bp = Blueprint('transcription', __name__)
 
-# Create an instance of the model which executes the actual logic
-transcriber = Model()
-
 # Path to the stored raw audio files and transcriptions
 AUDIO_FOLDER = "src/static/output/raw_audio/"
 TRANSCRIPTION_FOLDER = "src/static/output/transcription/"
 
+def get_requested_profile():
+    """
+    Returns the quality profile selected by the request's 'profile' form field or the deployment's default profile.
+
+    Returns:
+        str: The name of the quality profile.
+
+    Raises:
+        ValueError: If the requested profile is unknown.
+    """
+    profile_name = request.form.get('profile') or current_app.config.get("QUALITY_PROFILE")
+    get_profile(profile_name)  # Validate the profile before the upload is stored
+    return profile_name
+
+def admission_rejected_response(error):
+    """
+    Returns the 429 Too Many Requests response for a request rejected by the admission control.
+
+    Args:
+        error (admission.AdmissionRejected): The rejection.
+
+    Returns:
+        tuple: The JSON response with the error and the seconds after which to retry, the status code and the
+               Retry-After header.
+    """
+    return (jsonify({"error": str(error), "retry_after": error.retry_after}), 429,
+            {"Retry-After": str(error.retry_after)})
+
+def admit_pipeline(audio_filepaths):
+    """
+    Returns a context admitting the pipeline of stored audio files for the authenticated user.
+
+    The context waits for a free pipeline slot and reserves the duration of the audio against the user's daily quota.
+    Once admitted, the duration is added to the user's daily ledger, see `actions.add_daily_audio_seconds`.
+
+    Args:
+        audio_filepaths (list of str): The paths to the stored audio files.
+
+    Raises:
+        admission.AdmissionRejected: When entering the context, if the pipeline cannot be admitted.
+    """
+    config = current_app.config
+    audio_seconds = sum(audio_loader.get_duration(audio_filepath) for audio_filepath in audio_filepaths)
+    return admission.get_admission_controller().admit(
+        current_user.id, audio_seconds, actions.get_daily_audio_seconds(current_user),
+        config.get("USER_DAILY_AUDIO_SECONDS", 0), config.get("ADMISSION_TIMEOUT", 300),
+        charge=partial(actions.add_daily_audio_seconds, current_user))
+
+@contextmanager
+def register_pipeline(pipeline_keys):
+    """
+    Returns a context registering and activating the cancellation token of a pipeline of the authenticated user.
+
+    The pipeline is cancelled by `/delete-file`, `/delete-all-files` or `/cancel-upload`, also when another server
+    process receives them, see `cancellation_requests`.
+
+    Args:
+        pipeline_keys (list of tuple): The keys of the pipeline, see `actions.get_pipeline_keys`.
+    """
+    cancellation_requests.start_watcher()
+    with cancellation.register(*pipeline_keys) as token, cancellation.activate(token):
+        yield token
+
+def admit_recomputation():
+    """
+    Returns a context admitting the generation of deferred analytics artifacts for the authenticated user.
+
+    The context waits for a free pipeline slot like an upload, but the recording was counted against the daily
+    quota when it was uploaded.
+
+    Raises:
+        admission.AdmissionRejected: When entering the context, if the generation cannot be admitted.
+    """
+    return admission.get_admission_controller().admit(
+        current_user.id, timeout=current_app.config.get("ADMISSION_TIMEOUT", 300))
+
 @transcription_bp.route('/dashboard')
 @login_required
 def dashboard():
@@ -34,12 +119,26 @@ def store_and_analyze():
 
     Request Payload:
         - An audio file (under the key 'audio') must be provided in the form-data of the POST request.
+        - Optionally a quality profile ("fast", "balanced" or "best") under the key 'profile'.
+        - Optionally an ID generated by the client under the key 'upload_id', with which the client can cancel
+          the analysis before it knows the path of the recording, see `/cancel-upload`.
+
+    If the `PROCESSING_MODE` config is "queue", the file is only stored and a job is queued for the workers.
+    The response then contains the job ID and the URL of its status, see `/jobs/<job_id>`.
+
+    Otherwise at most `MAX_CONCURRENT_PIPELINES` uploads are analyzed at the same time. Further uploads wait in a
+    bounded queue, whose positions are reported by `/admission`. Uploads are rejected with 429 and a Retry-After
+    header if the queue is full, they waited longer than `ADMISSION_TIMEOUT` or the user's daily quota of
+    `USER_DAILY_AUDIO_SECONDS` is exhausted.
 
     Returns:
         JSON Response:
             - Success: If the file is stored and analyzed successfully, returns a success message,
               along with a new value for a dropdown in the frontend.
-            - Error (422): If the audio file is not provided or the file is invalid.
+            - Accepted (202): If the file is stored and queued, returns the 'job_id' and 'status_url'.
+            - Error (422): If the audio file is not provided, the file is invalid or the profile is unknown.
+            - Error (429): If the upload was rejected by the admission control, returns the 'retry_after' seconds.
+            - Error (409): If the analysis was cancelled by `/delete-file` or `/cancel-upload`.
             - Error (500): For any unexpected errors during transcription, analysis, or saving to the database.
     """
 
@@ -50,13 +149,61 @@ def store_and_analyze():
     file = request.files['audio']
 
     try:
+        profile_name = get_requested_profile()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 422
+
+    queue_mode = current_app.config.get("PROCESSING_MODE") == "queue"
+    audio_filepath = None
+
+    try:
+        # Reject the upload before storing it if no pipeline slot can become free soon
+        if not queue_mode:
+            admission.get_admission_controller().check_capacity()
+    except admission.AdmissionRejected as e:
+        return admission_rejected_response(e)
+
+    try:
+        if queue_mode:
+            # Store the audio file and leave the analysis to a worker
+            audio_filepath = actions.store_audio(file)
+            try:
+                # Only check the quota, the number of workers limits the concurrent pipelines
+                audio_seconds = audio_loader.get_duration(audio_filepath)
+                admission.get_admission_controller().check_quota(
+                    current_user.id, audio_seconds, actions.get_daily_audio_seconds(current_user),
+                    current_app.config.get("USER_DAILY_AUDIO_SECONDS", 0))
+                # Charge the quota in the transaction of the job, so a failed enqueue does not use up quota
+                job = job_queue.enqueue_job(current_user.id, audio_filepath, profile_name, charge=partial(
+                    actions.add_daily_audio_seconds, current_user, audio_seconds, commit=False))
+            except Exception:
+                actions.discard_audio(audio_filepath)  # The upload is not analyzed without its job
+                raise
+            return jsonify({"success": True,
+                            "message": "Recording queued for transcription and analysis",
+                            "job_id": job.id,
+                            "status_url": f"/jobs/{job.id}",
+                            "dropdown_value": audio_filepath}), 202
+
+        # Load the transcriber of the profile on first use
+        transcriber = Model.for_profile(get_profile(profile_name))
         # Store the audio file
         audio_filepath = actions.store_audio(file)
-        # Trigger analysis of the audio file
-        actions.transcribe_and_analyse(transcriber, current_user, audio_filepath)
+        # Trigger analysis of the audio file once a pipeline slot is free, until it is cancelled
+        pipeline_keys = actions.get_pipeline_keys(current_user, audio_filepath, request.form.get('upload_id'))
+        with register_pipeline(pipeline_keys):
+            with admit_pipeline([audio_filepath]):
+                profiling.run_profiled(profiling.should_profile(), audio_filepath, actions.transcribe_and_analyse,
+                                       transcriber, current_user, audio_filepath, profile_name)
         return jsonify({"success": True,
                         "message": "Transcription and Analysis successful",
                         "dropdown_value": audio_filepath}), 201 # Return success response with new dropdown value
+    except admission.AdmissionRejected as e:
+        actions.discard_audio(audio_filepath)  # The stored upload is not analyzed
+        return admission_rejected_response(e)
+    except cancellation.PipelineCancelled:
+        actions.discard_audio(audio_filepath)  # Remove the upload and the partial outputs of the analysis
+        return jsonify({"error": "The analysis was cancelled."}), 409
     except IOError as e:
         return jsonify({"error": str(e)}), 422 # Catch error for storage of the audio file
     except RuntimeError as e:
@@ -66,6 +213,100 @@ def store_and_analyze():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@transcription_bp.route('/store_and_analyze_batch', methods=['POST'])
+@login_required
+def store_and_analyze_batch():
+    """
+    Endpoint for storing and analyzing several audio files at once, e.g. a folder of voice memos.
+
+    All files are stored first and then transcribed together, so that short clips share batched Whisper passes.
+    Each file results in the same database entry and analysis files as an upload through `/store_and_analyze`.
+    The failure of a single file does not affect the other files, its upload and partial outputs are removed.
+
+    Request Payload:
+        - One or more audio files (all under the key 'audio') must be provided in the form-data of the POST request.
+        - Optionally a quality profile ("fast", "balanced" or "best") under the key 'profile'.
+        - Optionally an ID generated by the client under the key 'upload_id', see `/cancel-upload`.
+
+    Returns:
+        JSON Response:
+            - Success (201): If all files are stored and analyzed successfully.
+            - Partial success (207): If some files failed. The per-file results contain the error messages.
+            - Error (422): If no audio file is provided or the profile is unknown.
+            - Error (429): If the batch was rejected by the admission control, see `/store_and_analyze`.
+            - Error (409): If the batch was cancelled, the recordings analyzed before are kept.
+            - Error (500): For any unexpected errors during the batch transcription.
+
+            The per-file results under 'results' contain the original 'filename', 'success' and
+            either the 'dropdown_value' of the stored recording or an 'error'.
+    """
+
+    files = request.files.getlist('audio')
+    if not files:
+        return jsonify({"error": "Invalid Audio File or Name"}), 422
+
+    try:
+        profile_name = get_requested_profile()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 422
+
+    try:
+        admission.get_admission_controller().check_capacity()
+    except admission.AdmissionRejected as e:
+        return admission_rejected_response(e)
+
+    results = []
+    stored_filepaths = []
+
+    # Store all audio files first
+    for file in files:
+        try:
+            audio_filepath = actions.store_audio(file)
+            stored_filepaths.append(audio_filepath)
+            results.append({"filename": file.filename, "dropdown_value": audio_filepath})
+        except IOError as e:
+            results.append({"filename": file.filename, "success": False, "error": str(e)})
+
+    try:
+        # Load the transcriber of the profile on first use
+        transcriber = Model.for_profile(get_profile(profile_name))
+        # Trigger the batched transcription and the analysis of each stored audio file as one pipeline, which is
+        # cancelled as a whole with its upload ID or with the deletion of all files
+        pipeline_keys = [("user", current_user.id)]
+        if request.form.get('upload_id'):
+            pipeline_keys.append(("upload", current_user.id, request.form.get('upload_id')))
+        with register_pipeline(pipeline_keys):
+            with admit_pipeline(stored_filepaths):
+                errors = actions.transcribe_and_analyse_batch(transcriber, current_user, stored_filepaths,
+                                                              profile_name) if stored_filepaths else {}
+    except admission.AdmissionRejected as e:
+        for audio_filepath in stored_filepaths:
+            actions.discard_audio(audio_filepath)  # The stored uploads are not analyzed
+        return admission_rejected_response(e)
+    except cancellation.PipelineCancelled:
+        actions.discard_unsaved_audio(stored_filepaths)  # Recordings saved before the cancellation are kept
+        return jsonify({"error": "The analysis was cancelled."}), 409
+    except Exception as e:
+        actions.discard_unsaved_audio(stored_filepaths)  # Recordings saved before the failure are kept
+        return jsonify({"error": str(e)}), 500
+
+    # Remove the uploads and partial outputs of the files whose analysis failed
+    actions.discard_unsaved_audio([audio_filepath for audio_filepath, error in errors.items() if error is not None])
+
+    for result in results:
+        if "dropdown_value" in result:
+            error = errors.get(result["dropdown_value"])
+            result["success"] = error is None
+            if error is not None:
+                result["error"] = error
+                del result["dropdown_value"]
+
+    all_successful = all(result["success"] for result in results)
+    return jsonify({"success": all_successful,
+                    "message": "Transcription and Analysis successful" if all_successful
+                    else "Transcription and Analysis failed for some files",
+                    "results": results}), 201 if all_successful else 207
+
 @transcription_bp.route('/delete-all-files', methods=['POST'])
 @login_required
 def delete_all_files():
@@ -83,6 +324,7 @@ def delete_all_files():
             - Error message with HTTP status 500 if an exception occurs during the deletion process.
     """
     try:
+        actions.cancel_pipelines(current_user)  # Stop the analyses of recordings which are not stored yet
         actions.cleanup(current_user)
         return jsonify({"success": True, "message": "All files deleted successfully"}), 200
     except Exception as e:
@@ -97,6 +339,7 @@ def delete_file():
     This endpoint triggers the deletion of a single audio file and all its related data (e.g., transcription,
     analysis graphics) from both the file system and the database for the current authenticated user. The
     audio file is identified by its 'audio_filepath', and all related records are removed accordingly.
+    A queued or running analysis of the audio file is cancelled and its partial outputs are removed.
 
     Request Payload (JSON):
         {
@@ -111,11 +354,47 @@ def delete_file():
     try:
         data = request.json
         audio_filepath = data.get('filePath')
+        if audio_filepath:
+            actions.cancel_pipelines(current_user, audio_filepath)
         actions.cleanup(current_user, audio_filepath)
         return jsonify({"success": True, "message": "Single file deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@transcription_bp.route('/cancel-upload', methods=['POST'])
+@login_required
+def cancel_upload():
+    """
+    Endpoint for cancelling the analysis of an upload, e.g. when the user closes the page while it is analyzed.
+
+    The page sends the request with `navigator.sendBeacon`, which delivers it while the page is closed. The upload
+    is identified by the 'upload_id' sent along with it to `/store_and_analyze`, or by the 'filePath' of a queued
+    upload. The analysis stops at its next check, its upload and partial outputs are removed. The cancellation is
+    stored in the database, so an analysis running in another server process stops as well, within
+    `cancellation_requests.POLL_INTERVAL` seconds.
+
+    Request Payload (form-data):
+        - 'upload_id': The ID the client generated for the upload, or
+        - 'filePath': The path of the stored audio file returned for a queued upload.
+
+    Returns:
+        Response (JSON):
+            - Accepted (202): The number of 'cancelled' analyses of this process and queued jobs. 0 if the analysis
+              already finished or runs in another server process.
+            - Error (400): If neither an upload ID nor a file path is given.
+            - Error (500): If an exception occurs during the cancellation.
+    """
+    upload_id = request.form.get('upload_id')
+    audio_filepath = request.form.get('filePath')
+    if not upload_id and not audio_filepath:
+        return jsonify({"error": "Upload not specified"}), 400
+
+    try:
+        cancelled_count = actions.cancel_pipelines(current_user, audio_filepath, upload_id)
+        return jsonify({"success": True, "cancelled": cancelled_count}), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @transcription_bp.route('/list-files', methods=['GET'])
 @login_required
 def list_files():
@@ -160,6 +439,9 @@ def get_analytics():
     in the JSON payload. If the file path is not provided, or if there is an error
     during the process, an appropriate error message will be returned.
 
+    Artifacts deferred by the lazy analytics mode are generated like an analysis: in a pipeline slot of the
+    admission control, until the recording is deleted.
+
     Args:
         None. The audio file path is provided in the JSON body of the POST request
         under the key "recording".
@@ -169,7 +451,8 @@ def get_analytics():
             - On success: A JSON object containing the requested analytics data under
               the 'data' key, along with an HTTP status code of 200.
             - On error: A JSON object containing an error message, with an appropriate
-              HTTP status code (400 for missing recording, 500 for server errors).
+              HTTP status code (400 for missing recording, 404 for an unknown recording, 409 if the generation
+              was cancelled, 429 if it was rejected by the admission control, 500 for server errors).
     """
 
     try:
@@ -179,11 +462,222 @@ def get_analytics():
         if not audio_filepath:
             return jsonify({'error': 'Recording not specified'}), 400
 
-        # Call the function from actions.py to get the analytics
-        analytics = actions.get_analytics(audio_filepath)
+        # Call the function from actions.py to get the analytics, the deletion of the recording cancels the
+        # generation of deferred artifacts
+        pipeline_keys = actions.get_pipeline_keys(current_user, audio_filepath)
+        with register_pipeline(pipeline_keys):
+            analytics = actions.get_analytics(current_user, audio_filepath, admit_recomputation)
 
         # Return the data as JSON
         return jsonify({'success': True, 'data': analytics}), 200
+    except actions.UnauthorizedUserException as e:
+        return jsonify({'error': str(e)}), 404
+    except admission.AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except cancellation.PipelineCancelled:
+        return jsonify({"error": "The analysis was cancelled."}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@transcription_bp.route('/export', methods=['GET'])
+@login_required
+def export_files():
+    """
+    Endpoint for downloading all recordings of the authenticated user with their analyses as a ZIP archive.
+
+    The archive is streamed while it is generated, see `export.stream_user_archive`, so the download starts at
+    once and its size is unknown in advance.
+
+    Returns:
+        Response: The streamed ZIP archive as attachment.
+    """
+    filename = f"speech_analysis_export_{datetime.now().strftime('%Y-%m-%d')}.zip"
+    return Response(stream_with_context(export.stream_user_archive(current_user.id)), mimetype='application/zip',
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"',
+                             "Cache-Control": "private, no-store"})
+
+@transcription_bp.route('/usage', methods=['GET'])
+@login_required
+def get_usage():
+    """
+    Endpoint for the usage overview of the authenticated user.
+
+    The overview is read from the usage totals maintained with each saved and deleted recording, so it takes
+    the same time regardless of the number of recordings.
+
+    Returns:
+        Response (JSON):
+            - On success: The total 'recordings', 'audio_minutes', 'words' and 'average_wpm' and the same totals
+              per entry of 'languages', along with an HTTP status code of 200.
+            - On error: A JSON object containing an error message, with an HTTP status code of 500.
+    """
+    try:
+        return jsonify({'success': True, 'data': actions.get_usage(current_user)}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@transcription_bp.route('/search', methods=['GET'])
+@login_required
+def search():
+    """
+    Endpoint for the full-text search over the transcriptions of the authenticated user's recordings.
+
+    Query Parameters:
+        - q: The search terms. All terms must occur in a matching transcription segment.
+        - limit (optional): The maximum number of results. Defaults to 20.
+
+    Returns:
+        Response (JSON):
+            - On success: The matching segments under the 'data' key, best match first, each containing the
+              'recording' (audio file path), 'title', 'start' and 'end' time in seconds and a highlighted 'snippet',
+              along with an HTTP status code of 200.
+            - On error: A JSON object containing an error message, with an appropriate
+              HTTP status code (400 for a missing query, 500 for server errors).
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Search query not specified'}), 400
+
+    try:
+        results = actions.search_recordings(current_user, query, request.args.get('limit', 20, type=int))
+        return jsonify({'success': True, 'data': results}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@transcription_bp.route('/audio', methods=['GET'])
+@login_required
+def stream_audio():
+    """
+    Endpoint for playing the audio file of one of the authenticated user's recordings.
+
+    The file is served with byte-range support, so players can seek without downloading the recording from the
+    start (206 Partial Content), and with ETag and Last-Modified validators, so unchanged files are answered with
+    304 Not Modified. The file is passed to the server's file wrapper, which uses sendfile where available.
+
+    Query Parameters:
+        - recording: The audio file path of the recording.
+        - preview (optional): If set, recordings longer than `AUDIO_PREVIEW_MIN_DURATION` are streamed as a
+          compressed mono Opus preview which is encoded on the fly. Previews do not support byte ranges.
+
+    Returns:
+        Response:
+            - On success: The audio file (200 or 206) or the preview (200).
+            - On error: A JSON object containing an error message, with an appropriate
+              HTTP status code (400 for a missing recording, 404 for an unknown recording, 500 for server errors).
+    """
+    audio_filepath = request.args.get('recording')
+    if not audio_filepath:
+        return jsonify({'error': 'Recording not specified'}), 400
+
+    try:
+        recording = actions.get_user_recording(current_user, audio_filepath)
+    except actions.UnauthorizedUserException as e:
+        return jsonify({'error': str(e)}), 404
+
+    try:
+        preview_min_duration = current_app.config.get("AUDIO_PREVIEW_MIN_DURATION", 600)
+        if request.args.get('preview') and (recording.audio_length or 0) >= preview_min_duration:
+            preview = audio_loader.stream_preview(recording.audio_path,
+                                                  current_app.config.get("AUDIO_PREVIEW_BITRATE", "24k"))
+            return Response(preview, mimetype="audio/ogg", headers={"Cache-Control": "private, no-store"})
+
+        response = send_file(os.path.abspath(recording.audio_path),
+                             mimetype=audio_loader.get_mimetype(recording.audio_path), conditional=True, etag=True,
+                             max_age=current_app.config.get("AUDIO_CACHE_MAX_AGE", 3600))
+        response.cache_control.private = True  # The recording must not be stored by shared caches
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@transcription_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def get_job_status(job_id):
+    """
+    Endpoint for polling the status of a queued transcription job of the authenticated user.
+
+    Returns:
+        Response (JSON):
+            - On success: The 'status' ("queued", "running", "done", "failed" or "cancelled"), the number of 'attempts', the
+              'audio_path' of the recording and the 'error' of the last failed attempt, along with an HTTP status
+              code of 200.
+            - On error: A JSON object containing an error message, with an appropriate
+              HTTP status code (404 for an unknown job, 500 for server errors).
+    """
+    try:
+        job = job_queue.get_user_job(current_user, job_id)
+    except actions.UnauthorizedUserException as e:
+        return jsonify({'error': str(e)}), 404
+
+    try:
+        return jsonify({'success': True, 'data': {
+            'status': job.status,
+            'attempts': job.attempts,
+            'audio_path': job.audio_path,
+            'error': job.error,
+        }}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@transcription_bp.route('/admission', methods=['GET'])
+@login_required
+def get_admission_status():
+    """
+    Endpoint for the load of the analysis pipelines and the authenticated user's position in their wait queue.
+
+    The dashboard polls this endpoint while an upload waits for a free pipeline.
+
+    Returns:
+        Response (JSON):
+            - On success: The number of 'running' pipelines, their 'capacity', the number of 'queued' uploads, the
+              1-based queue 'positions' of the user's waiting uploads, the 'estimated_wait_seconds' of the first of
+              them and the user's 'quota_seconds' (0 if unlimited) and 'used_seconds' of today, along with an HTTP
+              status code of 200.
+            - On error: A JSON object containing an error message with an HTTP status code of 500.
+    """
+    try:
+        status = admission.get_admission_controller().get_status(current_user.id)
+        status["quota_seconds"] = current_app.config.get("USER_DAILY_AUDIO_SECONDS", 0)
+        status["used_seconds"] = actions.get_daily_audio_seconds(current_user)
+        return jsonify({'success': True, 'data': status}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@transcription_bp.route('/admin/profiles', methods=['GET'])
+@profiling.admin_token_required
+def list_profiles():
+    """
+    Endpoint for the admins to list the stored profiles of the analysis pipeline.
+
+    Profiles are captured for uploads carrying the admin token in the `X-Profile-Token` header and for a random
+    sample of `PROFILING_SAMPLE_RATE` of all uploads. Requires the admin token in the `X-Profile-Token` header.
+
+    Returns:
+        Response (JSON):
+            - On success: The 'name', 'recording_id', 'created_at' and 'size' of each profile, newest first, along
+              with an HTTP status code of 200.
+            - Error (404): If the request does not carry the admin token.
+    """
+    return jsonify({'success': True, 'data': profiling.list_profiles()}), 200
+
+@transcription_bp.route('/admin/profiles/<name>', methods=['GET'])
+@profiling.admin_token_required
+def download_profile(name):
+    """
+    Endpoint for the admins to download a stored profile of the analysis pipeline.
+
+    The profile is downloaded in the binary format of `pstats`, which e.g. snakeviz displays, or with the query
+    parameter `format=text` as report of the functions with the highest cumulative time.
+    Requires the admin token in the `X-Profile-Token` header.
+
+    Returns:
+        Response:
+            - On success: The profile file or its text report with an HTTP status code of 200.
+            - Error (404): If the request does not carry the admin token or the profile does not exist.
+    """
+    try:
+        if request.args.get('format') == 'text':
+            return Response(profiling.format_profile(name), mimetype='text/plain')
+        return send_file(os.path.abspath(profiling.get_profile_path(name)), mimetype='application/octet-stream',
+                         as_attachment=True, download_name=name)
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
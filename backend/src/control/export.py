@@ -0,0 +1,126 @@
+import os
+import re
+import zipfile
+from datetime import datetime
+from models import AudioTranscription
+from backend.src.database import db
+import actions
+
+# Bytes read from a file per chunk. Only one chunk and its compressed output are held in memory.
+CHUNK_SIZE = 64 * 2**10
+
+# Number of recordings loaded from the database per query
+RECORDINGS_PER_PAGE = 100
+
+# Extensions of files which are compressed already and stored without compression, which would not shrink them
+COMPRESSED_EXTENSIONS = {".flac", ".opus", ".ogg", ".mp3", ".m4a", ".png", ".jpg", ".jpeg", ".npz"}
+
+# Files of a recording in the archive: the attribute of the recording with their path and their name in the archive
+EXPORTED_FILES = (
+    ("audio_path", "audio"),
+    ("transcription_path", "transcription"),
+    ("improved_text_path", "improved_text"),
+    ("speech_speed_graphic_path", "speech_speed"),
+    ("pitch_graphic_path", "pitch"),
+    ("energy_graphic_path", "energy"),
+)
+
+class _StreamBuffer:
+    """
+    Unseekable file object which collects the bytes written by `zipfile` until the generator passes them on.
+
+    `zipfile` writes to unseekable streams with data descriptors after each entry, so the archive is written in one
+    pass without seeking back to the local headers.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """
+        Returns the bytes written since the last call.
+        """
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _iter_user_recordings(user_id):
+    """
+    Yields the recordings of a user from the rows of `actions.query_user_recordings`, ordered by ID and loaded one
+    page at a time, so neither all recordings nor a long read transaction are held while the archive is streamed.
+    """
+    last_id = 0
+    while True:
+        recordings = (actions.query_user_recordings(user_id).filter(AudioTranscription.id > last_id)
+                      .order_by(AudioTranscription.id).limit(RECORDINGS_PER_PAGE).all())
+        # End the read transaction, the detached recordings keep their loaded attributes
+        for recording in recordings:
+            db.session.expunge(recording)
+        db.session.rollback()
+        if not recordings:
+            return
+        yield from recordings
+        last_id = recordings[-1].id
+
+def get_recording_folder(recording):
+    """
+    Returns the folder of a recording in the archive: its creation time, title and ID, e.g.
+    "2024-05-01_14-30-00_Weekly_update_12".
+    """
+    title = re.sub(r"[^\w-]+", "_", recording.title or "").strip("_")[:60] or "recording"
+    return f"{recording.created_at.strftime('%Y-%m-%d_%H-%M-%S')}_{title}_{recording.id}"
+
+def _write_file(archive, buffer, filepath, archive_name):
+    """
+    Writes a file into the archive in chunks, yielding the archive bytes after each chunk.
+    """
+    stat = os.stat(filepath)
+    info = zipfile.ZipInfo(archive_name, date_time=datetime.fromtimestamp(stat.st_mtime).timetuple()[:6])
+    info.file_size = stat.st_size  # Lets zipfile decide on the ZIP64 extensions for large files up front
+    extension = os.path.splitext(filepath)[1].lower()
+    info.compress_type = zipfile.ZIP_STORED if extension in COMPRESSED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+    with open(filepath, 'rb') as file, archive.open(info, mode='w') as entry:
+        while chunk := file.read(CHUNK_SIZE):
+            entry.write(chunk)
+            yield buffer.drain()
+    yield buffer.drain()
+
+def stream_user_archive(user_id):
+    """
+    Streams a ZIP archive of all recordings of a user with their transcription, improved text and graphics.
+
+    The archive is generated while it is sent: files are read in chunks of `CHUNK_SIZE` and compressed audio and
+    graphics are stored as they are. Memory stays constant regardless of the size of the library, and no
+    temporary files are written. Each recording is a folder (see `get_recording_folder`) which also contains the
+    summary; files missing on disk are skipped.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Yields:
+        bytes: The next part of the archive.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for recording in _iter_user_recordings(user_id):
+            folder = get_recording_folder(recording)
+            for attribute, name in EXPORTED_FILES:
+                filepath = getattr(recording, attribute)
+                if filepath and os.path.isfile(filepath):
+                    archive_name = f"{folder}/{name}{os.path.splitext(filepath)[1].lower()}"
+                    yield from _write_file(archive, buffer, filepath, archive_name)
+
+            if recording.summary:
+                archive.writestr(f"{folder}/summary.txt", recording.summary)
+                yield buffer.drain()
+
+    # The central directory is written when the archive is closed
+    yield buffer.drain()
@@ -0,0 +1,411 @@
+import time
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, update, func
+from flask import current_app
+from models import AudioTranscription, TranscriptionJob, User
+from profiles import get_profile
+from transcriber import Model
+from backend.src.database import db
+import actions
+import audio_loader
+import profiling
+import cancellation
+
+# Queue of the uploads which are transcribed and analyzed by the workers
+TRANSCRIPTION_QUEUE = "transcription"
+
+# Number of claimable jobs a worker tries to claim atomically before it polls again on databases without SKIP LOCKED
+CLAIM_CANDIDATES = 5
+
+def estimate_cost(audio_filepath, profile_name=None):
+    """
+    Returns the estimated seconds of processing of a stored audio file: its duration, read from the WAV header or
+    probed for compressed files, times the realtime factor of the quality profile.
+
+    Args:
+        audio_filepath (str): The path to the stored audio file.
+        profile_name (str): The quality profile of the analysis. Defaults to None, the default profile.
+
+    Returns:
+        float: The estimated seconds of processing.
+    """
+    profile = get_profile(profile_name or current_app.config.get("QUALITY_PROFILE"))
+    return audio_loader.get_duration(audio_filepath) * profile["realtime_factor"]
+
+def get_schedule_key(user_id, estimated_cost, queue=TRANSCRIPTION_QUEUE):
+    """
+    Returns the key of a new job by which the workers claim the jobs, the smallest first.
+
+    The key is the time of queueing plus the estimated cost of the job and of the user's queued jobs which are not
+    longer, weighted with `JOB_COST_WEIGHT` seconds of waiting per second of cost:
+        - Shortest job first: a short job is claimed before longer jobs queued up to its weighted cost earlier.
+        - Aging: the key of a job is fixed while the keys of new jobs grow with the time, so long jobs are claimed
+          eventually instead of starving behind a stream of short ones.
+        - Fairness: the backlog of a user who queued many jobs pushes their new jobs back, so the jobs of other
+          users are claimed in between. Longer jobs of the user do not count, so a memo still overtakes the
+          user's own long recording.
+
+    Args:
+        user_id (int): The ID of the user who owns the job.
+        estimated_cost (float): The estimated seconds of processing of the job, see `estimate_cost`.
+        queue (str): The queue of the job. Defaults to `TRANSCRIPTION_QUEUE`.
+
+    Returns:
+        float: The schedule key.
+    """
+    backlog = db.session.query(func.coalesce(func.sum(TranscriptionJob.estimated_cost), 0.0)).filter(
+        TranscriptionJob.queue == queue, TranscriptionJob.user_id == user_id,
+        TranscriptionJob.status == "queued", TranscriptionJob.estimated_cost <= estimated_cost).scalar()
+    return time.time() + current_app.config.get("JOB_COST_WEIGHT", 1.0) * (estimated_cost + backlog)
+
+def enqueue_job(user_id, audio_filepath, profile_name=None, queue=TRANSCRIPTION_QUEUE, charge=None):
+    """
+    Queues the transcription and analysis of a stored audio file, ordered by its estimated cost, see
+    `get_schedule_key`.
+
+    Args:
+        user_id (int): The ID of the user who owns the recording.
+        audio_filepath (str): The path to the stored audio file.
+        profile_name (str): The quality profile of the analysis. Defaults to None, the default profile.
+        queue (str): The queue of the job. Defaults to `TRANSCRIPTION_QUEUE`.
+        charge (callable): Called before the job is stored, to change the database in the same transaction, e.g.
+                           to add the upload to the user's daily quota only if the job is queued. Defaults to None.
+
+    Returns:
+        TranscriptionJob: The queued job.
+
+    Raises:
+        RuntimeError: If the job cannot be stored in the database.
+    """
+    try:
+        estimated_cost = estimate_cost(audio_filepath, profile_name)
+        job = TranscriptionJob(queue=queue, user_id=user_id, audio_path=audio_filepath, profile=profile_name,
+                               estimated_cost=estimated_cost,
+                               schedule_key=get_schedule_key(user_id, estimated_cost, queue))
+        if charge is not None:
+            charge()
+        db.session.add(job)
+        db.session.commit()
+        return job
+    except Exception as e:
+        db.session.rollback()
+        raise RuntimeError(f"Failed to queue {audio_filepath}: {str(e)}")
+
+def _claimable(queue, now):
+    """
+    Returns the condition of jobs which can be claimed: queued jobs and running jobs whose lease expired.
+    """
+    return and_(
+        TranscriptionJob.queue == queue,
+        or_(
+            TranscriptionJob.status == "queued",
+            and_(TranscriptionJob.status == "running", TranscriptionJob.lease_expires_at < now),
+        ),
+    )
+
+def _discard_audio_of_failed_jobs(job_ids):
+    """
+    Removes the audio files and partial outputs of failed jobs, which are not processed again. The files of a job
+    whose recording was saved before its worker crashed are kept.
+    """
+    failed_jobs = (db.session.query(TranscriptionJob.audio_path)
+                   .filter(TranscriptionJob.id.in_(job_ids), TranscriptionJob.status == "failed").all())
+    for audio_path, in failed_jobs:
+        if not AudioTranscription.query.filter_by(audio_path=audio_path).first():
+            actions.discard_audio(audio_path)
+    db.session.commit()
+
+def fail_exhausted_jobs(queue, max_attempts):
+    """
+    Marks running jobs as failed whose lease expired after their last allowed attempt, e.g. because every attempt
+    crashed its worker. Their recordings would otherwise be claimed again forever. Their audio files are removed.
+
+    Args:
+        queue (str): The queue of the jobs.
+        max_attempts (int): The maximum number of attempts per job.
+
+    Returns:
+        int: The number of failed jobs.
+    """
+    now = datetime.now()
+    exhausted = and_(TranscriptionJob.queue == queue, TranscriptionJob.status == "running",
+                     TranscriptionJob.lease_expires_at < now, TranscriptionJob.attempts >= max_attempts)
+    job_ids = [job_id for job_id, in db.session.query(TranscriptionJob.id).filter(exhausted)]
+    db.session.commit()  # End the read transaction, so the update below does not upgrade a stale snapshot
+    if not job_ids:
+        return 0
+
+    result = db.session.execute(
+        update(TranscriptionJob)
+        .where(TranscriptionJob.id.in_(job_ids), exhausted)
+        .values(status="failed", lease_owner=None, lease_expires_at=None, finished_at=now,
+                error=f"Lease expired after {max_attempts} attempts")
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    _discard_audio_of_failed_jobs(job_ids)
+    return result.rowcount
+
+def claim_job(worker_id, lease_seconds, queue=TRANSCRIPTION_QUEUE):
+    """
+    Claims the claimable job of a queue with the smallest schedule key for a worker and leases it. Jobs which are
+    queued again after a failed attempt or an expired lease keep their key, so they are claimed again soon.
+
+    On PostgreSQL the job is selected with `SELECT ... FOR UPDATE SKIP LOCKED`, so concurrent workers never wait
+    for each other. Other databases, e.g. SQLite, claim with an atomic conditional update which only succeeds if
+    the job is still claimable (compare-and-set); a worker losing the race tries the next candidate.
+
+    Args:
+        worker_id (str): The unique ID of the claiming worker.
+        lease_seconds (float): The duration of the lease. The worker must renew it with `heartbeat` before it expires.
+        queue (str): The queue to claim from. Defaults to `TRANSCRIPTION_QUEUE`.
+
+    Returns:
+        TranscriptionJob: The claimed job, or None if no job is claimable.
+    """
+    now = datetime.now()
+    lease = {
+        "status": "running",
+        "lease_owner": worker_id,
+        "lease_expires_at": now + timedelta(seconds=lease_seconds),
+        "started_at": now,
+    }
+
+    if db.engine.dialect.name == "postgresql":
+        job = (TranscriptionJob.query.filter(_claimable(queue, now))
+               .order_by(TranscriptionJob.schedule_key, TranscriptionJob.id)
+               .with_for_update(skip_locked=True).first())
+        if job is not None:
+            for column, value in lease.items():
+                setattr(job, column, value)
+            job.attempts += 1
+        db.session.commit()
+        return job
+
+    candidate_ids = [job_id for job_id, in db.session.query(TranscriptionJob.id).filter(_claimable(queue, now))
+                     .order_by(TranscriptionJob.schedule_key, TranscriptionJob.id).limit(CLAIM_CANDIDATES)]
+    db.session.commit()  # End the read transaction, so the updates below do not upgrade a stale snapshot
+
+    for job_id in candidate_ids:
+        result = db.session.execute(
+            update(TranscriptionJob)
+            .where(TranscriptionJob.id == job_id, _claimable(queue, now))
+            .values(attempts=TranscriptionJob.attempts + 1, **lease)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount == 1:
+            return db.session.get(TranscriptionJob, job_id, populate_existing=True)
+
+    return None
+
+def heartbeat(job_id, worker_id, lease_seconds):
+    """
+    Renews the lease of a running job.
+
+    Args:
+        job_id (int): The ID of the job.
+        worker_id (str): The ID of the worker holding the lease.
+        lease_seconds (float): The new duration of the lease from now.
+
+    Returns:
+        bool: Whether the worker still held the lease. If not, another worker took the job over.
+    """
+    result = db.session.execute(
+        update(TranscriptionJob)
+        .where(TranscriptionJob.id == job_id, TranscriptionJob.lease_owner == worker_id,
+               TranscriptionJob.status == "running")
+        .values(lease_expires_at=datetime.now() + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def finish_job(job_id, worker_id, recording_id=None, error=None, retry=False):
+    """
+    Releases the lease of a job and records its result, if the worker still holds the lease. The audio file of a
+    job which failed for the last time is removed.
+
+    Args:
+        job_id (int): The ID of the job.
+        worker_id (str): The ID of the worker holding the lease.
+        recording_id (int): The ID of the resulting AudioTranscription. Defaults to None.
+        error (str): The error of a failed attempt. Defaults to None, the job succeeded.
+        retry (bool): Whether a failed job is queued again for another attempt. Defaults to False.
+
+    Returns:
+        bool: Whether the worker still held the lease and the result was recorded.
+    """
+    if error is None:
+        values = {"status": "done", "recording_id": recording_id, "error": None, "finished_at": datetime.now()}
+    elif retry:
+        values = {"status": "queued", "error": error}
+    else:
+        values = {"status": "failed", "error": error, "finished_at": datetime.now()}
+
+    result = db.session.execute(
+        update(TranscriptionJob)
+        .where(TranscriptionJob.id == job_id, TranscriptionJob.lease_owner == worker_id,
+               TranscriptionJob.status == "running")
+        .values(lease_owner=None, lease_expires_at=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    if result.rowcount == 1 and values["status"] == "failed":
+        _discard_audio_of_failed_jobs([job_id])
+    return result.rowcount == 1
+
+def process_transcription_job(job):
+    """
+    Transcribes and analyzes the audio file of a job with `actions.transcribe_and_analyse`.
+
+    Jobs are processed at least once, so a job may be processed again after its worker stored the recording but
+    crashed before marking the job as done. The existing recording is then reused instead of analyzing it again.
+    The audio file and partial outputs of a job cancelled by `actions.cancel_pipelines` are removed.
+
+    Args:
+        job (TranscriptionJob): The claimed job.
+
+    Returns:
+        int: The ID of the resulting AudioTranscription.
+    """
+    recording = AudioTranscription.query.filter_by(audio_path=job.audio_path).first()
+    if recording is None:
+        user = db.session.get(User, job.user_id)
+        profile_name = job.profile or current_app.config.get("QUALITY_PROFILE")
+        transcriber = Model.for_profile(get_profile(profile_name))
+        try:
+            profiling.run_profiled(profiling.should_profile(), job.audio_path, actions.transcribe_and_analyse,
+                                   transcriber, user, job.audio_path, profile_name)
+        except cancellation.PipelineCancelled:
+            # Remove the partial outputs of a cancelled or deleted job, but not of a job which another worker took over
+            db.session.rollback()
+            current_job = db.session.get(TranscriptionJob, job.id)
+            if current_job is None or current_job.status == "cancelled":
+                actions.discard_audio(job.audio_path)
+            raise
+        recording = AudioTranscription.query.filter_by(audio_path=job.audio_path).first()
+    return recording.id
+
+class _LeaseKeeper(threading.Thread):
+    """
+    Renews the lease of a job in the background while the worker processes it.
+
+    If the lease is lost, because the job was cancelled or taken over by another worker, the cancellation token of
+    the job is cancelled, so the worker stops processing it.
+    """
+
+    def __init__(self, app, job_id, worker_id, lease_seconds, interval, token):
+        super().__init__(daemon=True)
+        self.app = app
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.interval = interval
+        self.token = token
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        # The thread has its own app context and therefore its own database session
+        with self.app.app_context():
+            while not self.stopped.wait(self.interval):
+                try:
+                    if not heartbeat(self.job_id, self.worker_id, self.lease_seconds):
+                        self.lost = True
+                        self.token.cancel()
+                        return
+                except Exception:
+                    db.session.rollback()  # Try again with the next heartbeat, the lease has not expired yet
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+def run_worker(worker_id, queue=TRANSCRIPTION_QUEUE, handler=process_transcription_job, lease_seconds=60,
+               poll_interval=2.0, max_attempts=3, max_jobs=None, until_empty=False, stop_event=None,
+               on_job=None):
+    """
+    Claims and processes jobs of a queue until it is stopped.
+
+    While a job is processed, its lease is renewed every third of the lease duration. Failed jobs are queued
+    again until they reached the maximum number of attempts. A job which is cancelled while it is processed stops
+    after the next renewal of its lease.
+
+    Args:
+        worker_id (str): The unique ID of the worker, e.g. host name and process ID.
+        queue (str): The queue to process. Defaults to `TRANSCRIPTION_QUEUE`.
+        handler (callable): Processes a claimed job and returns the ID of the resulting recording.
+                            Defaults to `process_transcription_job`.
+        lease_seconds (float): The duration of a lease. Defaults to 60.
+        poll_interval (float): Seconds to wait before polling again when no job is claimable. Defaults to 2.
+        max_attempts (int): The maximum number of attempts per job. Defaults to 3.
+        max_jobs (int): Stop after this number of jobs. Defaults to None, no limit.
+        until_empty (bool): Stop when the queue has no queued or running jobs left. Defaults to False.
+        stop_event (threading.Event): Stop when this event is set. Defaults to None.
+        on_job (callable): Called with the job ID and the error message (None on success) of each job.
+                           Defaults to None.
+
+    Returns:
+        int: The number of processed jobs.
+    """
+    app = current_app._get_current_object()
+    processed_count = 0
+
+    while not (stop_event and stop_event.is_set()) and (max_jobs is None or processed_count < max_jobs):
+        fail_exhausted_jobs(queue, max_attempts)
+        job = claim_job(worker_id, lease_seconds, queue)
+
+        if job is None:
+            if until_empty and not TranscriptionJob.query.filter(
+                    TranscriptionJob.queue == queue, TranscriptionJob.status.in_(("queued", "running"))).first():
+                break
+            db.session.commit()
+            time.sleep(poll_interval)
+            continue
+
+        token = cancellation.CancellationToken()
+        lease_keeper = _LeaseKeeper(app, job.id, worker_id, lease_seconds, lease_seconds / 3, token)
+        lease_keeper.start()
+        try:
+            with cancellation.activate(token):
+                recording_id = handler(job)
+            error = None
+        except cancellation.PipelineCancelled:
+            # The job is no longer running for this worker, so `finish_job` leaves it unchanged
+            db.session.rollback()
+            recording_id = None
+            error = "Cancelled"
+        except Exception as e:
+            db.session.rollback()
+            recording_id = None
+            error = str(e)
+        finally:
+            lease_keeper.stop()
+
+        finish_job(job.id, worker_id, recording_id, error, retry=job.attempts < max_attempts)
+        processed_count += 1
+        if on_job:
+            on_job(job.id, error)
+
+    return processed_count
+
+def get_user_job(current_user, job_id):
+    """
+    Returns a job of the authenticated user.
+
+    Args:
+        current_user (User): The authenticated user.
+        job_id (int): The ID of the job.
+
+    Returns:
+        TranscriptionJob: The job.
+
+    Raises:
+        actions.UnauthorizedUserException: If the user has no job with this ID.
+    """
+    job = TranscriptionJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if job is None:
+        raise actions.UnauthorizedUserException(f"No job {job_id} found for the current user.")
+    return job
@@ -0,0 +1,324 @@
+import io
+import os
+import re
+import time
+import json
+import math
+import uuid
+import wave
+import random
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import http.cookiejar
+from contextlib import contextmanager
+from werkzeug.serving import make_server
+from transcriber import Model
+from models import User
+from backend.src.database import db
+import utils.utils as utils
+import audio_loader
+import transformer
+import actions
+
+# Words of the stub transcripts
+STUB_WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit", "sed", "do")
+
+# Seconds per word and words per segment of the stub transcripts
+STUB_WORD_SECONDS = 0.4
+STUB_SEGMENT_WORDS = 12
+
+# Sample rate of the synthetic uploads
+SYNTHETIC_SAMPLE_RATE = 16000
+
+# Password of the simulated users
+LOAD_TEST_PASSWORD = "load-test-password"
+
+class StubModel(Model):
+    """
+    Stands in for the Whisper model: sleeps instead of transcribing and returns a made-up transcript.
+
+    The transcript has one word every `STUB_WORD_SECONDS` with word timings, so the analytics and the search index
+    process it like a real one.
+    """
+
+    def __init__(self, latency):
+        """
+        Args:
+            latency (float): The seconds a transcription takes.
+        """
+        self.whisper_model = "stub"
+        self.beam_size = None
+        self.temperature_fallback = False
+        self.latency = latency
+
+    def transcribe_raw_audio(self, audio_filepath):
+        time.sleep(self.latency)
+
+        duration = audio_loader.get_duration(audio_filepath)
+        words = [
+            {"word": f" {STUB_WORDS[index % len(STUB_WORDS)]}", "start": index * STUB_WORD_SECONDS,
+             "end": (index + 1) * STUB_WORD_SECONDS}
+            for index in range(int(duration / STUB_WORD_SECONDS))
+        ]
+        segments = []
+        for start in range(0, len(words), STUB_SEGMENT_WORDS):
+            segment_words = words[start:start + STUB_SEGMENT_WORDS]
+            segments.append({"id": len(segments), "start": segment_words[0]["start"], "end": segment_words[-1]["end"],
+                             "text": "".join(word["word"] for word in segment_words), "words": segment_words})
+
+        transcription = "".join(word["word"] for word in words).strip()
+        filepath = self.save_transcription_to_file(transcription, audio_filepath)
+        return filepath, segments, len(words), "en"
+
+    def transcribe_raw_audio_batch(self, audio_filepaths, batch_size=8):
+        return [self.transcribe_raw_audio(audio_filepath) for audio_filepath in audio_filepaths]
+
+@contextmanager
+def stub_models(transcription_latency, summary_latency, improve_latency):
+    """
+    Replaces Whisper and BART with stubs of a fixed latency while the context is active.
+
+    Args:
+        transcription_latency (float): The seconds a transcription takes.
+        summary_latency (float): The seconds the generation of a title or summary takes.
+        improve_latency (float): The seconds the improvement of a text takes.
+    """
+    stub_model = StubModel(transcription_latency)
+
+    def generate_summary(filepath, min_length, max_length, num_beams=4):
+        time.sleep(summary_latency)
+        with open(filepath, 'r') as file:
+            return " ".join(file.read().split()[:max_length])
+
+    def improve_text(filepath, num_beams=4):
+        time.sleep(improve_latency)
+        with open(filepath, 'r') as file:
+            return file.read()
+
+    originals = (Model.__dict__["for_profile"], transformer.generate_summary, transformer.improve_text)
+    Model.for_profile = classmethod(lambda cls, profile: stub_model)
+    transformer.generate_summary = generate_summary
+    transformer.improve_text = improve_text
+    try:
+        yield
+    finally:
+        Model.for_profile, transformer.generate_summary, transformer.improve_text = originals
+
+def generate_synthetic_audio(duration):
+    """
+    Returns a WAV file of a tone with varying pitch and loudness, resembling the contour of speech.
+
+    Args:
+        duration (float): The duration in seconds.
+
+    Returns:
+        bytes: The 16-bit mono WAV file.
+    """
+    frame_count = int(duration * SYNTHETIC_SAMPLE_RATE)
+    samples = bytearray()
+    phase = 0.0
+    for index in range(frame_count):
+        t = index / SYNTHETIC_SAMPLE_RATE
+        frequency = 150 + 50 * math.sin(2 * math.pi * 0.5 * t)  # Pitch between 100 and 200 Hz
+        phase += 2 * math.pi * frequency / SYNTHETIC_SAMPLE_RATE
+        amplitude = 0.3 * (0.5 + 0.5 * math.sin(2 * math.pi * 2 * t)) ** 2  # Syllable-like loudness
+        samples += int(32767 * amplitude * math.sin(phase)).to_bytes(2, "little", signed=True)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SYNTHETIC_SAMPLE_RATE)
+        wav_file.writeframes(bytes(samples))
+    return buffer.getvalue()
+
+def percentile(sorted_values, fraction):
+    """
+    Returns the nearest-rank percentile of sorted values, e.g. the median for a fraction of 0.5.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+class _Recorder:
+    """
+    Collects the latency and status of every request by endpoint from all simulated users.
+    """
+
+    def __init__(self):
+        self.requests = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds, status):
+        with self.lock:
+            self.requests.setdefault(endpoint, []).append((seconds, status))
+
+class _NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """
+    Reports redirects as responses instead of following them, so a successful login is recognized by its redirect.
+    """
+
+    def redirect_request(self, request, fp, code, message, headers, new_url):
+        return None
+
+class _SimulatedUser:
+    """
+    A browser session of a simulated user with its own cookies, sending the requests of the dashboard.
+    """
+
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+                                                  _NoRedirectHandler())
+
+    def request(self, endpoint, path, data=None, headers=None):
+        """
+        Sends a request and records its latency and status under the endpoint name.
+
+        Returns:
+            tuple: The status code and the response body.
+        """
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers or {})
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        except OSError:
+            status, body = None, b""  # The connection failed, e.g. because the server was overloaded
+        self.recorder.record(endpoint, time.perf_counter() - start, status)
+        return status, body
+
+    def post_json(self, endpoint, path, payload):
+        return self.request(endpoint, path, json.dumps(payload).encode("utf-8"), {"Content-Type": "application/json"})
+
+    def login(self, email):
+        # The login form is protected against CSRF, so its token is taken from the login page like a browser does
+        _, page = self.request("GET /login", "/login")
+        match = re.search(rb'name="csrf_token"[^>]*value="([^"]*)"', page)
+        form = {"email": email, "password": LOAD_TEST_PASSWORD, "csrf_token": match.group(1).decode() if match else ""}
+        status, _ = self.request("POST /login", "/login", urllib.parse.urlencode(form).encode("utf-8"),
+                                 {"Content-Type": "application/x-www-form-urlencoded"})
+        return status == 302  # A failed login renders the login page again
+
+    def upload(self, audio, filename):
+        boundary = uuid.uuid4().hex
+        body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"audio\"; filename=\"{filename}\"\r\n"
+                f"Content-Type: audio/wav\r\n\r\n").encode("utf-8") + audio + f"\r\n--{boundary}--\r\n".encode("utf-8")
+        status, body = self.request("POST /store_and_analyze", "/store_and_analyze", body,
+                                    {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+        return json.loads(body).get("dropdown_value") if status == 201 else None
+
+    def run(self, email, audio, iterations, list_polls, think_seconds):
+        """
+        Logs in and repeats the dashboard workflow: upload a recording, poll the file list, open the analytics of
+        the recording and delete it.
+        """
+        if not self.login(email):
+            return
+
+        for iteration in range(iterations):
+            audio_filepath = self.upload(audio, f"load_test_{uuid.uuid4().hex[:8]}.wav")
+            for _ in range(list_polls):
+                self.request("GET /list-files", "/list-files")
+                time.sleep(think_seconds * random.random())
+            if audio_filepath:
+                self.post_json("POST /get-analytics", "/get-analytics", {"recording": audio_filepath})
+                self.post_json("POST /delete-file", "/delete-file", {"filePath": audio_filepath})
+            time.sleep(think_seconds * random.random())
+
+def run_load_test(user_count=8, iterations=3, audio_seconds=10.0, list_polls=3, think_seconds=0.5,
+                  transcription_latency=2.0, summary_latency=0.5, improve_latency=1.0, config_overrides=None):
+    """
+    Simulates concurrent users of the dashboard against the app with stub models and measures the latencies.
+
+    The app is created with a temporary SQLite database and served by a threaded server in this process. Whisper
+    and BART are replaced by stubs of a fixed latency, while the audio processing, graphics, database and search
+    index run as in production. Every simulated user logs in through the login form, uploads synthetic recordings,
+    polls `/list-files`, opens `/get-analytics` and deletes the recordings again.
+
+    Args:
+        user_count (int): The number of concurrent users. Defaults to 8.
+        iterations (int): The number of recordings each user uploads. Defaults to 3.
+        audio_seconds (float): The duration of the synthetic recordings. Defaults to 10.
+        list_polls (int): The number of `/list-files` requests after each upload. Defaults to 3.
+        think_seconds (float): The maximum random pause between the requests of a user. Defaults to 0.5.
+        transcription_latency (float): The seconds a stub transcription takes. Defaults to 2.
+        summary_latency (float): The seconds a stub title or summary takes. Defaults to 0.5.
+        improve_latency (float): The seconds a stub text improvement takes. Defaults to 1.
+        config_overrides (dict): Config of the tested app, e.g. `MAX_CONCURRENT_PIPELINES`. Defaults to None.
+
+    Returns:
+        dict: The "wall_seconds", the overall "requests_per_second" and per endpoint the "count", "errors" (failed
+              connections and status codes from 400 on, e.g. 429 of the admission control), "throughput" per second and latency "p50", "p95", "p99" and "max" in seconds.
+    """
+    from app import create_app
+
+    database_file_descriptor, database_filepath = tempfile.mkstemp(prefix="load_test_", suffix=".db")
+    os.close(database_file_descriptor)
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{database_filepath}", "PROCESSING_MODE": "inline",
+                      **(config_overrides or {})})
+
+    with app.app_context():
+        db.create_all()
+        from routes import bcrypt
+        password = bcrypt.generate_password_hash(LOAD_TEST_PASSWORD).decode("utf-8")
+        emails = [f"load-test-{index}@example.com" for index in range(user_count)]
+        db.session.add_all([User(username=f"loadtest{index}", email=email, password=password)
+                            for index, email in enumerate(emails)])
+        db.session.commit()
+
+    utils.generate_output_directory(actions.AUDIO_FOLDER)  # Uploads are stored there before any output exists
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    recorder = _Recorder()
+    audio = generate_synthetic_audio(audio_seconds)
+
+    try:
+        with stub_models(transcription_latency, summary_latency, improve_latency):
+            server_thread.start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+            users = [threading.Thread(target=_SimulatedUser(base_url, recorder).run,
+                                      args=(email, audio, iterations, list_polls, think_seconds))
+                     for email in emails]
+
+            start = time.perf_counter()
+            for user in users:
+                user.start()
+            for user in users:
+                user.join()
+            wall_seconds = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        # Remove the recordings left by failed deletions together with their files
+        with app.app_context():
+            for user in User.query.all():
+                actions.cleanup(user)
+            db.session.commit()
+            db.session.remove()
+            db.engine.dispose()
+        os.remove(database_filepath)
+
+    endpoints = {}
+    for endpoint, requests in sorted(recorder.requests.items()):
+        latencies = sorted(seconds for seconds, _ in requests)
+        endpoints[endpoint] = {
+            "count": len(requests),
+            "errors": sum(status is None or status >= 400 for _, status in requests),
+            "throughput": len(requests) / wall_seconds,
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1],
+        }
+
+    return {
+        "wall_seconds": wall_seconds,
+        "requests_per_second": sum(endpoint["count"] for endpoint in endpoints.values()) / wall_seconds,
+        "endpoints": endpoints,
+    }
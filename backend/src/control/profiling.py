@@ -0,0 +1,180 @@
+import io
+import os
+import re
+import hmac
+import pstats
+import random
+import cProfile
+import threading
+from datetime import datetime
+from functools import wraps
+from flask import current_app, request, jsonify, has_request_context
+from models import AudioTranscription
+
+# Header with which an admin requests a profile of an upload and authenticates at the profile endpoints
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+
+# File names of stored profiles: the ID of the profiled recording and the time of the profile
+PROFILE_FILENAME_PATTERN = re.compile(r"^recording_(\d+)_(\d{8}T\d{6})\.prof$")
+
+# Only one profiler can be active per process from Python 3.12 on, further requests run unprofiled meanwhile
+_profiler_lock = threading.Lock()
+
+def _is_admin_request():
+    """
+    Returns whether the request carries the configured admin token. Without a configured token nobody is admin.
+    """
+    token = current_app.config.get("PROFILING_ADMIN_TOKEN")
+    supplied_token = request.headers.get(PROFILE_TOKEN_HEADER)
+    return bool(token) and supplied_token is not None and hmac.compare_digest(supplied_token, token)
+
+def should_profile():
+    """
+    Returns whether the pipeline of the current request is profiled.
+
+    A request is profiled if it carries the admin token in the `X-Profile-Token` header, or else with the
+    probability `PROFILING_SAMPLE_RATE`. Outside of a request only the sampling applies.
+    """
+    if has_request_context() and _is_admin_request():
+        return True
+    sample_rate = current_app.config.get("PROFILING_SAMPLE_RATE", 0.0)
+    return sample_rate > 0 and random.random() < sample_rate
+
+def run_profiled(profile, audio_filepath, pipeline, *args):
+    """
+    Runs a pipeline, e.g. `actions.transcribe_and_analyse`, and stores its profile keyed by the resulting recording.
+
+    Without profiling the pipeline is called directly, so the overhead is a single check. The deterministic cProfile
+    profiler records the calls of the current thread only; the parallel batches of `transformer.improve_text` appear
+    as the time their thread pool waits. Failed pipelines have no recording and are not stored.
+
+    Args:
+        profile (bool): Whether to profile the pipeline, see `should_profile`.
+        audio_filepath (str): The path to the stored audio file of the recording created by the pipeline.
+        pipeline (callable): The pipeline to run.
+        *args: The arguments of the pipeline.
+
+    Returns:
+        The result of the pipeline.
+    """
+    if not profile or not _profiler_lock.acquire(blocking=False):
+        return pipeline(*args)
+
+    try:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = pipeline(*args)
+        finally:
+            profiler.disable()
+    finally:
+        _profiler_lock.release()
+
+    recording = AudioTranscription.query.filter_by(audio_path=audio_filepath).first()
+    if recording is not None:
+        save_profile(profiler, recording.id)
+    return result
+
+def get_profiles_directory():
+    """
+    Returns the directory of the stored profiles, creating it on first use.
+    """
+    directory = current_app.config.get("PROFILES_DIR", "profiles")
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def save_profile(profiler, recording_id):
+    """
+    Stores the statistics of a profiler for a recording.
+
+    Args:
+        profiler (cProfile.Profile): The disabled profiler.
+        recording_id (int): The ID of the profiled recording.
+
+    Returns:
+        str: The file name of the profile.
+    """
+    filename = f"recording_{recording_id}_{datetime.now().strftime('%Y%m%dT%H%M%S')}.prof"
+    profiler.dump_stats(os.path.join(get_profiles_directory(), filename))
+    return filename
+
+def list_profiles():
+    """
+    Returns the stored profiles, newest first.
+
+    Returns:
+        list of dict: The "name", "recording_id", "created_at" (ISO format) and "size" in bytes of each profile.
+    """
+    directory = get_profiles_directory()
+    profiles = []
+    for filename in os.listdir(directory):
+        match = PROFILE_FILENAME_PATTERN.match(filename)
+        if match:
+            profiles.append({
+                "name": filename,
+                "recording_id": int(match.group(1)),
+                "created_at": datetime.strptime(match.group(2), "%Y%m%dT%H%M%S").isoformat(),
+                "size": os.path.getsize(os.path.join(directory, filename)),
+            })
+    return sorted(profiles, key=lambda profile: profile["created_at"], reverse=True)
+
+def get_profile_path(name):
+    """
+    Returns the path of a stored profile.
+
+    Args:
+        name (str): The file name of the profile as listed by `list_profiles`.
+
+    Returns:
+        str: The path of the profile.
+
+    Raises:
+        FileNotFoundError: If no profile of this name exists. Names other than those of profiles are rejected, so
+                           no other files can be read.
+    """
+    path = os.path.join(get_profiles_directory(), name)
+    if not PROFILE_FILENAME_PATTERN.match(name) or not os.path.isfile(path):
+        raise FileNotFoundError(f"No profile {name} found.")
+    return path
+
+def format_profile(name, limit=40):
+    """
+    Returns the functions of a stored profile with the highest cumulative time as text.
+
+    Args:
+        name (str): The file name of the profile.
+        limit (int): The number of listed functions. Defaults to 40.
+
+    Returns:
+        str: The report of `pstats`.
+    """
+    report = io.StringIO()
+    pstats.Stats(get_profile_path(name), stream=report).sort_stats("cumulative").print_stats(limit)
+    return report.getvalue()
+
+def remove_profiles(recording_ids):
+    """
+    Removes the stored profiles of deleted recordings.
+
+    Args:
+        recording_ids (list of int): The IDs of the recordings.
+    """
+    recording_ids = set(recording_ids)
+    directory = get_profiles_directory()
+    for filename in os.listdir(directory):
+        match = PROFILE_FILENAME_PATTERN.match(filename)
+        if match and int(match.group(1)) in recording_ids:
+            os.remove(os.path.join(directory, filename))
+
+def admin_token_required(view):
+    """
+    Restricts a view to requests carrying the admin token in the `X-Profile-Token` header.
+
+    The views respond with 404 to other requests, so their existence is not revealed.
+    """
+    @wraps(view)
+    def decorated_view(*args, **kwargs):
+        if not _is_admin_request():
+            return jsonify({"error": "Not found"}), 404
+        return view(*args, **kwargs)
+    return decorated_view
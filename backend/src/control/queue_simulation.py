@@ -0,0 +1,143 @@
+import os
+import time
+import tempfile
+import multiprocessing
+from models import TranscriptionJob, User
+from backend.src.database import db
+import job_queue
+
+# Queue of the simulated jobs, which the transcription workers never claim
+SIMULATION_QUEUE = "simulation"
+
+def _simulated_node(node_id, log_filepath, work_seconds, lease_seconds, crash_after, database_uri=None):
+    """
+    Runs a worker process which processes simulated jobs by sleeping instead of transcribing.
+
+    Every completed execution of a job is appended to the log file. A node with `crash_after` set exits abruptly
+    in the middle of that job without releasing its lease, like a machine losing power. A node with `database_uri`
+    set uses this database instead of the configured one.
+    """
+    if database_uri:
+        from app import create_app
+        app = create_app({"SQLALCHEMY_DATABASE_URI": database_uri})
+    else:
+        from app import app
+
+    def handle(job):
+        nonlocal executions
+        executions += 1
+        if crash_after is not None and executions > crash_after:
+            os._exit(1)  # Crash while holding the lease
+        time.sleep(work_seconds)
+        # Appends of a single short line are atomic, so the nodes can share the log file
+        with open(log_filepath, 'a') as log_file:
+            log_file.write(f"{job.id} node-{node_id}\n")
+        return None
+
+    executions = 0
+    with app.app_context():
+        job_queue.run_worker(f"node-{node_id}-{os.getpid()}", SIMULATION_QUEUE, handle, lease_seconds=lease_seconds,
+                             poll_interval=min(0.2, lease_seconds / 4), until_empty=True)
+
+def simulate_nodes(user_id, node_count=4, job_count=40, work_seconds=0.2, lease_seconds=2.0, crash_node=True,
+                   database_uri=None):
+    """
+    Simulates several worker nodes sharing the database to check the claiming, leases and re-queueing.
+
+    Simulated jobs are queued in a separate queue and processed by worker processes which sleep instead of
+    transcribing. Optionally the first node crashes in the middle of its second job, so its lease expires and
+    the job is taken over by another node. The simulated jobs are removed afterwards.
+
+    Args:
+        user_id (int): The ID of an existing user who owns the simulated jobs.
+        node_count (int): The number of worker processes. Defaults to 4.
+        job_count (int): The number of simulated jobs. Defaults to 40.
+        work_seconds (float): The processing time of a job. Defaults to 0.2.
+        lease_seconds (float): The duration of a lease. Defaults to 2.
+        crash_node (bool): Whether the first node crashes while holding a lease. Defaults to True.
+        database_uri (str): The database of the app context, passed to the nodes. Defaults to None, the configured
+                            database.
+
+    Returns:
+        dict: The number of "jobs", jobs "done", jobs never completed ("lost"), jobs completed by two nodes
+              ("duplicates"), the "crashed" node count, the "wall_seconds" and the throughput in "jobs_per_second".
+    """
+    TranscriptionJob.query.filter_by(queue=SIMULATION_QUEUE).delete()
+    db.session.add_all([TranscriptionJob(queue=SIMULATION_QUEUE, user_id=user_id, audio_path=f"simulated-{index}")
+                        for index in range(job_count)])
+    db.session.commit()
+
+    log_file_descriptor, log_filepath = tempfile.mkstemp(prefix="queue_simulation_", suffix=".log")
+    os.close(log_file_descriptor)
+
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    nodes = [
+        context.Process(target=_simulated_node,
+                        args=(node_id, log_filepath, work_seconds, lease_seconds,
+                              1 if crash_node and node_id == 0 else None, database_uri))
+        for node_id in range(node_count)
+    ]
+    try:
+        for node in nodes:
+            node.start()
+        for node in nodes:
+            node.join()
+        wall_seconds = time.perf_counter() - start
+
+        with open(log_filepath, 'r') as log_file:
+            completed_ids = [int(line.split()[0]) for line in log_file if line.strip()]
+
+        jobs = TranscriptionJob.query.filter_by(queue=SIMULATION_QUEUE).all()
+        return {
+            "jobs": job_count,
+            "done": sum(job.status == "done" for job in jobs),
+            "lost": sum(job.id not in completed_ids for job in jobs),
+            "duplicates": len(completed_ids) - len(set(completed_ids)),
+            "crashed": sum(node.exitcode != 0 for node in nodes),
+            "wall_seconds": wall_seconds,
+            "jobs_per_second": len(set(completed_ids)) / wall_seconds if wall_seconds else 0.0,
+        }
+    finally:
+        for node in nodes:
+            if node.is_alive():
+                node.terminate()
+        os.remove(log_filepath)
+        TranscriptionJob.query.filter_by(queue=SIMULATION_QUEUE).delete()
+        db.session.commit()
+
+def simulate_nodes_in_temporary_database(node_count=4, job_count=40, work_seconds=0.2, lease_seconds=2.0,
+                                         crash_node=True):
+    """
+    Runs `simulate_nodes` against a temporary SQLite database with a simulated user, so it checks the job queue
+    without a registered user and without touching the configured database, e.g. as an automated check.
+
+    Args:
+        node_count (int): The number of worker processes. Defaults to 4.
+        job_count (int): The number of simulated jobs. Defaults to 40.
+        work_seconds (float): The processing time of a job. Defaults to 0.2.
+        lease_seconds (float): The duration of a lease. Defaults to 2.
+        crash_node (bool): Whether the first node crashes while holding a lease. Defaults to True.
+
+    Returns:
+        dict: The result of `simulate_nodes`.
+    """
+    from app import create_app
+
+    database_file_descriptor, database_filepath = tempfile.mkstemp(prefix="queue_simulation_", suffix=".db")
+    os.close(database_file_descriptor)
+    database_uri = f"sqlite:///{database_filepath}"
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_uri})
+
+    try:
+        with app.app_context():
+            db.create_all()
+            user = User(username="queuesimulation", email="queue-simulation@example.com", password="-")
+            db.session.add(user)
+            db.session.commit()
+            return simulate_nodes(user.id, node_count, job_count, work_seconds, lease_seconds, crash_node,
+                                  database_uri)
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        os.remove(database_filepath)
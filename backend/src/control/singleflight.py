@@ -0,0 +1,72 @@
+import threading
+
+class _Call:
+    """
+    State of a single in-flight call shared between the caller executing it and the callers waiting for it.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Deduplicates concurrent executions of the same work within a process.
+
+    The first caller for a key executes the function, all callers arriving with the same key while it is running
+    wait for it to finish and receive the same result or exception. Once the call finished, the next caller for
+    the key executes the function again.
+    """
+
+    def __init__(self):
+        """
+        Initializes the SingleFlight with no calls in flight.
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Execute `function(*args, **kwargs)` unless a call for `key` is already in flight, then wait for its result.
+
+        Args:
+            key (hashable): Identifies the work, e.g. the path of the audio file.
+            function (callable): The function executing the work.
+            *args: Positional arguments for the function.
+            **kwargs: Keyword arguments for the function.
+
+        Returns:
+            tuple:
+                - Any: The return value of the function.
+                - bool: True if this caller executed the function, False if it waited for another caller.
+
+        Raises:
+            BaseException: Any exception raised by the function, re-raised in all waiting callers. This includes
+                exceptions which do not derive from `Exception`, e.g. `cancellation.PipelineCancelled`, so waiters
+                never mistake an interrupted call for one which returned None.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            # Wait for the caller which executes the work
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, False
+
+        try:
+            call.result = function(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, True
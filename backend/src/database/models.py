@@ -12,7 +12,7 @@ class AudioTranscription(db.Model):
 
     Attributes:
         id (int): Unique identifier for each audio transcription record.
-        audio_path (str): File path to the uploaded audio file (.wav).
+        audio_path (str): File path to the uploaded audio file (.wav, .flac or .opus).
         transcription_path (str): File path to the generated transcription file (.txt). None if not yet generated.
         created_at (datetime): Timestamp indicating when the transcription was created.
         user_id (int): Foreign key linking to the user who owns the transcription.
@@ -25,6 +25,9 @@ class AudioTranscription(db.Model):
         audio_length (float): Duration of the audio in seconds. None if not calculated.
         word_count (int): Total number of words in the transcription. None if not calculated.
         summary (str): AI-generated summary of the transcription. None if not available.
+        segments_path (str): File path to the persisted transcription segments (.npz). None if not available.
+        profile (str): Name of the quality profile the recording was analyzed with. None for the default profile.
+        artifacts (list): List of AnalyticsArtifact objects recording how each analytics artifact was generated.
 
     Methods:
         __repr__(): Returns a string representation of the AudioTranscription object.
@@ -33,7 +36,7 @@ class AudioTranscription(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)  # Unique ID for each recording
     user_id = db.Column(db.Integer, db.ForeignKey('user_index.id'), nullable=False)  # Corresponding User ID
-    audio_path = db.Column(db.String(200), nullable=False, unique=True)  # Unique path to the .wav file
+    audio_path = db.Column(db.String(200), nullable=False, unique=True)  # Unique path to the stored audio file
     transcription_path = db.Column(db.String(200), nullable=True, unique=True)  # Unique path to the .txt transcription
     created_at = db.Column(db.DateTime, nullable=False)  # Timestamp when the audio recording was created
     speech_speed_graphic_path = db.Column(db.String(200), nullable=True)  # Path to speech speed analysis graphic
@@ -45,6 +48,10 @@ class AudioTranscription(db.Model):
     audio_length = db.Column(db.Float, nullable=True)  # Length of the audio in seconds
     word_count = db.Column(db.Integer, nullable=True)  # Word count in the transcription
     summary = db.Column(db.String(3000), nullable=True)  # AI-generated summary of the transcription
+    segments_path = db.Column(db.String(200), nullable=True)  # Path to the persisted transcription segments
+    profile = db.Column(db.String(20), nullable=True)  # Quality profile the recording was analyzed with
+    artifacts = db.relationship('AnalyticsArtifact', backref='recording',
+                                lazy=True)  # Versions and parameters of the generated analytics artifacts
 
     def __repr__(self):
         """
@@ -55,6 +62,207 @@ class AudioTranscription(db.Model):
         """
         return f"<AudioTranscription id={self.id}, audio_path={self.audio_path}, user_id={self.user_id}>"
 
+class AnalyticsArtifact(db.Model):
+    """
+    Represents the version and parameters with which an analytics artifact of a recording was generated.
+
+    Each analytics stage (e.g. the speech speed graphic or the summary) stores one row per recording. When the
+    generating code or its parameters change, the stored fingerprint no longer matches the current one and the
+    artifact can be regenerated without transcribing the recording again.
+
+    Attributes:
+        id (int): Unique identifier for each artifact record.
+        recording_id (int): Foreign key linking to the AudioTranscription the artifact belongs to.
+        artifact (str): Name of the artifact, e.g. "speed_graphics", "pitch_graphics" or "summary".
+        version (int): Version of the code which generated the artifact.
+        params_hash (str): SHA-256 hash of the parameters with which the artifact was generated.
+        generated_at (datetime): Timestamp when the artifact was generated.
+
+    Methods:
+        __repr__(): Returns a string representation of the AnalyticsArtifact object.
+    """
+    __tablename__ = "analytics_artifacts"
+    __table_args__ = (db.UniqueConstraint('recording_id', 'artifact'),)
+
+    id = db.Column(db.Integer, primary_key=True)  # Unique ID for each artifact record
+    recording_id = db.Column(db.Integer, db.ForeignKey('audio_transcriptions.id'), nullable=False)  # Corresponding recording
+    artifact = db.Column(db.String(50), nullable=False)  # Name of the artifact
+    version = db.Column(db.Integer, nullable=False)  # Version of the code which generated the artifact
+    params_hash = db.Column(db.String(64), nullable=False)  # Hash of the parameters used for the generation
+    generated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)  # Timestamp of the generation
+
+    def __repr__(self):
+        """
+        Returns a string representation of the AnalyticsArtifact object.
+
+        Example:
+            "<AnalyticsArtifact recording_id=1, artifact='pitch_graphics', version=1>"
+        """
+        return f"<AnalyticsArtifact recording_id={self.recording_id}, artifact={self.artifact}, version={self.version}>"
+
+class TranscriptionJob(db.Model):
+    """
+    Represents a queued transcription and analysis of a stored audio file, processed by a worker.
+
+    Workers on any machine sharing the database claim queued jobs and hold a lease on them, which they renew
+    with heartbeats while processing. Jobs whose lease expired, e.g. because the worker crashed, are claimed again,
+    so every job is processed at least once.
+
+    Attributes:
+        id (int): Unique identifier for each job.
+        queue (str): Name of the queue the job belongs to, e.g. "transcription".
+        user_id (int): Foreign key linking to the user who owns the recording.
+        audio_path (str): File path to the stored audio file to process.
+        profile (str): Name of the quality profile to analyze the recording with.
+        status (str): "queued", "running", "done", "failed" or "cancelled".
+        attempts (int): Number of times the job was claimed.
+        estimated_cost (float): Estimated seconds of processing, the audio duration times the realtime factor of
+                                the profile.
+        schedule_key (float): Key by which the workers claim the jobs, the smallest first, see
+                              `job_queue.get_schedule_key`.
+        lease_owner (str): ID of the worker holding the lease. None if the job is not running.
+        lease_expires_at (datetime): Time after which the lease may be taken over by another worker.
+        error (str): Error message of the last failed attempt. None if no attempt failed.
+        recording_id (int): Foreign key linking to the resulting AudioTranscription. None until the job is done.
+        created_at (datetime): Timestamp when the job was queued.
+        started_at (datetime): Timestamp when the job was last claimed.
+        finished_at (datetime): Timestamp when the job was done or failed finally.
+
+    Methods:
+        __repr__(): Returns a string representation of the TranscriptionJob object.
+    """
+    __tablename__ = "transcription_jobs"
+    __table_args__ = (db.Index('ix_transcription_jobs_claim', 'queue', 'status', 'lease_expires_at'),
+                      db.Index('ix_transcription_jobs_schedule', 'queue', 'status', 'schedule_key'))
+
+    id = db.Column(db.Integer, primary_key=True)  # Unique ID for each job
+    queue = db.Column(db.String(50), nullable=False, default="transcription")  # Queue of the job
+    user_id = db.Column(db.Integer, db.ForeignKey('user_index.id'), nullable=False)  # Corresponding User ID
+    audio_path = db.Column(db.String(200), nullable=False)  # Path to the stored audio file
+    profile = db.Column(db.String(20), nullable=True)  # Quality profile of the analysis
+    status = db.Column(db.String(20), nullable=False, default="queued")  # Processing status
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # Number of claims
+    estimated_cost = db.Column(db.Float, nullable=False, default=0.0)  # Estimated seconds of processing
+    schedule_key = db.Column(db.Float, nullable=False, default=0.0)  # Claim order, the smallest first
+    lease_owner = db.Column(db.String(100), nullable=True)  # Worker holding the lease
+    lease_expires_at = db.Column(db.DateTime, nullable=True)  # Expiry of the lease
+    error = db.Column(db.Text, nullable=True)  # Error of the last failed attempt
+    recording_id = db.Column(db.Integer, db.ForeignKey('audio_transcriptions.id'), nullable=True)  # Result
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)  # Timestamp of the queueing
+    started_at = db.Column(db.DateTime, nullable=True)  # Timestamp of the last claim
+    finished_at = db.Column(db.DateTime, nullable=True)  # Timestamp of the completion
+
+    def __repr__(self):
+        """
+        Returns a string representation of the TranscriptionJob object.
+
+        Example:
+            "<TranscriptionJob id=1, audio_path='/path/to/audio.wav', status='queued'>"
+        """
+        return f"<TranscriptionJob id={self.id}, audio_path={self.audio_path}, status={self.status}>"
+
+class CancellationRequest(db.Model):
+    """
+    Represents a request to cancel the running pipelines of a user, e.g. because the recording was deleted.
+
+    The pipelines run in the server process which received the upload, while the request may be received by any
+    other process. Every process applies the requests for its running pipelines, see `cancellation_requests`.
+    Requests only cancel pipelines which were started before them and are removed after a day.
+
+    Attributes:
+        id (int): Unique identifier for each request.
+        user_id (int): Foreign key linking to the user whose pipelines are cancelled.
+        audio_path (str): File path to the audio file whose pipeline is cancelled. None for all pipelines of the
+                          user, unless an upload ID is set.
+        upload_id (str): ID the client generated for the cancelled upload. None if not given.
+        created_at (datetime): Timestamp when the cancellation was requested.
+
+    Methods:
+        __repr__(): Returns a string representation of the CancellationRequest object.
+    """
+    __tablename__ = "cancellation_requests"
+    __table_args__ = (db.Index('ix_cancellation_requests_created_at', 'created_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)  # Unique ID for each request
+    user_id = db.Column(db.Integer, db.ForeignKey('user_index.id'), nullable=False)  # Corresponding User ID
+    audio_path = db.Column(db.String(200), nullable=True)  # Path to the audio file of the cancelled pipeline
+    upload_id = db.Column(db.String(100), nullable=True)  # Client ID of the cancelled upload
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)  # Timestamp of the request
+
+    def __repr__(self):
+        """
+        Returns a string representation of the CancellationRequest object.
+
+        Example:
+            "<CancellationRequest id=1, user_id=42, audio_path='/path/to/audio.wav', upload_id=None>"
+        """
+        return (f"<CancellationRequest id={self.id}, user_id={self.user_id}, audio_path={self.audio_path}, "
+                f"upload_id={self.upload_id}>")
+
+class UserUsage(db.Model):
+    """
+    Represents the running totals of the recordings of a user in one language.
+
+    The totals are updated in the transaction which saves or deletes a recording, so the usage overview of a user
+    is read from a few rows (one per language) instead of all their recordings.
+
+    Attributes:
+        user_id (int): Foreign key linking to the user.
+        language (str): Language of the recordings. An empty string for recordings without detected language.
+        recording_count (int): Number of stored recordings.
+        audio_seconds (float): Total length of the recordings in seconds.
+        word_count (int): Total number of transcribed words.
+
+    Methods:
+        __repr__(): Returns a string representation of the UserUsage object.
+    """
+    __tablename__ = "user_usage"
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user_index.id'), primary_key=True)  # Corresponding User ID
+    language = db.Column(db.String(200), primary_key=True)  # Language of the recordings
+    recording_count = db.Column(db.Integer, nullable=False, default=0)  # Number of recordings
+    audio_seconds = db.Column(db.Float, nullable=False, default=0.0)  # Total length of the recordings in seconds
+    word_count = db.Column(db.Integer, nullable=False, default=0)  # Total number of words
+
+    def __repr__(self):
+        """
+        Returns a string representation of the UserUsage object.
+
+        Example:
+            "<UserUsage user_id=42, language='en', recording_count=3>"
+        """
+        return f"<UserUsage user_id={self.user_id}, language={self.language}, recording_count={self.recording_count}>"
+
+class UserDailyUsage(db.Model):
+    """
+    Represents the ledger of the audio seconds a user uploaded on one day, which the daily quota is checked against.
+
+    The seconds of an upload are added when it is admitted for analysis or queued, and never subtracted, so
+    deleting recordings does not free quota and uploads which are still waiting or running are counted.
+
+    Attributes:
+        user_id (int): Foreign key linking to the user.
+        day (date): The day of the uploads.
+        audio_seconds (float): Total length of the admitted uploads of the day in seconds.
+
+    Methods:
+        __repr__(): Returns a string representation of the UserDailyUsage object.
+    """
+    __tablename__ = "user_daily_usage"
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user_index.id'), primary_key=True)  # Corresponding User ID
+    day = db.Column(db.Date, primary_key=True)  # Day of the uploads
+    audio_seconds = db.Column(db.Float, nullable=False, default=0.0)  # Admitted audio of the day in seconds
+
+    def __repr__(self):
+        """
+        Returns a string representation of the UserDailyUsage object.
+
+        Example:
+            "<UserDailyUsage user_id=42, day=2024-05-01, audio_seconds=310.5>"
+        """
+        return f"<UserDailyUsage user_id={self.user_id}, day={self.day}, audio_seconds={self.audio_seconds}>"
+
 class User(db.Model, UserMixin):
     """
     Represents a user in the application.
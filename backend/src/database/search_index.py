@@ -0,0 +1,169 @@
+import html
+from sqlalchemy import text
+from backend.src.database import db
+
+# Name of the full-text index over the transcription segments of all recordings
+SEARCH_TABLE = "transcript_search"
+
+# Statements creating the full-text index per database dialect. SQLite uses an FTS5 virtual table, PostgreSQL a
+# table with a generated tsvector column and a GIN index.
+CREATE_INDEX_STATEMENTS = {
+    "sqlite": [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+            text, recording_id UNINDEXED, user_id UNINDEXED, start_time UNINDEXED, end_time UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )""",
+    ],
+    "postgresql": [
+        f"""CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+            id SERIAL PRIMARY KEY,
+            recording_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            start_time REAL NOT NULL,
+            end_time REAL NOT NULL,
+            text TEXT NOT NULL,
+            text_vector TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', text)) STORED
+        )""",
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_vector_idx ON {SEARCH_TABLE} USING GIN (text_vector)",
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_recording_idx ON {SEARCH_TABLE} (recording_id)",
+    ],
+}
+
+# Markers enclosing the matches in the snippets, the only markup kept when the snippets are escaped
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+# Queries returning the best matching segments of a user with their rank (lower is better) and a highlighted snippet
+SEARCH_QUERIES = {
+    "sqlite": f"""
+        SELECT recording_id, start_time, end_time,
+               snippet({SEARCH_TABLE}, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 16) AS snippet,
+               bm25({SEARCH_TABLE}) AS rank
+        FROM {SEARCH_TABLE}
+        WHERE {SEARCH_TABLE} MATCH :query AND user_id = :user_id
+        ORDER BY rank
+        LIMIT :limit
+    """,
+    "postgresql": f"""
+        SELECT recording_id, start_time, end_time,
+               ts_headline('simple', text, plainto_tsquery('simple', :query),
+                           'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=16') AS snippet,
+               -ts_rank(text_vector, plainto_tsquery('simple', :query)) AS rank
+        FROM {SEARCH_TABLE}
+        WHERE text_vector @@ plainto_tsquery('simple', :query) AND user_id = :user_id
+        ORDER BY rank
+        LIMIT :limit
+    """,
+}
+
+# Database engines whose index was already created by this process
+_initialized_engines = set()
+
+def _get_dialect():
+    """
+    Returns the dialect of the database and creates the full-text index on first use.
+
+    Raises:
+        RuntimeError: If the database does not support full-text search.
+    """
+    dialect = db.engine.dialect.name
+    if dialect not in CREATE_INDEX_STATEMENTS:
+        raise RuntimeError(f"Full-text search is not supported on {dialect} databases.")
+
+    if db.engine.url not in _initialized_engines:
+        with db.engine.begin() as connection:
+            for statement in CREATE_INDEX_STATEMENTS[dialect]:
+                connection.execute(text(statement))
+        _initialized_engines.add(db.engine.url)
+
+    return dialect
+
+def index_recording(recording_id, user_id, segments):
+    """
+    Adds the segments of a recording to the full-text index, replacing any previously indexed segments.
+
+    The statements run in the current database session, so the index is updated in the same transaction
+    as the recording. The caller commits.
+
+    Args:
+        recording_id (int): The ID of the AudioTranscription.
+        user_id (int): The ID of the user who owns the recording.
+        segments (list[dict]): The transcription segments with "start", "end" and "text" keys.
+    """
+    _get_dialect()
+    remove_recordings([recording_id])
+
+    rows = [
+        {
+            "recording_id": recording_id,
+            "user_id": user_id,
+            "start_time": float(segment["start"]),
+            "end_time": float(segment["end"]),
+            "text": segment["text"].strip(),
+        }
+        for segment in segments if segment["text"].strip()
+    ]
+    if rows:
+        db.session.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (recording_id, user_id, start_time, end_time, text) "
+            f"VALUES (:recording_id, :user_id, :start_time, :end_time, :text)"
+        ), rows)
+
+def remove_recordings(recording_ids):
+    """
+    Removes the segments of recordings from the full-text index in the current database session. The caller commits.
+
+    Args:
+        recording_ids (list of int): The IDs of the AudioTranscriptions to remove.
+    """
+    _get_dialect()
+    for recording_id in recording_ids:
+        db.session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE recording_id = :recording_id"),
+                           {"recording_id": recording_id})
+
+def _escape_snippet(snippet):
+    """
+    Escapes the transcript text of a snippet for HTML, keeping only the highlight markers as markup. A transcript
+    containing the markers itself yields at most harmless highlight tags.
+    """
+    escaped = html.escape(snippet)
+    for marker in (HIGHLIGHT_START, HIGHLIGHT_END):
+        escaped = escaped.replace(html.escape(marker), marker)
+    return escaped
+
+def search(user_id, query, limit=20):
+    """
+    Searches the transcription segments of a user.
+
+    Args:
+        user_id (int): The ID of the user whose recordings are searched.
+        query (str): The search terms. All terms must occur in a matching segment.
+        limit (int): The maximum number of results. Defaults to 20.
+
+    Returns:
+        list of dict: The matching segments, best match first, with the keys "recording_id", "start", "end",
+                      "snippet" (HTML-escaped segment text with the matches enclosed in <mark> tags) and "rank"
+                      (lower is better).
+    """
+    dialect = _get_dialect()
+    terms = query.split()
+    if not terms:
+        return []
+
+    if dialect == "sqlite":
+        # Quote every term so the input is not interpreted as FTS5 query syntax
+        query = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    rows = db.session.execute(text(SEARCH_QUERIES[dialect]),
+                              {"query": query, "user_id": user_id, "limit": limit}).mappings().all()
+
+    return [
+        {
+            "recording_id": int(row["recording_id"]),
+            "start": row["start_time"],
+            "end": row["end_time"],
+            "snippet": _escape_snippet(row["snippet"]),
+            "rank": row["rank"],
+        }
+        for row in rows
+    ]
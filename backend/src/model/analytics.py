@@ -1,15 +1,24 @@
 import os
+import json
+import hashlib
 from datetime import datetime
-import wave
-import matplotlib
-import matplotlib.pyplot as plt
-import librosa
-from librosa import feature
 import numpy as np
 from utils import utils
 import transformer
-
-matplotlib.use('Agg') # use this to avoid crashes of the program when matplotlib outside the main thread
+import renderer
+import features
+import audio_loader
+
+# Version of the code generating each persisted analytics artifact. Bump the version of an artifact whenever its
+# generation changes in a way that is not captured by its parameters, so already stored artifacts become stale.
+ARTIFACT_VERSIONS = {
+    "speed_graphics": 2,
+    "pitch_graphics": 3,
+    "energy_graphics": 3,
+    "improved_text": 2,
+    "title": 1,
+    "summary": 1,
+}
 
 class Analytics:
     """
@@ -18,7 +27,30 @@ class Analytics:
     This class encapsulates the metadata and methods required for analyzing audio files.
     """
 
-    def __init__(self, audio_filepath, transcription_filepath, transcription_segments, word_count, language):
+    # Sliding window lengths for the WPM calculation as (audio length upper bound in seconds, window length in seconds)
+    WPM_WINDOW_LENGTHS = ((60, 5), (600, 15), (1800, 30), (None, 60))
+    WPM_STEP_SIZE = 1
+
+    # Frequency range in Hz which is searched for the fundamental frequency in the pitch analysis
+    PITCH_FMIN = 50
+    PITCH_FMAX = 600
+
+    # Frame and hop length in samples for the short-time energy analysis
+    ENERGY_FRAME_LENGTH = 2048
+    ENERGY_HOP_LENGTH = 512
+
+    # Default output format and resolution of the graphics, the app passes its `CHART_FORMAT` and `CHART_DPI` config
+    CHART_FORMAT = "png"
+    CHART_DPI = 150
+
+    # Summary length bounds as (word count upper bound, min length, max length). Shorter texts are returned as they are.
+    SUMMARY_LENGTHS = ((50, None, None), (100, 10, 50), (300, 20, 80), (500, 40, 100), (None, 50, 150))
+
+    # Maximum number of words of the title of recordings in languages the transformer model does not support
+    TITLE_WORD_COUNT = 10
+
+    def __init__(self, audio_filepath, transcription_filepath, transcription_segments, word_count, language,
+                 bart_num_beams=4, chart_format=None, chart_dpi=None):
         """
         Initializes the Analytics class with the necessary file paths and metadata.
 
@@ -29,6 +61,11 @@ class Analytics:
                 Each tuple contains segment details such as word count per segment.
             word_count (int): The total number of words in the transcription.
             language (str): The detected language of the audio recording and transcription.
+            bart_num_beams (int): Number of beams for the AI-generated title, summary and improved text.
+                1 decodes greedily. Defaults to 4.
+            chart_format (str): The file format of the graphics, see `renderer.CHART_FORMATS`. Defaults to
+                `CHART_FORMAT`.
+            chart_dpi (int): The resolution of the graphics. Defaults to `CHART_DPI`.
 
         Attributes:
             audio_filepath (str): Stores the path to the audio file.
@@ -36,6 +73,9 @@ class Analytics:
             transcription_segments (list of tuples): Stores the transcription segments.
             word_count (int): Stores the word count of the transcription.
             language (str): Stores the detected language.
+            bart_num_beams (int): Stores the number of beams for the AI-generated texts.
+            chart_format (str): Stores the file format of the graphics.
+            chart_dpi (int): Stores the resolution of the graphics.
             no_recording_content (bool): Indicates whether the recording contains no usable content. Defaults to `False`.
         """
         self.audio_filepath = audio_filepath
@@ -43,14 +83,17 @@ class Analytics:
         self.transcription_segments = transcription_segments
         self.word_count = word_count
         self.language = language
+        self.bart_num_beams = bart_num_beams
+        self.chart_format = chart_format or self.CHART_FORMAT
+        self.chart_dpi = chart_dpi or self.CHART_DPI
         self.no_recording_content = False
 
-    def calculate_wpm(self, step_size=1):
+    def calculate_wpm(self, step_size=None):
         """
         Calculate words per minute (WPM) using a sliding window approach.
 
         Args:
-            step_size (int): Step size for sliding the window in seconds.
+            step_size (int): Step size for sliding the window in seconds. Defaults to `WPM_STEP_SIZE`.
 
         Returns:
             list: A list of tuples (time, wpm) for each window position.
@@ -59,17 +102,14 @@ class Analytics:
         if not self.transcription_segments:
             return []
 
+        step_size = step_size or self.WPM_STEP_SIZE
+
         def get_window_length():
-            # Set interval length depending on the audio length
+            # Set interval length depending on the audio length (short, medium, long and very long recordings)
             audio_length = self.get_wav_length()
-            if audio_length < 60:
-                return 5  # Short recordings
-            elif audio_length < 600:
-                return 15  # Medium recordings
-            elif audio_length < 1800:
-                return 30  # Long recordings
-            else:
-                return 60  # Very long recordings
+            for upper_bound, window_length in self.WPM_WINDOW_LENGTHS:
+                if upper_bound is None or audio_length < upper_bound:
+                    return window_length
 
         window_length = get_window_length()
 
@@ -114,7 +154,7 @@ class Analytics:
 
         This method calculates the WPM over time from the audio transcription, generates a line plot
         with visual indicators for optimal and non-optimal speaking speed ranges, and saves the
-        resulting graphic as a PNG file in the `output/speed_graphics` directory.
+        resulting graphic in the configured chart format in the `output/speed_graphics` directory.
 
         If no WPM data is available, a placeholder image with a "No WPM data to display" message is generated instead.
 
@@ -125,9 +165,9 @@ class Analytics:
             Exception: If an error occurs during WPM calculation or while generating the plot.
         """
         # Extract only the filename of the audio recording including timestamp
-        audio_filename = self.audio_filepath.replace('src/static/output/raw_audio/', '')[:-4]
-        # Generate the file path for the transcription file
-        speed_graphics_filepath = utils.generate_file_path("speed_graphics", audio_filename)
+        audio_filename = utils.get_audio_filename(self.audio_filepath)
+        # Generate the file path for the speed graphic
+        speed_graphics_filepath = utils.generate_file_path("speed_graphics", audio_filename, self.chart_format)
 
         try:
             time_wpm = self.calculate_wpm()
@@ -137,48 +177,17 @@ class Analytics:
             # If no valid data, handle gracefully with a placeholder
             if not times or not wpms:
                 self.no_recording_content = True
-                plt.figure()
-                plt.text(0.5, 0.5, 'No WPM data to display', ha='center', va='center', fontsize=12, color='#f1f1f1')
-                plt.axis('off')
-                plt.savefig(speed_graphics_filepath, format="png", dpi=300, transparent=True)
-                plt.close()
+                renderer.render_placeholder(speed_graphics_filepath, 'No WPM data to display',
+                                            self.chart_format, self.chart_dpi)
                 return speed_graphics_filepath
 
-            # Add red shadow regions on the y-axis (y=50 to 100 and y=200 to 250)
-            plt.axhspan(160, 250, color='red', alpha=0.1)
-            plt.axhspan(50, 100, color='red', alpha=0.1)
-
-            # Connecting the points with lines and applying the color scheme
-            plt.plot(times, wpms, color='#f1f1f1', linewidth=2)
-
-            # Set x-axis and y-axis limits
-            plt.ylim(50, 250)
-            plt.xlim(0, self.get_wav_length())
-
-            # Add labels, grid, and legend
-            plt.xlabel("Time (seconds)", fontsize=12, fontweight='bold', color='#f1f1f1')
-            plt.ylabel("Words per Minute", fontsize=12, fontweight='bold', color='#f1f1f1')
-            plt.grid(True, color='#f1f1f1')
-
-            # Make the outer frame bolder and white
-            ax = plt.gca()  # Get current axes
-            for spine in ax.spines.values():
-                spine.set_visible(True)
-                spine.set_linewidth(2)  # Make the frame bolder
-                spine.set_color('#f1f1f1')  # Set frame color to white
-
-            # Adjust the size and weight of tick labels (numbers on the axes)
-            plt.tick_params(axis='both', which='major', labelsize=10, width=2,
-                            colors='#f1f1f1')  # Tick marks and labels in white
-            plt.xticks(fontsize=10, fontweight='bold', color='#f1f1f1')  # Specifically for x-axis numbers
-            plt.yticks(fontsize=10, fontweight='bold', color='#f1f1f1')  # Specifically for y-axis numbers
-
-            plt.title("Speaking Speed Over Time", fontsize=14, fontweight='bold', color='#f1f1f1')
-
-            # Save the plot
-            plt.savefig(speed_graphics_filepath, format="png", dpi=300, transparent=True)
-
-            plt.close()
+            # Plot the speed with red shadow regions for non-optimal speeds (y=50 to 100 and y=160 to 250)
+            renderer.render_line_chart(
+                speed_graphics_filepath, times, wpms,
+                title="Speaking Speed Over Time", xlabel="Time (seconds)", ylabel="Words per Minute",
+                xlim=(0, self.get_wav_length()), ylim=(50, 250), bands=[(160, 250), (50, 100)],
+                chart_format=self.chart_format, dpi=self.chart_dpi,
+            )
 
         except Exception as e:
             raise RuntimeError(f"Error on WPM calculation: {e}")
@@ -203,20 +212,17 @@ class Analytics:
         """
 
         # Extract only the filename of the audio recording including timestamp
-        audio_filename = self.audio_filepath.replace('src/static/output/raw_audio/', '')[:-4]
+        audio_filename = utils.get_audio_filename(self.audio_filepath)
         # Generate the file path for the transcription file
-        pitch_graphics_filepath = utils.generate_file_path("pitch_graphics", audio_filename)
+        pitch_graphics_filepath = utils.generate_file_path("pitch_graphics", audio_filename, self.chart_format)
 
         try:
-            # Load the audio signal
-            y, sr = librosa.load(self.audio_filepath)
-            # Estimate pitch using librosa's pyin
+            # Estimate pitch using librosa's pyin on blocks of the audio signal, so memory is independent of its length
             # f0: fundamental frequency over time
             # voiced_flag: whether each time frame contains speech
-            f0, voiced_flag, voiced_time = librosa.pyin(y, fmin=50, fmax=600, sr=16000)
+            time, f0, voiced_flag = features.stream_pitch(self.audio_filepath, self.PITCH_FMIN, self.PITCH_FMAX)
 
             # Remove invalid pitch intervals (non-voiced or silence areas)
-            time = np.linspace(0, len(y) / sr, len(f0))  # Time values corresponding to each frame
             valid_indices = voiced_flag & (f0 > 0)  # Only take voiced intervals with a valid pitch
             filtered_time = time[valid_indices]
             filtered_f0 = f0[valid_indices]
@@ -228,40 +234,16 @@ class Analytics:
 
             # Plotting the pitch analysis graph only if there is data to plot
             if filtered_time.size > 0 and filtered_f0.size > 0 and not self.no_recording_content:
-                plt.plot(filtered_time, filtered_f0, color='#f1f1f1', linewidth=2)
-
-                # Set x-axis and y-axis limits
-                plt.ylim(0, np.max(filtered_f0) * 1.1)
-                plt.xlim(0, self.get_wav_length()*1.1)
-
-                # Update labels and grid with consistent custom colors
-                plt.xlabel("Time (seconds)", fontsize=12, fontweight='bold', color='#f1f1f1')
-                plt.ylabel("Pitch (Hz)", fontsize=12, fontweight='bold', color='#f1f1f1')
-                plt.grid(True, color='#f1f1f1')
-
-                # Make the outer frame bolder and white
-                ax = plt.gca()  # Get current axes
-                for spine in ax.spines.values():
-                    spine.set_visible(True)
-                    spine.set_linewidth(2)  # Make the frame bolder
-                    spine.set_color('#f1f1f1')  # Set frame color to white
-
-                # Adjust the size and weight of tick labels (numbers on the axes)
-                plt.tick_params(axis='both', which='major', labelsize=10, width=2,
-                                colors='#f1f1f1')  # Tick marks and labels in white
-                plt.xticks(fontsize=10, fontweight='bold', color='#f1f1f1')  # Specifically for x-axis numbers
-                plt.yticks(fontsize=10, fontweight='bold', color='#f1f1f1')  # Specifically for y-axis numbers
-
-                plt.title("Pitch Over Time", fontsize=14, fontweight='bold', color='#f1f1f1')
+                renderer.render_line_chart(
+                    pitch_graphics_filepath, filtered_time, filtered_f0,
+                    title="Pitch Over Time", xlabel="Time (seconds)", ylabel="Pitch (Hz)",
+                    xlim=(0, self.get_wav_length() * 1.1), ylim=(0, np.max(filtered_f0) * 1.1),
+                    chart_format=self.chart_format, dpi=self.chart_dpi,
+                )
             else:
                 # No data to plot
-                plt.figure()
-                plt.text(0.5, 0.5, 'No pitch data to display', ha='center', va='center', fontsize=12, color='#f1f1f1')
-                plt.axis('off')  # Turn off the axes when no data is available
-
-            # Save the plot
-            plt.savefig(pitch_graphics_filepath, format="png", dpi=300, transparent=True)
-            plt.close()
+                renderer.render_placeholder(pitch_graphics_filepath, 'No pitch data to display',
+                                            self.chart_format, self.chart_dpi)
 
             return pitch_graphics_filepath
 
@@ -297,19 +279,53 @@ class Analytics:
             audio_length = self.get_wav_length()
             saving_date_and_time = get_file_creation_time(self.audio_filepath)
 
-            # Check the length of transcription and return transcription itself if to few words
-            if self.word_count < 10:
-                # When the text only contains less than 10 words, return text itself
-                with open(self.transcription_filepath, 'r') as file:
-                    title = file.read()
-            else:
-                # Get title from the transformer model with a min length of 1 word and a max of 10 words
-                title = transformer.generate_summary(self.transcription_filepath, 1, 10)
+            title = self.get_title()
 
             return title, self.language, audio_length, saving_date_and_time, self.word_count
         except Exception as e:
             raise RuntimeError(f"Error on get general info: {e}")
 
+    def is_language_supported(self):
+        """
+        This method returns whether the transformer model supports the language of the recording.
+
+        The model is trained on English texts only, so no time is spent on generating texts for other languages.
+        """
+        return self.language in transformer.SUPPORTED_LANGUAGES
+
+    def get_leading_words(self, word_limit):
+        """
+        This method returns the first words of the transcription, followed by an ellipsis if it is longer.
+
+        Args:
+            word_limit (int): The maximum number of words.
+        """
+        with open(self.transcription_filepath, 'r') as file:
+            words = file.read().split()
+        return " ".join(words[:word_limit]) + (" …" if len(words) > word_limit else "")
+
+    def get_title(self):
+        """
+        This method returns an AI generated title for the recorded audio file.
+
+        Returns:
+            - str: an AI generated title for the recording, or the transcription itself if it has less than 10 words.
+                   For languages the transformer model does not support, the first words of the transcription.
+        """
+
+        # Titles in unsupported languages are the first words of the transcription
+        if not self.is_language_supported():
+            return self.get_leading_words(self.TITLE_WORD_COUNT)
+
+        # Check the length of transcription and return transcription itself if to few words
+        if self.word_count < 10:
+            # When the text only contains less than 10 words, return text itself
+            with open(self.transcription_filepath, 'r') as file:
+                return file.read()
+
+        # Get title from the transformer model with a min length of 1 word and a max of 10 words
+        return transformer.generate_summary(self.transcription_filepath, 1, 10, self.bart_num_beams)
+
     def get_summary(self):
         """
         This method returns a summary of the recorded audio file referenced in the attributes of a given instance.
@@ -318,7 +334,8 @@ class Analytics:
         The length will increase proportionally with the length of the recorded audio.
 
         Returns:
-            - str: an AI generated summary for the recording.
+            - str: an AI generated summary for the recording. For languages the transformer model does not support,
+                   the leading words of the transcription up to the maximum summary length.
 
         Raises:
             RuntimeError: If an error occurs during generation of the summary.
@@ -326,38 +343,33 @@ class Analytics:
 
         try:
             # Set the correct min and max length for the summary
-            if self.word_count < 50:
-                # When the text only contains less than 20 words, return text itself
+            for upper_bound, min_length, max_length in self.SUMMARY_LENGTHS:
+                if upper_bound is None or self.word_count < upper_bound:
+                    break
+
+            if min_length is not None and not self.is_language_supported():
+                # The transformer model only summarizes supported languages, use the beginning of the text instead
+                return self.get_leading_words(max_length)
+
+            if min_length is None:
+                # When the text only contains less than 50 words, return text itself
                 with open(self.transcription_filepath, 'r') as file:
                     text = file.read()
                 return text
-            elif self.word_count < 100:
-                max_length = 50
-                min_length = 10
-            elif self.word_count < 300:
-                max_length = 80
-                min_length = 20
-            elif self.word_count < 500:
-                max_length = 100
-                min_length = 40
-            else:
-                max_length = 150
-                min_length = 50
 
             # Get summary from the transformer model
-            return transformer.generate_summary(self.transcription_filepath, min_length, max_length)
+            return transformer.generate_summary(self.transcription_filepath, min_length, max_length, self.bart_num_beams)
         except Exception as e:
             raise RuntimeError(f"Error on get summary info: {e}")
 
     def get_wav_length(self):
         """
         This method returns the length of the audio file from the filepath
+
+        The duration is read from the cached header of WAV files and probed once for compressed files,
+        so repeated calls do not reopen the file.
         """
-        with wave.open(self.audio_filepath, 'rb') as wav_file:
-            frames = wav_file.getnframes()
-            rate = wav_file.getframerate()
-            duration = frames / float(rate)
-        return duration
+        return audio_loader.get_duration(self.audio_filepath)
 
     def analyze_energy(self):
         """
@@ -373,55 +385,29 @@ class Analytics:
         """
 
         # Extract only the filename of the audio recording including timestamp
-        audio_filename = self.audio_filepath.replace('src/static/output/raw_audio/', '')[:-4]
+        audio_filename = utils.get_audio_filename(self.audio_filepath)
         # Generate the file path for the energy plot
-        energy_graphics_filepath = utils.generate_file_path("energy_graphics", audio_filename)
+        energy_graphics_filepath = utils.generate_file_path("energy_graphics", audio_filename, self.chart_format)
 
         try:
-            # Load the audio signal
-            y, sr = librosa.load(self.audio_filepath)
-
-            # Calculate the short-time energy (RMS)
-            frame_length = 2048
-            hop_length = 512
-            rms_energy = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
-            times = librosa.frames_to_time(np.arange(len(rms_energy)), sr=sr, hop_length=hop_length)
+            # Calculate the short-time energy (RMS) on blocks of the audio signal, so memory is independent of its length
+            times, rms_energy = features.stream_rms(self.audio_filepath, self.ENERGY_FRAME_LENGTH,
+                                                    self.ENERGY_HOP_LENGTH)
 
             # Normalize the energy values to have a maximum of 1
             normalized_rms_energy = rms_energy / np.max(rms_energy) if np.max(rms_energy) > 0 else rms_energy
 
             if not self.no_recording_content:
                 # Plot the energy graph
-                plt.figure()
-                plt.plot(times, normalized_rms_energy, color='#f1f1f1', linewidth=2)
-
-                # Update labels and grid with consistent custom colors
-                plt.xlabel("Time (seconds)", fontsize=12, fontweight='bold', color='#f1f1f1')
-                plt.ylabel("Relative Energy", fontsize=12, fontweight='bold', color='#f1f1f1')
-                plt.grid(True, color='#f1f1f1')
-
-                # Make the outer frame bolder and white
-                ax = plt.gca()  # Get current axes
-                for spine in ax.spines.values():
-                    spine.set_visible(True)
-                    spine.set_linewidth(2)  # Make the frame bolder
-                    spine.set_color('#f1f1f1')  # Set frame color to white
-
-                # Adjust the size and weight of tick labels (numbers on the axes)
-                plt.tick_params(axis='both', which='major', labelsize=10, width=2, colors='#f1f1f1')
-                plt.xticks(fontsize=10, fontweight='bold', color='#f1f1f1')  # Specifically for x-axis numbers
-                plt.yticks(fontsize=10, fontweight='bold', color='#f1f1f1')  # Specifically for y-axis numbers
-
-                plt.title("Normalized Energy Over Time", fontsize=14, fontweight='bold', color='#f1f1f1')
+                renderer.render_line_chart(
+                    energy_graphics_filepath, times, normalized_rms_energy,
+                    title="Normalized Energy Over Time", xlabel="Time (seconds)", ylabel="Relative Energy",
+                    chart_format=self.chart_format, dpi=self.chart_dpi,
+                )
             else:
                 # No data to plot
-                plt.figure()
-                plt.text(0.5, 0.5, 'No pitch data to display', ha='center', va='center', fontsize=12, color='#f1f1f1')
-                plt.axis('off')  # Turn off the axes when no data is available
-
-            # Save the plot
-            plt.savefig(energy_graphics_filepath, format="png", dpi=300, transparent=True)
-            plt.close()
+                renderer.render_placeholder(energy_graphics_filepath, 'No energy data to display',
+                                            self.chart_format, self.chart_dpi)
 
             return energy_graphics_filepath
         except Exception as e:
@@ -436,16 +422,22 @@ class Analytics:
         contain errors or require further refinement.
 
         Returns:
-            str: The file path to the saved improved transcription text.
+            str: The file path to the saved improved transcription text. For languages the transformer model does not
+                 support, the file contains the unchanged transcription.
         """
 
         # Extract only the filename of the audio recording including timestamp
-        audio_filename = self.audio_filepath.replace('src/static/output/raw_audio/', '')[:-4]
+        audio_filename = utils.get_audio_filename(self.audio_filepath)
         # Generate the file path for the energy plot
         improved_text_filepath = utils.generate_file_path("improved_text", audio_filename)
 
         try:
-            improved_text = transformer.improve_text(self.transcription_filepath)
+            if self.is_language_supported():
+                improved_text = transformer.improve_text(self.transcription_filepath, self.bart_num_beams)
+            else:
+                # The transformer model would translate or garble texts in other languages, keep the transcription
+                with open(self.transcription_filepath, 'r') as file:
+                    improved_text = file.read()
         except Exception as e:
             improved_text = f"Model was not able to improved text because of following error: {str(e)}"
 
@@ -455,4 +447,58 @@ class Analytics:
 
         return improved_text_filepath
 
+    @classmethod
+    def get_artifact_params(cls, artifact, bart_num_beams=4, chart_format=None, chart_dpi=None):
+        """
+        Returns the parameters which determine the content of a persisted analytics artifact.
+
+        Args:
+            artifact (str): Name of the artifact, one of the keys of `ARTIFACT_VERSIONS`.
+            bart_num_beams (int): Number of beams for the AI-generated texts. Defaults to 4.
+            chart_format (str): The file format of the graphics. Defaults to `CHART_FORMAT`.
+            chart_dpi (int): The resolution of the graphics. Defaults to `CHART_DPI`.
+
+        Returns:
+            dict: JSON-serializable parameters used to generate the artifact.
 
+        Raises:
+            ValueError: If the artifact is unknown.
+        """
+        bart_params = {"model": transformer.models[transformer.model_name], "num_beams": bart_num_beams,
+                       "languages": transformer.SUPPORTED_LANGUAGES}
+        chart_params = {"format": chart_format or cls.CHART_FORMAT, "dpi": chart_dpi or cls.CHART_DPI}
+        artifact_params = {
+            "speed_graphics": {**chart_params, "window_lengths": cls.WPM_WINDOW_LENGTHS, "step_size": cls.WPM_STEP_SIZE},
+            "pitch_graphics": {**chart_params, "fmin": cls.PITCH_FMIN, "fmax": cls.PITCH_FMAX},
+            "energy_graphics": {**chart_params, "frame_length": cls.ENERGY_FRAME_LENGTH,
+                                "hop_length": cls.ENERGY_HOP_LENGTH},
+            "improved_text": bart_params,
+            "title": {**bart_params, "min_length": 1, "max_length": 10, "fallback_words": cls.TITLE_WORD_COUNT},
+            "summary": {**bart_params, "lengths": cls.SUMMARY_LENGTHS},
+        }
+
+        if artifact not in artifact_params:
+            raise ValueError(f"Unknown analytics artifact: {artifact}")
+
+        return artifact_params[artifact]
+
+    @classmethod
+    def get_artifact_fingerprint(cls, artifact, bart_num_beams=4, chart_format=None, chart_dpi=None):
+        """
+        Returns the version and parameter hash of an analytics artifact as it would be generated now.
+
+        A stored artifact whose version or parameter hash differs from this fingerprint is stale.
+
+        Args:
+            artifact (str): Name of the artifact, one of the keys of `ARTIFACT_VERSIONS`.
+            bart_num_beams (int): Number of beams for the AI-generated texts. Defaults to 4.
+            chart_format (str): The file format of the graphics. Defaults to `CHART_FORMAT`.
+            chart_dpi (int): The resolution of the graphics. Defaults to `CHART_DPI`.
+
+        Returns:
+            tuple:
+                - int: The version of the code generating the artifact.
+                - str: The SHA-256 hash of the parameters used to generate the artifact.
+        """
+        params = json.dumps(cls.get_artifact_params(artifact, bart_num_beams, chart_format, chart_dpi), sort_keys=True)
+        return ARTIFACT_VERSIONS[artifact], hashlib.sha256(params.encode("utf-8")).hexdigest()
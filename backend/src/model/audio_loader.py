@@ -0,0 +1,257 @@
+import os
+import struct
+import subprocess
+import threading
+from collections import OrderedDict
+import numpy as np
+from pydub import AudioSegment
+import wav_reader
+
+# Codecs in which recordings can be stored, with the file extension and the pydub export settings.
+# FLAC is lossless and about half the size of WAV, Opus is lossy but about 20 times smaller at speech quality.
+AUDIO_CODECS = {
+    "wav": {"extension": "wav", "mimetype": "audio/wav", "format": "wav", "codec": None, "bitrate": None},
+    "flac": {"extension": "flac", "mimetype": "audio/flac", "format": "flac", "codec": "flac", "bitrate": None},
+    "opus": {"extension": "opus", "mimetype": "audio/ogg", "format": "opus", "codec": "libopus", "bitrate": "48k"},
+}
+
+# Size of the chunks in which previews are sent while they are encoded
+PREVIEW_CHUNK_SIZE = 64 * 1024
+
+# Sample rate at which compressed files are decoded for the analytics (librosa's default sample rate)
+DECODE_SAMPLE_RATE = 22050
+
+# Number of durations of compressed files kept in memory. A duration is probed again if the file was modified.
+DURATION_CACHE_SIZE = 256
+
+_duration_cache = OrderedDict()
+_duration_cache_lock = threading.Lock()
+
+def get_codec(codec_name):
+    """
+    Returns the settings of a storage codec.
+
+    Args:
+        codec_name (str): The name of the codec, one of `AUDIO_CODECS`.
+
+    Returns:
+        dict: The extension and export settings of the codec.
+
+    Raises:
+        ValueError: If the codec is not supported.
+    """
+    if codec_name not in AUDIO_CODECS:
+        raise ValueError(f"Unknown audio codec: {codec_name}. Choose one of {', '.join(AUDIO_CODECS)}.")
+    return AUDIO_CODECS[codec_name]
+
+def encode_audio(source_filepath, target_filepath, codec_name):
+    """
+    Decodes an audio file of any format supported by ffmpeg and stores it with a storage codec.
+
+    Args:
+        source_filepath (str): The path of the audio file to convert.
+        target_filepath (str): The path of the file to write, including the extension of the codec.
+        codec_name (str): The name of the codec, one of `AUDIO_CODECS`.
+
+    Raises:
+        ValueError: If the codec is not supported.
+    """
+    codec = get_codec(codec_name)
+    audio = AudioSegment.from_file(source_filepath)
+    audio.export(target_filepath, format=codec["format"], codec=codec["codec"], bitrate=codec["bitrate"])
+
+def _open_memory_mapped_wav(audio_filepath):
+    """
+    Returns the parsed WAV file if the file is a WAV file whose samples can be memory-mapped, otherwise None.
+    """
+    try:
+        wav_file = wav_reader.open_wav(audio_filepath)
+    except (ValueError, struct.error):
+        return None
+    return wav_file if wav_file.supports_memory_map else None
+
+def _decode_command(audio_filepath, sample_rate):
+    """
+    Returns the ffmpeg command decoding an audio file to mono float32 samples on its standard output.
+    """
+    return ["ffmpeg", "-nostdin", "-v", "error", "-threads", "0", "-i", audio_filepath,
+            "-f", "f32le", "-ac", "1", "-acodec", "pcm_f32le", "-ar", str(sample_rate), "-"]
+
+def get_sample_rate(audio_filepath):
+    """
+    Returns the sample rate of the samples yielded by `stream_blocks`.
+
+    WAV files are read at their native sample rate, compressed files are decoded at `DECODE_SAMPLE_RATE`.
+
+    Args:
+        audio_filepath (str): The path of the audio file.
+    """
+    wav_file = _open_memory_mapped_wav(audio_filepath)
+    return wav_file.sample_rate if wav_file is not None else DECODE_SAMPLE_RATE
+
+def get_duration(audio_filepath):
+    """
+    Returns the duration of an audio file in seconds.
+
+    The duration of WAV files is read from their cached header, that of compressed files is probed with ffprobe
+    once and cached as long as the file is unchanged.
+
+    Args:
+        audio_filepath (str): The path of the audio file.
+
+    Raises:
+        RuntimeError: If ffprobe cannot determine the duration.
+    """
+    try:
+        return wav_reader.open_wav(audio_filepath).duration
+    except (ValueError, struct.error):
+        pass  # Not a WAV file
+
+    stat = os.stat(audio_filepath)
+    key = (os.path.abspath(audio_filepath), stat.st_mtime_ns, stat.st_size)
+    with _duration_cache_lock:
+        if key in _duration_cache:
+            _duration_cache.move_to_end(key)
+            return _duration_cache[key]
+
+    result = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration",
+                             "-of", "default=noprint_wrappers=1:nokey=1", audio_filepath],
+                            capture_output=True, text=True)
+    try:
+        duration = float(result.stdout.strip())
+    except ValueError:
+        raise RuntimeError(f"Failed to determine the duration of {audio_filepath}: {result.stderr.strip()}")
+
+    with _duration_cache_lock:
+        _duration_cache[key] = duration
+        while len(_duration_cache) > DURATION_CACHE_SIZE:
+            _duration_cache.popitem(last=False)
+
+    return duration
+
+def load_audio(audio_filepath, sample_rate):
+    """
+    Loads a complete audio file as mono float32 samples between -1 and 1.
+
+    WAV files at the requested sample rate are read from their memory-mapped samples, all other files are decoded
+    and resampled with ffmpeg.
+
+    Args:
+        audio_filepath (str): The path of the audio file.
+        sample_rate (int): The sample rate of the returned samples, e.g. 16000 for Whisper.
+
+    Returns:
+        np.ndarray: The samples.
+
+    Raises:
+        RuntimeError: If ffmpeg fails to decode the file.
+    """
+    wav_file = _open_memory_mapped_wav(audio_filepath)
+    if wav_file is not None and wav_file.sample_rate == sample_rate:
+        return wav_file.read_mono()
+
+    result = subprocess.run(_decode_command(audio_filepath, sample_rate), capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to decode {audio_filepath}: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype='<f4').copy()
+
+def _stream_decoded(audio_filepath, block_span, block_step):
+    """
+    Decodes an audio file with ffmpeg and yields overlapping blocks of its samples at `DECODE_SAMPLE_RATE`.
+
+    Only the current block is held in memory, the rest of the file is read from the ffmpeg pipe on demand.
+    """
+    process = subprocess.Popen(_decode_command(audio_filepath, DECODE_SAMPLE_RATE), stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE)
+    try:
+        block = np.empty(0, dtype=np.float32)
+        while True:
+            data = process.stdout.read(4 * (block_span - len(block)))
+            block = np.concatenate([block, np.frombuffer(data, dtype='<f4')])
+            if len(block) == 0:
+                break
+            yield block
+            if len(block) < block_span:
+                break  # End of the file
+            block = block[block_step:]
+
+        if process.wait() != 0:
+            raise RuntimeError(f"Failed to decode {audio_filepath}: "
+                               f"{process.stderr.read().decode(errors='replace').strip()}")
+    finally:
+        # Stop the decoding if the consumer stopped reading early
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+
+def get_mimetype(audio_filepath):
+    """
+    Returns the MIME type of a stored audio file, or None if its extension does not belong to a storage codec.
+
+    Args:
+        audio_filepath (str): The path of the audio file.
+    """
+    extension = os.path.splitext(audio_filepath)[1][1:].lower()
+    for codec in AUDIO_CODECS.values():
+        if codec["extension"] == extension:
+            return codec["mimetype"]
+    return None
+
+def stream_preview(audio_filepath, bitrate):
+    """
+    Encodes a mono Ogg Opus preview of an audio file with ffmpeg and yields it while it is encoded.
+
+    The preview is not stored, its first bytes are available as soon as ffmpeg encoded them, so playback of
+    long recordings starts without waiting for the whole file.
+
+    Args:
+        audio_filepath (str): The path of the audio file.
+        bitrate (str): The bitrate of the preview, e.g. "24k".
+
+    Yields:
+        bytes: The next chunk of the encoded preview.
+    """
+    process = subprocess.Popen(["ffmpeg", "-nostdin", "-v", "error", "-i", audio_filepath, "-vn", "-ac", "1",
+                                "-c:a", "libopus", "-b:a", bitrate, "-application", "voip", "-f", "ogg", "-"],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            chunk = process.stdout.read1(PREVIEW_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        # Stop the encoding if the client disconnected
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        process.stdout.close()
+
+def stream_blocks(audio_filepath, block_length, frame_length, hop_length):
+    """
+    Reads an audio file in blocks of frames with the overlap required for contiguous framing.
+
+    Consecutive blocks overlap by `frame_length - hop_length` samples, so framing each block without centering
+    yields exactly the frames of the whole signal. WAV files are read from their memory-mapped samples,
+    compressed files are decoded with ffmpeg while reading. The samples are at `get_sample_rate`.
+
+    Args:
+        audio_filepath (str): The path of the audio file.
+        block_length (int): The number of frames per block.
+        frame_length (int): The frame length in samples.
+        hop_length (int): The hop length in samples.
+
+    Yields:
+        np.ndarray: The mono float32 samples of the next block.
+    """
+    block_step = block_length * hop_length
+    block_span = (block_length - 1) * hop_length + frame_length
+
+    wav_file = _open_memory_mapped_wav(audio_filepath)
+    if wav_file is not None:
+        for start in range(0, wav_file.frame_count, block_step):
+            yield wav_file.read_mono(start, start + block_span)
+    else:
+        yield from _stream_decoded(audio_filepath, block_span, block_step)
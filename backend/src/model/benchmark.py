@@ -0,0 +1,250 @@
+import os
+import shutil
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from analytics import Analytics
+from transcriber import Model
+from profiles import QUALITY_PROFILES, get_profile
+import utils.utils as utils
+import audio_loader
+import cpu_scheduler
+import transformer
+
+def word_error_rate(reference, hypothesis):
+    """
+    Calculates the word error rate of a hypothesis against a reference text.
+
+    Args:
+        reference (str): The reference text.
+        hypothesis (str): The text to evaluate.
+
+    Returns:
+        float: The word-level edit distance divided by the number of reference words.
+    """
+    reference_words = reference.lower().split()
+    hypothesis_words = hypothesis.lower().split()
+
+    if not reference_words:
+        return float(bool(hypothesis_words))
+
+    # Edit distance over words, keeping only the previous row of the dynamic programming table
+    previous_row = list(range(len(hypothesis_words) + 1))
+    for i, reference_word in enumerate(reference_words, start=1):
+        current_row = [i]
+        for j, hypothesis_word in enumerate(hypothesis_words, start=1):
+            current_row.append(min(
+                previous_row[j] + 1,  # Deletion
+                current_row[j - 1] + 1,  # Insertion
+                previous_row[j - 1] + (reference_word != hypothesis_word),  # Substitution
+            ))
+        previous_row = current_row
+
+    return previous_row[-1] / len(reference_words)
+
+def unigram_f1(reference, hypothesis):
+    """
+    Calculates the unigram overlap F1 score (similar to ROUGE-1) of a hypothesis against a reference text.
+
+    Args:
+        reference (str): The reference text.
+        hypothesis (str): The text to evaluate.
+
+    Returns:
+        float: The F1 score between 0 and 1.
+    """
+    reference_words = reference.lower().split()
+    hypothesis_words = hypothesis.lower().split()
+    if not reference_words or not hypothesis_words:
+        return float(reference_words == hypothesis_words)
+
+    remaining = {}
+    for word in reference_words:
+        remaining[word] = remaining.get(word, 0) + 1
+
+    overlap = 0
+    for word in hypothesis_words:
+        if remaining.get(word, 0) > 0:
+            remaining[word] -= 1
+            overlap += 1
+
+    if overlap == 0:
+        return 0.0
+
+    precision = overlap / len(hypothesis_words)
+    recall = overlap / len(reference_words)
+    return 2 * precision * recall / (precision + recall)
+
+def run_profile(audio_filepath, profile_name, benchmark_filename=None):
+    """
+    Runs the transcription and all analytics stages of a quality profile on an audio file and measures their latency.
+
+    The audio file is copied to the output directory under a benchmark name, so the generated files do not
+    overwrite those of stored recordings. All generated files are removed afterwards. Titles, summaries and improved
+    sentences are generated without their caches, so repeated runs measure the model instead of cache lookups.
+
+    Args:
+        audio_filepath (str): Path to the audio file to analyze.
+        profile_name (str): The name of the quality profile.
+        benchmark_filename (str): The name of the copied audio file. Defaults to "benchmark_<profile_name>".
+
+    Returns:
+        dict: The latency in seconds of the model loading ('load'), the transcription ('transcription'), each
+              analytics stage of the profile and in total ('total'), as well as the generated 'transcript_text' and
+              'summary_text'.
+    """
+    profile = get_profile(profile_name)
+    benchmark_filename = benchmark_filename or f"benchmark_{profile_name}"
+    benchmark_filepath = utils.generate_file_path("raw_audio", benchmark_filename,
+                                                  os.path.splitext(audio_filepath)[1][1:] or None)
+    shutil.copyfile(audio_filepath, benchmark_filepath)
+
+    latencies = {}
+    try:
+        start = time.perf_counter()
+        transcriber = Model.for_profile(profile)
+        latencies["load"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        transcription_filepath, segments, word_count, language = transcriber.transcribe_raw_audio(benchmark_filepath)
+        latencies["transcription"] = time.perf_counter() - start
+
+        analytics = Analytics(benchmark_filepath, transcription_filepath, segments, word_count, language,
+                              bart_num_beams=profile["bart_num_beams"])
+        stages = {
+            "speed_graphics": analytics.generate_plot_wpm,
+            "title": analytics.get_title,
+            "summary": analytics.get_summary,
+            "pitch_graphics": analytics.analyze_pitch,
+            "energy_graphics": analytics.analyze_energy,
+            "improved_text": analytics.improve_text,
+        }
+
+        summary = ""
+        with transformer.bypass_caches():
+            for stage, generate in stages.items():
+                if stage not in profile["stages"]:
+                    continue
+                start = time.perf_counter()
+                result = generate()
+                latencies[stage] = time.perf_counter() - start
+                if stage == "summary":
+                    summary = result
+
+        with open(transcription_filepath, 'r') as file:
+            transcript = file.read()
+    finally:
+        utils.remove_output_files(benchmark_filename)
+
+    # The model is loaded once per process, so the total covers the per-request work only
+    latencies["total"] = sum(latency for stage, latency in latencies.items() if stage != "load")
+    return {**latencies, "transcript_text": transcript, "summary_text": summary}
+
+def benchmark_profiles(audio_filepath, reference_text=None, profile_names=None):
+    """
+    Compares the latency and quality of quality profiles on an audio file.
+
+    The transcript quality is the word error rate against the reference transcript, or against the transcript of
+    the "best" profile if no reference is given. The summary quality is the unigram F1 score against the summary of
+    the "best" profile.
+
+    Args:
+        audio_filepath (str): Path to the audio file to analyze.
+        reference_text (str): The correct transcript of the audio file. Defaults to None.
+        profile_names (list of str): The profiles to compare. Defaults to all profiles.
+
+    Returns:
+        list of dict: One result per profile as returned by `run_profile`, extended by the 'profile' name,
+                      the transcript 'wer' and the 'summary_f1' score.
+    """
+    profile_names = list(profile_names or QUALITY_PROFILES)
+    results = {profile_name: run_profile(audio_filepath, profile_name) for profile_name in profile_names}
+
+    # The best profile serves as reference where no ground truth is available
+    best = results["best"] if "best" in results else run_profile(audio_filepath, "best")
+    reference_text = reference_text if reference_text is not None else best["transcript_text"]
+
+    return [
+        {
+            "profile": profile_name,
+            **result,
+            "wer": word_error_rate(reference_text, result["transcript_text"]),
+            "summary_f1": unigram_f1(best["summary_text"], result["summary_text"]) if result["summary_text"] else None,
+        }
+        for profile_name, result in results.items()
+    ]
+
+def _init_layout_worker(profile_name, plans, pin_affinity):
+    """
+    Sets up a worker process of a thread layout benchmark: applies its CPU plan and loads the models once.
+    """
+    cpu_scheduler.configure_process(plans.get(), pin_affinity)
+
+    from app import app
+
+    app.app_context().push()
+    Model.for_profile(get_profile(profile_name))
+
+def _get_worker_id(_):
+    """
+    Returns the process ID of a worker of a thread layout benchmark once its models are loaded.
+    """
+    time.sleep(0.1)  # Keep the worker busy, so the other tasks reach the other workers
+    return os.getpid()
+
+def _run_layout_task(audio_filepath, profile_name, task_index):
+    """
+    Runs the pipeline of a profile on the audio file in a worker process of a thread layout benchmark.
+    """
+    run_profile(audio_filepath, profile_name, f"benchmark_layout_{os.getpid()}_{task_index}")
+
+def benchmark_thread_layouts(audio_filepath, layouts, profile_name="balanced", task_count=None, pin_affinity=False):
+    """
+    Compares the throughput of layouts of worker processes and torch threads on an audio file.
+
+    Every layout starts its workers with the CPU plan of `cpu_scheduler.plan_workers`, restricted to the threads of
+    the layout, loads the models and then runs the pipeline of the profile on copies of the audio file. Only the
+    processing after the models were loaded is timed.
+
+    Args:
+        audio_filepath (str): Path to the audio file to analyze.
+        layouts (list of tuple): The (worker count, threads per worker) layouts to compare.
+        profile_name (str): The quality profile of the pipeline. Defaults to "balanced".
+        task_count (int): The number of pipeline runs per layout. Defaults to twice the largest worker count.
+        pin_affinity (bool): Whether each worker is pinned to its cores. Defaults to False.
+
+    Returns:
+        list of dict: The 'workers', 'threads', 'tasks', 'wall_seconds', the throughput in 'tasks_per_minute'
+                      and the 'realtime_factor' (seconds of audio processed per second) of each layout.
+    """
+    duration = audio_loader.get_duration(audio_filepath)
+    task_count = task_count or 2 * max(worker_count for worker_count, _ in layouts)
+    context = multiprocessing.get_context("spawn")
+    results = []
+
+    for worker_count, thread_count in layouts:
+        plans = context.Queue()
+        for plan in cpu_scheduler.plan_workers(worker_count):
+            plans.put({**plan, "threads": thread_count})
+
+        with ProcessPoolExecutor(max_workers=worker_count, mp_context=context, initializer=_init_layout_worker,
+                                 initargs=(profile_name, plans, pin_affinity)) as executor:
+            # Wait until every worker loaded its models, so the loading is not timed
+            ready_workers = set()
+            while len(ready_workers) < worker_count:
+                ready_workers.update(executor.map(_get_worker_id, range(worker_count)))
+
+            start = time.perf_counter()
+            list(executor.map(_run_layout_task, [audio_filepath] * task_count, [profile_name] * task_count,
+                              range(task_count)))
+            wall_seconds = time.perf_counter() - start
+
+        results.append({
+            "workers": worker_count,
+            "threads": thread_count,
+            "tasks": task_count,
+            "wall_seconds": wall_seconds,
+            "tasks_per_minute": 60 * task_count / wall_seconds,
+            "realtime_factor": duration * task_count / wall_seconds,
+        })
+    return results
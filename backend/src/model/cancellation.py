@@ -0,0 +1,153 @@
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+# Token of the pipeline running in the current thread, see `activate`
+_local = threading.local()
+
+# Sets of tokens of the running pipelines of this process by the keys under which they can be cancelled
+_tokens = {}
+_tokens_lock = threading.Lock()
+
+class PipelineCancelled(BaseException):
+    """
+    Raised at the next check of a pipeline after it was cancelled.
+
+    Like `asyncio.CancelledError`, it derives from BaseException, so the `except Exception` blocks which wrap the
+    errors of the pipeline stages let it pass instead of reporting the cancellation as failure.
+    """
+    pass
+
+class CancellationToken:
+    """
+    Cooperative cancellation of a pipeline. The pipeline checks the token between its steps and stops at the next
+    check after the token was cancelled.
+    """
+
+    def __init__(self, keys=(), registered_at=None):
+        """
+        Args:
+            keys (tuple): The keys under which the token is registered, see `register`. Defaults to none.
+            registered_at (datetime): The time of the registration. Defaults to None.
+        """
+        self.keys = keys
+        self.registered_at = registered_at
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """
+        Raises:
+            PipelineCancelled: If the token was cancelled.
+        """
+        if self._event.is_set():
+            raise PipelineCancelled()
+
+@contextmanager
+def activate(token):
+    """
+    Makes a token the token of the current thread while the context is active, so `check` stops on its cancellation.
+
+    The stages check the token of their thread, so it does not need to be passed through all of them. Threads
+    started by a stage activate the token of the stage themselves.
+
+    Args:
+        token (CancellationToken): The token, or None for a pipeline which cannot be cancelled.
+    """
+    previous_token = getattr(_local, "token", None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous_token
+
+def get_current_token():
+    """
+    Returns the token of the current thread, or None.
+    """
+    return getattr(_local, "token", None)
+
+def check():
+    """
+    Stops the pipeline of the current thread if its token was cancelled. Cheap enough to be called per model step.
+
+    Raises:
+        PipelineCancelled: If the token of the current thread was cancelled.
+    """
+    token = getattr(_local, "token", None)
+    if token is not None:
+        token.raise_if_cancelled()
+
+def _check_hook(module, inputs):
+    """
+    Forward pre-hook of a model layer which checks the token of the current thread before each forward pass.
+    """
+    check()
+
+def install_checks(module):
+    """
+    Checks the token of the current thread before each forward pass of a model layer, e.g. before each decoding
+    step of a Whisper or BART decoder. Models shared by several threads only stop the cancelled pipeline.
+
+    Args:
+        module (torch.nn.Module): The model layer.
+    """
+    module.register_forward_pre_hook(_check_hook)
+
+@contextmanager
+def register(*keys):
+    """
+    Registers a new token of a running pipeline under keys while the context is active, so `cancel` can find it.
+    Several pipelines may share a key, e.g. the ID of their user. Tokens are only registered in this process, the
+    cancellations requested by other processes are applied to the tokens of `get_registered_tokens`.
+
+    Args:
+        *keys: The hashable keys of the pipeline, e.g. the path of its audio file.
+
+    Yields:
+        CancellationToken: The registered token.
+    """
+    token = CancellationToken(keys, datetime.now())
+    with _tokens_lock:
+        for key in keys:
+            _tokens.setdefault(key, set()).add(token)
+    try:
+        yield token
+    finally:
+        with _tokens_lock:
+            for key in keys:
+                _tokens[key].discard(token)
+                if not _tokens[key]:
+                    del _tokens[key]
+
+def cancel(key):
+    """
+    Cancels the pipelines registered under a key in this process.
+
+    Args:
+        key: The key of the pipelines.
+
+    Returns:
+        int: The number of cancelled pipelines.
+    """
+    with _tokens_lock:
+        tokens = list(_tokens.get(key, ()))
+    for token in tokens:
+        token.cancel()
+    return len(tokens)
+
+def get_registered_tokens():
+    """
+    Returns the tokens of the running pipelines of this process.
+
+    Returns:
+        set of CancellationToken: The registered tokens.
+    """
+    with _tokens_lock:
+        return set().union(*_tokens.values())
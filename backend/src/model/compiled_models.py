@@ -0,0 +1,195 @@
+import os
+import re
+import hashlib
+import torch
+import whisper
+import transformers
+from whisper.audio import N_FRAMES
+from transformers import BartForConditionalGeneration, BartTokenizer
+from transformers.modeling_outputs import BaseModelOutput
+
+# Version of the compilation. Increment it when the traced graphs change, so stale artifacts are not loaded.
+COMPILE_VERSION = 1
+
+# Directory of the compiled artifacts loaded by the models of this process, None if compiled models are disabled
+_artifact_directory = None
+
+def enable(directory):
+    """
+    Makes the models of this process load their compiled artifacts from a directory where they exist.
+
+    Args:
+        directory (str): The directory of the artifacts written by `compile_whisper_encoder` and `compile_bart_encoder`.
+    """
+    global _artifact_directory
+    _artifact_directory = directory
+
+def get_artifact_path(directory, model_name, component):
+    """
+    Returns the path of the compiled artifact of a model component.
+
+    The name contains a hash of the model, the component, the compilation version and the versions of torch and
+    the model library, so artifacts compiled with other library versions are never loaded.
+
+    Args:
+        directory (str): The directory of the artifacts.
+        model_name (str): The name of the model, e.g. "base.en" or "facebook/bart-large-cnn".
+        component (str): The compiled component, "whisper_encoder" or "bart_encoder".
+
+    Returns:
+        str: The path of the artifact.
+    """
+    library_version = whisper.__version__ if component.startswith("whisper") else transformers.__version__
+    key = f"{model_name}|{component}|{COMPILE_VERSION}|{torch.__version__}|{library_version}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(directory, f"{re.sub(r'[^A-Za-z0-9.]+', '-', model_name)}-{component}-{digest}.pt")
+
+def _save_artifact(graph, artifact_path):
+    """
+    Saves a compiled graph atomically, so concurrently starting workers never load a partly written artifact.
+    """
+    os.makedirs(os.path.dirname(artifact_path) or ".", exist_ok=True)
+    temporary_path = f"{artifact_path}.{os.getpid()}.tmp"
+    torch.jit.save(graph, temporary_path)
+    os.replace(temporary_path, artifact_path)
+
+def _load_artifact(model_name, component):
+    """
+    Returns the compiled graph of a model component, or None if compiled models are disabled or it was not compiled.
+    """
+    if _artifact_directory is None:
+        return None
+
+    artifact_path = get_artifact_path(_artifact_directory, model_name, component)
+    if not os.path.isfile(artifact_path):
+        return None
+    return torch.jit.load(artifact_path, map_location="cpu")
+
+def compile_whisper_encoder(model_name, directory):
+    """
+    Traces the audio encoder of a Whisper model for CPU inference and stores the frozen graph.
+
+    The encoder always runs on windows of 30 seconds, so its graph is traced once for that window. A second trace
+    with another batch size checks that the graph also holds for the batched language detection and decoding.
+
+    Args:
+        model_name (str): The name of the Whisper model, e.g. "base" or "base.en".
+        directory (str): The directory of the artifacts.
+
+    Returns:
+        str: The path of the artifact.
+    """
+    model = whisper.load_model(model_name, device="cpu").eval()
+    n_mels = model.dims.n_mels
+
+    with torch.no_grad():
+        graph = torch.jit.trace(model.encoder, torch.zeros(1, n_mels, N_FRAMES),
+                                check_inputs=[(torch.zeros(2, n_mels, N_FRAMES),)])
+        graph = torch.jit.freeze(graph)
+
+    artifact_path = get_artifact_path(directory, model_name, "whisper_encoder")
+    _save_artifact(graph, artifact_path)
+    return artifact_path
+
+def load_whisper_encoder(model, model_name):
+    """
+    Replaces the audio encoder of a loaded Whisper model with its compiled graph, if one was compiled.
+
+    Whisper's decoding, language detection and word timings call the encoder through `model.encoder`, so they
+    use the compiled graph without further changes. Models on a GPU keep their encoder, the graphs are traced
+    for the CPU.
+
+    Args:
+        model (whisper.model.Whisper): The loaded model.
+        model_name (str): The name of the Whisper model.
+
+    Returns:
+        bool: Whether the compiled encoder is used.
+    """
+    if model.device.type != "cpu":
+        return False
+
+    graph = _load_artifact(model_name, "whisper_encoder")
+    if graph is None:
+        return False
+    model.encoder = graph
+    return True
+
+class _BartEncoderGraph(torch.nn.Module):
+    """
+    Exposes the BART encoder with positional tensor inputs and output, as required for tracing.
+    """
+
+    def __init__(self, encoder):
+        super().__init__()
+        self.encoder = encoder
+
+    def forward(self, input_ids, attention_mask):
+        return self.encoder(input_ids=input_ids, attention_mask=attention_mask, return_dict=False)[0]
+
+class CompiledBartEncoder(torch.nn.Module):
+    """
+    Stands in for the BART encoder during `generate`, running the compiled graph instead of the eager encoder.
+    """
+
+    def __init__(self, graph):
+        super().__init__()
+        self.graph = graph
+
+    def forward(self, input_ids=None, attention_mask=None, **kwargs):
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        return BaseModelOutput(last_hidden_state=self.graph(input_ids, attention_mask))
+
+def compile_bart_encoder(model_name, directory):
+    """
+    Traces the encoder of a BART model for CPU inference and stores the frozen graph.
+
+    The encoder is traced on a padded batch and checked against a trace with another batch size and input length,
+    so the graph holds for the padded sentence batches of `improve_sentences` and the long inputs of summaries.
+    The decoder is not compiled, because `generate` runs it step by step with a growing key-value cache.
+
+    Args:
+        model_name (str): The name of the pretrained BART model, e.g. "facebook/bart-large-cnn".
+        directory (str): The directory of the artifacts.
+
+    Returns:
+        str: The path of the artifact.
+    """
+    model = BartForConditionalGeneration.from_pretrained(model_name).eval()
+    tokenizer = BartTokenizer.from_pretrained(model_name)
+
+    def get_inputs(texts):
+        inputs = tokenizer(texts, return_tensors="pt", padding=True)
+        return inputs["input_ids"], inputs["attention_mask"]
+
+    with torch.no_grad():
+        graph = torch.jit.trace(_BartEncoderGraph(model.get_encoder()).eval(),
+                                get_inputs(["A short sentence.", "A somewhat longer sentence to pad the batch."]),
+                                check_inputs=[get_inputs(["A single sentence which is longer than the traced one "
+                                                          "to check that the length is not fixed."])])
+        graph = torch.jit.freeze(graph)
+
+    artifact_path = get_artifact_path(directory, model_name, "bart_encoder")
+    _save_artifact(graph, artifact_path)
+    return artifact_path
+
+def load_bart_encoder(model, model_name):
+    """
+    Replaces the encoder of a loaded BART model with its compiled graph, if one was compiled.
+
+    Args:
+        model (BartForConditionalGeneration): The loaded model on the CPU.
+        model_name (str): The name of the pretrained BART model.
+
+    Returns:
+        bool: Whether the compiled encoder is used.
+    """
+    if model.device.type != "cpu":
+        return False
+
+    graph = _load_artifact(model_name, "bart_encoder")
+    if graph is None:
+        return False
+    model.model.encoder = CompiledBartEncoder(graph)
+    return True
@@ -0,0 +1,112 @@
+import os
+import sys
+
+# Environment variables sizing the thread pools of the native libraries (OpenMP, MKL, OpenBLAS and numba, which
+# librosa uses for its compiled DSP functions). They only take effect if set before the library is loaded.
+THREAD_ENVIRONMENT_VARIABLES = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMBA_NUM_THREADS")
+
+# The plan applied to the current process, if any
+_process_plan = None
+
+def get_available_cores():
+    """
+    Returns the CPU cores this process may run on.
+
+    Returns:
+        list of int: The IDs of the cores, restricted by the CPU affinity of the process where the platform supports it.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def plan_workers(worker_count, pipelines_per_worker=1, cores=None):
+    """
+    Partitions the CPU cores among worker processes and the pipelines each of them runs concurrently.
+
+    Each worker gets a contiguous share of the cores. Its torch threads are divided among its concurrent
+    pipelines, because every pipeline thread uses its own team of intra-op threads; without the division the
+    workers oversubscribe the cores and are slower together than a single worker. Workers beyond the number of
+    cores share the cores with one thread each.
+
+    Args:
+        worker_count (int): The number of worker processes, e.g. server workers or bulk import workers.
+        pipelines_per_worker (int): The number of pipelines a worker runs at the same time. Defaults to 1.
+        cores (list of int): The cores to partition. Defaults to the available cores.
+
+    Returns:
+        list of dict: The plan of each worker with its "cores" and the number of "threads" per pipeline.
+    """
+    cores = list(cores) if cores is not None else get_available_cores()
+    worker_count = max(1, worker_count)
+
+    plans = []
+    for index in range(worker_count):
+        if worker_count <= len(cores):
+            # Spread the remaining cores over the workers, so the shares differ by at most one core
+            start = index * len(cores) // worker_count
+            end = (index + 1) * len(cores) // worker_count
+            worker_cores = cores[start:end]
+        else:
+            worker_cores = [cores[index % len(cores)]]
+        plans.append({
+            "cores": worker_cores,
+            "threads": max(1, len(worker_cores) // max(1, pipelines_per_worker)),
+        })
+    return plans
+
+def configure_process(plan, pin_affinity=False):
+    """
+    Applies a worker plan to the current process.
+
+    Sets the thread counts of torch and the native libraries and optionally pins the process to the cores of
+    the plan. Should be called at the start of a worker process, before torch, numpy or librosa are imported, so
+    that the thread pools of the native libraries are created with the planned size.
+
+    Args:
+        plan (dict): The worker plan as returned by `plan_workers`.
+        pin_affinity (bool): Whether the process only runs on the cores of the plan. Avoids that the scheduler
+                             moves the threads between cores, but leaves cores idle when other workers are idle.
+                             Only supported on Linux. Defaults to False.
+    """
+    global _process_plan
+    _process_plan = plan
+
+    threads = plan["threads"]
+    for variable in THREAD_ENVIRONMENT_VARIABLES:
+        os.environ[variable] = str(threads)
+
+    if pin_affinity and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, plan["cores"])
+
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        # The pipelines run their operators one after another, so the inter-op pool only needs one thread
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # The inter-op pool can only be sized before its first use and keeps its size otherwise
+
+    numba = sys.modules.get("numba")
+    if numba is not None:
+        # numba read NUMBA_NUM_THREADS when it was imported and cannot use more threads than that
+        numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+
+def configure_app_process(config):
+    """
+    Sizes the thread pools of a server process from the app config.
+
+    Every server process gets an equal share of the cores, divided among its `MAX_CONCURRENT_PIPELINES`
+    pipelines. The server processes do not know their index among each other, so they are never pinned.
+    Worker processes which applied their own plan before creating the app, e.g. those of a bulk import, keep it.
+
+    Args:
+        config (dict): The app config with `SERVER_WORKERS`, `TORCH_THREADS` and `MAX_CONCURRENT_PIPELINES`.
+    """
+    if _process_plan is not None:
+        return
+
+    plan = plan_workers(config.get("SERVER_WORKERS", 1), config.get("MAX_CONCURRENT_PIPELINES", 1))[0]
+    if config.get("TORCH_THREADS"):
+        plan["threads"] = config["TORCH_THREADS"]
+    configure_process(plan)
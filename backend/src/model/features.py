@@ -0,0 +1,102 @@
+import librosa
+import numpy as np
+import audio_loader
+import cancellation
+
+# Sample rate for which the frame and hop lengths of the features are specified (librosa's default sample rate).
+# The lengths are scaled to the native sample rate of a file, so features keep the same time resolution.
+REFERENCE_SAMPLE_RATE = 22050
+
+# Number of frames per block. Only one block of samples and the features computed so far are held in memory.
+RMS_BLOCK_LENGTH = 256
+PITCH_BLOCK_LENGTH = 1024  # Longer blocks for pyin, whose pitch tracking is smoothed within a block
+
+def _scale_lengths(sample_rate, frame_length, hop_length):
+    """
+    Scales frame and hop lengths given for `REFERENCE_SAMPLE_RATE` to another sample rate.
+    """
+    factor = sample_rate / REFERENCE_SAMPLE_RATE
+    return max(int(round(frame_length * factor)), 1), max(int(round(hop_length * factor)), 1)
+
+def _stream_blocks(audio_filepath, block_length, frame_length, hop_length):
+    """
+    Reads an audio file in contiguous blocks with `audio_loader.stream_blocks`.
+
+    The last block is padded with zeros to at least one frame. A cancelled pipeline stops before the next block.
+
+    Yields:
+        np.ndarray: The mono samples of the next block.
+    """
+    for block in audio_loader.stream_blocks(audio_filepath, block_length, frame_length, hop_length):
+        cancellation.check()
+        if len(block) < frame_length:
+            block = np.pad(block, (0, frame_length - len(block)))
+        yield block
+
+def _frame_times(frame_count, sample_rate, frame_length, hop_length):
+    """
+    Returns the time in seconds of the center of each frame.
+    """
+    return (np.arange(frame_count) * hop_length + frame_length / 2) / sample_rate
+
+def stream_rms(audio_filepath, frame_length=2048, hop_length=512, block_length=RMS_BLOCK_LENGTH):
+    """
+    Computes the short-time energy (RMS) of an audio file block by block with constant memory.
+
+    Args:
+        audio_filepath (str): The path to the audio file.
+        frame_length (int): The frame length in samples at `REFERENCE_SAMPLE_RATE`. Defaults to 2048.
+        hop_length (int): The hop length in samples at `REFERENCE_SAMPLE_RATE`. Defaults to 512.
+        block_length (int): The number of frames read per block. Defaults to `RMS_BLOCK_LENGTH`.
+
+    Returns:
+        tuple:
+            - np.ndarray: The time in seconds of each frame.
+            - np.ndarray: The RMS energy of each frame (float32).
+    """
+    sample_rate = audio_loader.get_sample_rate(audio_filepath)
+    frame_length, hop_length = _scale_lengths(sample_rate, frame_length, hop_length)
+
+    rms_blocks = []
+    for block in _stream_blocks(audio_filepath, block_length, frame_length, hop_length):
+        rms = librosa.feature.rms(y=block, frame_length=frame_length, hop_length=hop_length, center=False)[0]
+        rms_blocks.append(rms.astype(np.float32))
+
+    rms = np.concatenate(rms_blocks) if rms_blocks else np.array([], dtype=np.float32)
+    return _frame_times(len(rms), sample_rate, frame_length, hop_length), rms
+
+def stream_pitch(audio_filepath, fmin, fmax, frame_length=2048, hop_length=512, block_length=PITCH_BLOCK_LENGTH):
+    """
+    Estimates the fundamental frequency (F0) of an audio file with pyin block by block with constant memory.
+
+    pyin allocates matrices over all frames and pitch candidates of its input, so processing blocks bounds its
+    memory as well. The pitch track is decoded per block, which only affects frames at block boundaries.
+
+    Args:
+        audio_filepath (str): The path to the audio file.
+        fmin (float): The minimum frequency in Hz.
+        fmax (float): The maximum frequency in Hz.
+        frame_length (int): The frame length in samples at `REFERENCE_SAMPLE_RATE`. Defaults to 2048.
+        hop_length (int): The hop length in samples at `REFERENCE_SAMPLE_RATE`. Defaults to 512.
+        block_length (int): The number of frames read per block. Defaults to `PITCH_BLOCK_LENGTH`.
+
+    Returns:
+        tuple:
+            - np.ndarray: The time in seconds of each frame.
+            - np.ndarray: The fundamental frequency of each frame in Hz, NaN for unvoiced frames (float32).
+            - np.ndarray: Whether each frame is voiced.
+    """
+    sample_rate = audio_loader.get_sample_rate(audio_filepath)
+    frame_length, hop_length = _scale_lengths(sample_rate, frame_length, hop_length)
+
+    f0_blocks = []
+    voiced_blocks = []
+    for block in _stream_blocks(audio_filepath, block_length, frame_length, hop_length):
+        f0, voiced_flag, _ = librosa.pyin(block, fmin=fmin, fmax=fmax, sr=sample_rate, frame_length=frame_length,
+                                          hop_length=hop_length, center=False)
+        f0_blocks.append(f0.astype(np.float32))
+        voiced_blocks.append(voiced_flag)
+
+    f0 = np.concatenate(f0_blocks) if f0_blocks else np.array([], dtype=np.float32)
+    voiced_flag = np.concatenate(voiced_blocks) if voiced_blocks else np.array([], dtype=bool)
+    return _frame_times(len(f0), sample_rate, frame_length, hop_length), f0, voiced_flag
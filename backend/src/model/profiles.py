@@ -0,0 +1,58 @@
+# Named quality profiles for the whole analysis pipeline. Each profile controls:
+#   - whisper_model: The size of the Whisper model used for the transcription.
+#   - beam_size: The beam size of the Whisper decoding. None decodes greedily.
+#   - temperature_fallback: Whether Whisper re-decodes failed windows with increasing temperatures.
+#   - bart_num_beams: The number of beams of the BART title, summary and text improvement. 1 decodes greedily.
+#   - stages: The analytics artifacts which are generated for a recording. The speech speed graphic and the title
+#             are cheap metadata and part of every profile.
+#   - realtime_factor: The approximate seconds of processing per second of audio on a single pipeline, with which
+#                      the workers estimate the cost of a queued job to claim short jobs first.
+ALL_STAGES = ("speed_graphics", "pitch_graphics", "energy_graphics", "improved_text", "title", "summary")
+
+QUALITY_PROFILES = {
+    "fast": {
+        "whisper_model": "tiny",
+        "beam_size": None,
+        "temperature_fallback": False,
+        "bart_num_beams": 1,
+        "stages": ("speed_graphics", "energy_graphics", "title", "summary"),
+        "realtime_factor": 0.15,
+    },
+    "balanced": {
+        "whisper_model": "base",
+        "beam_size": None,
+        "temperature_fallback": True,
+        "bart_num_beams": 4,
+        "stages": ALL_STAGES,
+        "realtime_factor": 0.5,
+    },
+    "best": {
+        "whisper_model": "small",
+        "beam_size": 5,
+        "temperature_fallback": True,
+        "bart_num_beams": 4,
+        "stages": ALL_STAGES,
+        "realtime_factor": 1.5,
+    },
+}
+
+# Profile of recordings which were analyzed before profiles existed
+DEFAULT_PROFILE = "balanced"
+
+def get_profile(profile_name):
+    """
+    Returns the settings of a quality profile.
+
+    Args:
+        profile_name (str): The name of the profile, e.g. "fast", "balanced" or "best". None selects the default profile.
+
+    Returns:
+        dict: The settings of the profile.
+
+    Raises:
+        ValueError: If the profile is unknown.
+    """
+    profile_name = profile_name or DEFAULT_PROFILE
+    if profile_name not in QUALITY_PROFILES:
+        raise ValueError(f"Unknown quality profile: {profile_name}. Choose one of {', '.join(QUALITY_PROFILES)}.")
+    return QUALITY_PROFILES[profile_name]
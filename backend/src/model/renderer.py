@@ -0,0 +1,171 @@
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Styling shared by all charts of the dashboard
+TEXT_COLOR = '#f1f1f1'
+FIGURE_SIZE = (6.4, 4.8)  # Size of a chart in inches
+
+# Output formats of the charts. WebP and SVG are considerably smaller than PNG for line charts.
+CHART_FORMATS = ("png", "webp", "svg")
+
+# Resolution used to determine the pixel width of vector charts for the downsampling
+SVG_REFERENCE_DPI = 100
+
+def downsample_lttb(x, y, threshold):
+    """
+    Downsamples a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    The points are divided into buckets, and from each bucket the point forming the largest triangle with the
+    previously selected point and the average of the next bucket is kept. This preserves the visual shape of the
+    series, including its peaks, with far fewer points.
+
+    Args:
+        x (array-like): The x values of the series in ascending order.
+        y (array-like): The y values of the series.
+        threshold (int): The number of points to keep.
+
+    Returns:
+        tuple:
+            - np.ndarray: The x values of the kept points.
+            - np.ndarray: The y values of the kept points.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    point_count = len(x)
+
+    if threshold >= point_count or threshold < 3:
+        return x, y
+
+    # The first and last point are always kept, the others are divided into threshold - 2 buckets
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = point_count - 1
+    bucket_size = (point_count - 2) / (threshold - 2)
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, point_count)
+
+        # Average of the next bucket, the last bucket is followed by the last point
+        average_x = x[end:next_end].mean()
+        average_y = y[end:next_end].mean()
+
+        # Doubled triangle areas between the previously selected point, the candidates and the average
+        areas = np.abs((x[previous] - average_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (average_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+
+    return x[selected], y[selected]
+
+def _create_figure():
+    """
+    Creates a new figure with its own canvas, independent of the global pyplot state.
+
+    Returns:
+        tuple:
+            - Figure: The figure.
+            - Axes: The single axes of the figure.
+    """
+    figure = Figure(figsize=FIGURE_SIZE)
+    FigureCanvasAgg(figure)
+    return figure, figure.add_subplot()
+
+def _style_axes(ax, title, xlabel, ylabel):
+    """
+    Applies the dashboard style (white bold labels, bold white frame and grid) to the axes of a chart.
+    """
+    ax.set_xlabel(xlabel, fontsize=12, fontweight='bold', color=TEXT_COLOR)
+    ax.set_ylabel(ylabel, fontsize=12, fontweight='bold', color=TEXT_COLOR)
+    ax.set_title(title, fontsize=14, fontweight='bold', color=TEXT_COLOR)
+    ax.grid(True, color=TEXT_COLOR)
+
+    # Make the outer frame bolder and white
+    for spine in ax.spines.values():
+        spine.set_visible(True)
+        spine.set_linewidth(2)
+        spine.set_color(TEXT_COLOR)
+
+    # Tick marks and bold tick labels in white
+    ax.tick_params(axis='both', which='major', labelsize=10, width=2, colors=TEXT_COLOR)
+    for label in ax.get_xticklabels() + ax.get_yticklabels():
+        label.set_fontweight('bold')
+
+def _save_figure(figure, filepath, chart_format, dpi):
+    """
+    Saves a figure with a transparent background.
+
+    Raises:
+        ValueError: If the chart format is not supported.
+    """
+    if chart_format not in CHART_FORMATS:
+        raise ValueError(f"Unsupported chart format: {chart_format}. Choose one of {', '.join(CHART_FORMATS)}.")
+    figure.savefig(filepath, format=chart_format, dpi=dpi, transparent=True)
+
+def get_plot_width(ax, chart_format, dpi):
+    """
+    Returns the width of the plotting area of the axes in pixels, i.e. the number of points worth drawing.
+    """
+    resolution = SVG_REFERENCE_DPI if chart_format == "svg" else dpi
+    return int(ax.get_position().width * FIGURE_SIZE[0] * resolution)
+
+def render_line_chart(filepath, x, y, title, xlabel, ylabel, xlim=None, ylim=None, bands=(),
+                      chart_format="png", dpi=150):
+    """
+    Renders a line chart in the dashboard style and saves it to a file.
+
+    The series is downsampled to the pixel width of the plotting area before drawing, so long recordings do not
+    draw hundreds of thousands of invisible line segments.
+
+    Args:
+        filepath (str): The path of the chart file.
+        x (array-like): The x values of the series.
+        y (array-like): The y values of the series.
+        title (str): The title of the chart.
+        xlabel (str): The label of the x-axis.
+        ylabel (str): The label of the y-axis.
+        xlim (tuple): The limits of the x-axis. Defaults to automatic limits.
+        ylim (tuple): The limits of the y-axis. Defaults to automatic limits.
+        bands (iterable of tuples): Horizontal (lower, upper) ranges highlighted in red, e.g. non-optimal ranges.
+        chart_format (str): The file format, one of `CHART_FORMATS`. Defaults to "png".
+        dpi (int): The resolution of raster formats. Defaults to 150.
+
+    Raises:
+        ValueError: If the chart format is not supported.
+    """
+    figure, ax = _create_figure()
+
+    for lower, upper in bands:
+        ax.axhspan(lower, upper, color='red', alpha=0.1)
+
+    x, y = downsample_lttb(x, y, get_plot_width(ax, chart_format, dpi))
+    ax.plot(x, y, color=TEXT_COLOR, linewidth=2)
+
+    if xlim is not None:
+        ax.set_xlim(*xlim)
+    if ylim is not None:
+        ax.set_ylim(*ylim)
+
+    _style_axes(ax, title, xlabel, ylabel)
+    _save_figure(figure, filepath, chart_format, dpi)
+
+def render_placeholder(filepath, message, chart_format="png", dpi=150):
+    """
+    Renders a chart without axes which only shows a message, e.g. if there is no data to display.
+
+    Args:
+        filepath (str): The path of the chart file.
+        message (str): The message to display.
+        chart_format (str): The file format, one of `CHART_FORMATS`. Defaults to "png".
+        dpi (int): The resolution of raster formats. Defaults to 150.
+
+    Raises:
+        ValueError: If the chart format is not supported.
+    """
+    figure, ax = _create_figure()
+    ax.text(0.5, 0.5, message, ha='center', va='center', fontsize=12, color=TEXT_COLOR)
+    ax.axis('off')
+    _save_figure(figure, filepath, chart_format, dpi)
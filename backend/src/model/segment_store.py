@@ -0,0 +1,223 @@
+import struct
+import zipfile
+import numpy as np
+from numpy.lib import format as npy_format
+
+# Size of the fixed part of a zip local file header and the offset of its file name and extra field lengths
+ZIP_LOCAL_HEADER_SIZE = 30
+ZIP_LOCAL_HEADER_LENGTHS_OFFSET = 26
+
+def save_segments(segments, filepath):
+    """
+    Saves transcription segments and their word timings in a compact columnar .npz file.
+
+    Times are stored as parallel float32 arrays and texts as int32 indices into a string table, which stores
+    every distinct segment text and word once as UTF-8. The file is written uncompressed, so `SegmentStore`
+    can memory-map its arrays.
+
+    Args:
+        segments (list[dict]): The transcription segments with "start", "end", "text" and optionally "words" keys,
+                               where each word has "word", "start" and "end" keys.
+        filepath (str): The path of the .npz file to write.
+    """
+    string_ids = {}
+
+    def get_string_id(string):
+        # Store each distinct string only once in the string table
+        if string not in string_ids:
+            string_ids[string] = len(string_ids)
+        return string_ids[string]
+
+    words = [(segment_index, word) for segment_index, segment in enumerate(segments)
+             for word in segment.get("words", [])]
+
+    segment_word_offsets = np.zeros(len(segments) + 1, dtype=np.int32)
+    for segment_index, _ in words:
+        segment_word_offsets[segment_index + 1] += 1
+
+    arrays = {
+        "segment_start": np.array([segment["start"] for segment in segments], dtype=np.float32),
+        "segment_end": np.array([segment["end"] for segment in segments], dtype=np.float32),
+        "segment_text": np.array([get_string_id(segment["text"]) for segment in segments], dtype=np.int32),
+        "segment_word_offsets": np.cumsum(segment_word_offsets, dtype=np.int32),
+        "word_start": np.array([word["start"] for _, word in words], dtype=np.float32),
+        "word_end": np.array([word["end"] for _, word in words], dtype=np.float32),
+        "word_text": np.array([get_string_id(word["word"]) for _, word in words], dtype=np.int32),
+    }
+
+    # Concatenate the UTF-8 encoded strings and store where each of them starts
+    encoded_strings = [string.encode("utf-8") for string in string_ids]
+    string_offsets = np.zeros(len(encoded_strings) + 1, dtype=np.int32)
+    string_offsets[1:] = np.cumsum([len(encoded) for encoded in encoded_strings])
+    arrays["string_offsets"] = string_offsets
+    arrays["string_data"] = np.frombuffer(b"".join(encoded_strings), dtype=np.uint8)
+
+    with open(filepath, 'wb') as file:
+        np.savez(file, **arrays)
+
+def _memory_map_npz(filepath):
+    """
+    Memory-maps all arrays of an uncompressed .npz file without reading their data.
+
+    Args:
+        filepath (str): The path of the .npz file.
+
+    Returns:
+        dict: The read-only arrays by name.
+
+    Raises:
+        ValueError: If the file contains compressed arrays, which cannot be memory-mapped.
+    """
+    arrays = {}
+    with zipfile.ZipFile(filepath) as archive, open(filepath, 'rb') as file:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Cannot memory-map the compressed array {info.filename} of {filepath}.")
+
+            # Skip the local file header of the entry to reach the .npy data
+            file.seek(info.header_offset + ZIP_LOCAL_HEADER_LENGTHS_OFFSET)
+            name_length, extra_length = struct.unpack('<HH', file.read(4))
+            file.seek(info.header_offset + ZIP_LOCAL_HEADER_SIZE + name_length + extra_length)
+
+            # Parse the .npy header to find the shape, type and start of the array data
+            version = npy_format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = npy_format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = npy_format.read_array_header_2_0(file)
+
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)  # Empty arrays cannot be memory-mapped
+            else:
+                arrays[name] = np.memmap(filepath, dtype=dtype, mode='r', offset=file.tell(), shape=shape,
+                                         order='F' if fortran_order else 'C')
+
+    return arrays
+
+class SegmentStore:
+    """
+    Read-only access to transcription segments and word timings saved with `save_segments`.
+
+    The arrays are memory-mapped, so opening the store is cheap and only the accessed parts of the file are read.
+    Segments are ordered by time, so time ranges are found with a binary search.
+    """
+
+    def __init__(self, filepath):
+        """
+        Memory-maps the segments file.
+
+        Args:
+            filepath (str): The path of the .npz file written by `save_segments`.
+        """
+        self.filepath = filepath
+        arrays = _memory_map_npz(filepath)
+        self.segment_start = arrays["segment_start"]
+        self.segment_end = arrays["segment_end"]
+        self.segment_text = arrays["segment_text"]
+        self.segment_word_offsets = arrays["segment_word_offsets"]
+        self.word_start = arrays["word_start"]
+        self.word_end = arrays["word_end"]
+        self.word_text = arrays["word_text"]
+        self.string_offsets = arrays["string_offsets"]
+        self.string_data = arrays["string_data"]
+
+    def __len__(self):
+        """
+        Returns the number of segments.
+        """
+        return len(self.segment_start)
+
+    def get_string(self, string_id):
+        """
+        Returns a string of the string table.
+
+        Args:
+            string_id (int): The index of the string.
+
+        Returns:
+            str: The decoded string.
+        """
+        start, end = self.string_offsets[string_id], self.string_offsets[string_id + 1]
+        return self.string_data[start:end].tobytes().decode("utf-8")
+
+    def get_segment(self, index, include_words=True):
+        """
+        Returns a segment in the format of Whisper's transcription segments.
+
+        Args:
+            index (int): The index of the segment.
+            include_words (bool): Whether to include the word timings. Defaults to True.
+
+        Returns:
+            dict: The segment with "id", "start", "end", "text" and, if requested, "words" keys.
+        """
+        segment = {
+            "id": int(index),
+            "start": float(self.segment_start[index]),
+            "end": float(self.segment_end[index]),
+            "text": self.get_string(self.segment_text[index]),
+        }
+
+        if include_words:
+            first_word, last_word = self.segment_word_offsets[index], self.segment_word_offsets[index + 1]
+            segment["words"] = [
+                {
+                    "word": self.get_string(self.word_text[word_index]),
+                    "start": float(self.word_start[word_index]),
+                    "end": float(self.word_end[word_index]),
+                }
+                for word_index in range(first_word, last_word)
+            ]
+
+        return segment
+
+    def get_segments(self, include_words=True):
+        """
+        Returns all segments in the format of Whisper's transcription segments.
+
+        Args:
+            include_words (bool): Whether to include the word timings. Defaults to True.
+
+        Returns:
+            list[dict]: The segments, see `get_segment`.
+        """
+        return [self.get_segment(index, include_words) for index in range(len(self))]
+
+    def get_segments_in_range(self, start, end, include_words=True):
+        """
+        Returns the segments overlapping a time range.
+
+        Args:
+            start (float): The start of the range in seconds.
+            end (float): The end of the range in seconds.
+            include_words (bool): Whether to include the word timings. Defaults to True.
+
+        Returns:
+            list[dict]: The overlapping segments, see `get_segment`.
+        """
+        first = int(np.searchsorted(self.segment_end, start, side='left'))
+        last = int(np.searchsorted(self.segment_start, end, side='right'))
+        return [self.get_segment(index, include_words) for index in range(first, last)]
+
+    def get_words_in_range(self, start, end):
+        """
+        Returns the words overlapping a time range.
+
+        Args:
+            start (float): The start of the range in seconds.
+            end (float): The end of the range in seconds.
+
+        Returns:
+            list[dict]: The words with "word", "start" and "end" keys.
+        """
+        first = int(np.searchsorted(self.word_end, start, side='left'))
+        last = int(np.searchsorted(self.word_start, end, side='right'))
+        return [
+            {
+                "word": self.get_string(self.word_text[index]),
+                "start": float(self.word_start[index]),
+                "end": float(self.word_end[index]),
+            }
+            for index in range(first, last)
+        ]
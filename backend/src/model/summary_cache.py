@@ -0,0 +1,262 @@
+import os
+import time
+import atexit
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Maximum size in bytes of the summaries kept in memory per process, evicting the least recently used ones
+MEMORY_CACHE_MAX_BYTES = 4 * 2**20
+
+# Seconds after which the lookup counters of this process are added to the totals of all processes on disk
+COUNTER_FLUSH_INTERVAL = 30.0
+
+# Path of the SQLite file shared by all processes, None disables the disk tier, and its maximum size in bytes
+_disk_path = None
+_disk_max_bytes = 64 * 2**20
+
+_memory_cache = OrderedDict()
+_memory_bytes = 0
+_lock = threading.Lock()
+
+# Connection to the disk tier, opened once per process and used by one thread at a time
+_connection = None
+_connection_pid = None
+_disk_lock = threading.Lock()
+
+# Lookups of this process by outcome, and those not yet added to the totals on disk
+_counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+_unflushed_counters = dict.fromkeys(_counters, 0)
+_last_flush = time.monotonic()
+
+def configure(disk_path, disk_max_bytes):
+    """
+    Enables the disk tier of the cache, which survives restarts and is shared by the processes of a machine.
+
+    Args:
+        disk_path (str): The path of the SQLite file. None disables the disk tier.
+        disk_max_bytes (int): The maximum size of the cached summaries on disk. The least recently used summaries
+                              are evicted beyond it.
+    """
+    global _disk_path, _disk_max_bytes, _connection
+    with _disk_lock:
+        if disk_path != _disk_path:
+            if _connection is not None and _connection_pid == os.getpid():
+                _connection.close()
+            _connection = None  # Opened for the new path on the next access
+        _disk_path = disk_path
+        _disk_max_bytes = disk_max_bytes
+
+def get_key(text, model_name, min_length, max_length, num_beams):
+    """
+    Returns the cache key of a summary: a hash of the text, the model and the generation parameters.
+    """
+    return hashlib.sha256(f"{model_name}|{min_length}|{max_length}|{num_beams}|{text}".encode("utf-8")).hexdigest()
+
+def _open_connection():
+    """
+    Opens the SQLite file of the disk tier and creates its tables.
+    """
+    os.makedirs(os.path.dirname(_disk_path) or ".", exist_ok=True)
+    connection = sqlite3.connect(_disk_path, timeout=30, check_same_thread=False)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")  # Readers of other processes do not block the writer
+        connection.execute("CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+                           "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        connection.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    except sqlite3.Error:
+        connection.close()
+        raise
+    return connection
+
+@contextmanager
+def _connect():
+    """
+    Yields the connection to the disk tier in a transaction. The connection is opened once per process, a
+    connection inherited from the parent of a forked process is not used.
+    """
+    global _connection, _connection_pid
+    with _disk_lock:
+        if _connection is None or _connection_pid != os.getpid():
+            _connection, _connection_pid = _open_connection(), os.getpid()
+        with _connection:  # Commits the transaction, or rolls it back on errors
+            yield _connection
+
+def _get_size(key, summary):
+    """
+    Returns the size of a cached summary in bytes, as counted against the maximum sizes of the tiers.
+    """
+    return len(summary.encode("utf-8")) + len(key)
+
+def _remember(key, summary):
+    """
+    Stores a summary in the memory tier. Must be called with the lock held.
+    """
+    global _memory_bytes
+    previous_summary = _memory_cache.pop(key, None)
+    if previous_summary is not None:
+        _memory_bytes -= _get_size(key, previous_summary)
+    _memory_cache[key] = summary
+    _memory_bytes += _get_size(key, summary)
+    while _memory_bytes > MEMORY_CACHE_MAX_BYTES and _memory_cache:
+        # Evict the least recently used summary
+        evicted_key, evicted_summary = _memory_cache.popitem(last=False)
+        _memory_bytes -= _get_size(evicted_key, evicted_summary)
+
+def _flush_counters():
+    """
+    Adds the lookups counted by this process since the last flush to the totals of all processes on disk. The
+    counts are kept for the next flush if the disk tier is not writable.
+    """
+    global _last_flush
+    with _lock:
+        counts = [(outcome, count) for outcome, count in _unflushed_counters.items() if count]
+        for outcome in _unflushed_counters:
+            _unflushed_counters[outcome] = 0
+        _last_flush = time.monotonic()
+
+    if not counts or _disk_path is None:
+        return
+
+    try:
+        with _connect() as connection:
+            connection.executemany("INSERT INTO counters (name, value) VALUES (?, ?) "
+                                   "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value", counts)
+    except sqlite3.Error:
+        with _lock:
+            for outcome, count in counts:
+                _unflushed_counters[outcome] += count
+
+# Counts of the last interval are not lost when the process exits
+atexit.register(_flush_counters)
+
+def _count(outcome):
+    """
+    Counts a lookup by outcome in this process. With a disk tier, the counts are added to the totals of all
+    processes at most every `COUNTER_FLUSH_INTERVAL` seconds instead of writing to disk on every lookup.
+    """
+    with _lock:
+        _counters[outcome] += 1
+        if _disk_path is None:
+            return
+        _unflushed_counters[outcome] += 1
+        flush_due = time.monotonic() - _last_flush >= COUNTER_FLUSH_INTERVAL
+
+    if flush_due:
+        _flush_counters()
+
+def get(key):
+    """
+    Returns a cached summary from the memory tier, or else from the disk tier.
+
+    Memory hits do not access the disk. Summaries found on disk are kept in memory for the following lookups. An
+    unreadable disk tier counts as miss.
+
+    Args:
+        key (str): The key from `get_key`.
+
+    Returns:
+        str: The cached summary, or None if it is not cached.
+    """
+    with _lock:
+        summary = _memory_cache.get(key)
+        if summary is not None:
+            _memory_cache.move_to_end(key)
+    if summary is not None:
+        _count("memory_hits")
+        return summary
+
+    if _disk_path is not None:
+        try:
+            with _connect() as connection:
+                row = connection.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    summary = row[0]
+                    connection.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error:
+            summary = None
+
+    if summary is not None:
+        with _lock:
+            _remember(key, summary)
+    _count("misses" if summary is None else "disk_hits")
+    return summary
+
+def put(key, summary):
+    """
+    Stores a generated summary in both tiers and evicts the least recently used summaries beyond the disk size.
+
+    Failures of the disk tier are ignored, the summary is then only cached in memory.
+
+    Args:
+        key (str): The key from `get_key`.
+        summary (str): The generated summary.
+    """
+    with _lock:
+        _remember(key, summary)
+
+    if _disk_path is None:
+        return
+
+    try:
+        with _connect() as connection:
+            connection.execute("INSERT OR REPLACE INTO summaries (key, summary, size, last_used) VALUES (?, ?, ?, ?)",
+                               (key, summary, _get_size(key, summary), time.time()))
+            # Keep the most recently used summaries which fit into the maximum size together
+            connection.execute(
+                "DELETE FROM summaries WHERE key IN (SELECT key FROM "
+                "(SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS kept_size FROM summaries) "
+                "WHERE kept_size > ?)", (_disk_max_bytes,))
+    except sqlite3.Error:
+        pass
+
+def get_stats():
+    """
+    Returns the lookup counters and the size of the cache tiers.
+
+    The counters of this process are flushed to disk first, those of other processes include their lookups up
+    to their last flush, see `COUNTER_FLUSH_INTERVAL`.
+
+    Returns:
+        dict: The "memory_hits", "disk_hits" and "misses" and their "hit_rate", counted over all processes sharing
+              the disk tier or else by this process, the number of "memory_entries" and "memory_bytes" of this
+              process and the number of "disk_entries" and "disk_bytes" (None without disk tier).
+    """
+    _flush_counters()
+    with _lock:
+        stats = {**_counters, "memory_entries": len(_memory_cache), "memory_bytes": _memory_bytes,
+                 "disk_entries": None, "disk_bytes": None}
+
+    if _disk_path is not None:
+        try:
+            with _connect() as connection:
+                stats.update({counter: 0 for counter in _counters})
+                stats.update(connection.execute("SELECT name, value FROM counters").fetchall())
+                stats["disk_entries"], disk_bytes = connection.execute(
+                    "SELECT COUNT(*), SUM(size) FROM summaries").fetchone()
+                stats["disk_bytes"] = disk_bytes or 0
+        except sqlite3.Error:
+            pass
+
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+    return stats
+
+def clear():
+    """
+    Removes all summaries from both tiers and resets the counters.
+    """
+    global _memory_bytes
+    with _lock:
+        _memory_cache.clear()
+        _memory_bytes = 0
+        for counter in _counters:
+            _counters[counter] = 0
+            _unflushed_counters[counter] = 0
+
+    if _disk_path is not None and os.path.isfile(_disk_path):
+        with _connect() as connection:
+            connection.execute("DELETE FROM summaries")
+            connection.execute("DELETE FROM counters")
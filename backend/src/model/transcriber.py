@@ -1,5 +1,53 @@
+import json
+import threading
+import torch
 import whisper
+from whisper.audio import N_SAMPLES, HOP_LENGTH
+from whisper.tokenizer import get_tokenizer
+from whisper.timing import add_word_timestamps
 import utils.utils as utils
+import segment_store
+import audio_loader
+import compiled_models
+import cancellation
+
+# Thresholds of Whisper's `transcribe` below which a decoding counts as failed and is repeated with temperature fallback
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+# Duration of a Whisper timestamp token in seconds
+TIME_PRECISION = 0.02
+
+# Temperatures with which Whisper's `transcribe` re-decodes windows whose decoding failed
+FALLBACK_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+# Whisper models with an English-only variant ("<name>.en"), which is faster and more accurate on English speech
+ENGLISH_ONLY_MODELS = ("tiny", "base", "small", "medium")
+
+# Loaded models per quality profile settings, shared by all requests of a process
+_models = {}
+_models_lock = threading.Lock()
+
+# Loaded Whisper models per name, shared by the models of all quality profiles
+_whisper_models = {}
+_whisper_models_lock = threading.Lock()
+
+def _load_whisper_model(name):
+    """
+    Returns the Whisper model of a name, loading it on first use.
+
+    The encoder of the model is replaced by its compiled graph if compiled models are enabled and the model was
+    compiled with `flask models compile`. The decoder checks the cancellation token of the calling pipeline before
+    each decoding step, so a cancelled transcription stops within its current 30 second window.
+    """
+    with _whisper_models_lock:
+        if name not in _whisper_models:
+            model = whisper.load_model(name)
+            compiled_models.load_whisper_encoder(model, name)
+            cancellation.install_checks(model.decoder)
+            _whisper_models[name] = model
+        return _whisper_models[name]
 
 class RecordingError(Exception):
     """Custom exception for recording errors."""
@@ -13,14 +61,79 @@ class Model:
     users to transcribe recordings using pre-trained models.
     """
 
-    def __init__(self, whisper_model="base"):
+    def __init__(self, whisper_model="base", beam_size=None, temperature_fallback=True):
         """
         Initializes the AudioModel with a Whisper model and a specified sample rate.
 
         Args:
             whisper_model (str): The name of the Whisper model to use (e.g., "base", "large"). Defaults to "base".
+            beam_size (int): The beam size of the decoding. None decodes greedily. Defaults to None.
+            temperature_fallback (bool): Whether windows whose decoding failed are re-decoded with increasing
+                                         temperatures. Defaults to True.
+        """
+        self.whisper_model = whisper_model
+        self.transcription_model = _load_whisper_model(whisper_model)
+        self.beam_size = beam_size
+        self.temperature_fallback = temperature_fallback
+
+    @classmethod
+    def for_profile(cls, profile):
+        """
+        Returns the model for the settings of a quality profile, loading it on first use.
+
+        Models are cached per process, so profiles sharing the same Whisper settings share one loaded model.
+
+        Args:
+            profile (dict): The settings of a quality profile, see `profiles.QUALITY_PROFILES`.
+
+        Returns:
+            Model: The model for the profile.
+        """
+        key = (profile["whisper_model"], profile["beam_size"], profile["temperature_fallback"])
+        with _models_lock:
+            if key not in _models:
+                _models[key] = cls(*key)
+            return _models[key]
+
+    def get_model_for_language(self, language):
+        """
+        Returns the Whisper model which transcribes a language best.
+
+        English speech is routed to the English-only variant of the model where one exists, all other languages
+        are transcribed with the multilingual model. The English-only model is loaded on first use.
+
+        Args:
+            language (str): The language code detected by `detect_languages`, e.g. "en".
+
+        Returns:
+            whisper.model.Whisper: The model to transcribe the language with.
         """
-        self.transcription_model = whisper.load_model(whisper_model)
+        if language == "en" and self.whisper_model in ENGLISH_ONLY_MODELS:
+            return _load_whisper_model(f"{self.whisper_model}.en")
+        return self.transcription_model
+
+    def detect_languages(self, audios):
+        """
+        Detects the spoken language of audio clips from their first 30 seconds.
+
+        The clips are encoded together in a single pass of the multilingual encoder and only the language token is
+        decoded, which is much cheaper than letting Whisper detect the language during the transcription.
+
+        Args:
+            audios (list of np.ndarray): The clips as 16 kHz mono float32 samples.
+
+        Returns:
+            list of str: The most probable language code of each clip, e.g. "en".
+        """
+        model = self.transcription_model
+        if not model.is_multilingual:
+            return ["en"] * len(audios)
+
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels) for audio in audios
+        ]).to(model.device)
+        _, probabilities = model.detect_language(mel)
+        return [max(clip_probabilities, key=clip_probabilities.get) for clip_probabilities in probabilities]
 
     def transcribe_raw_audio(self, audio_filepath):
         """
@@ -50,8 +163,20 @@ class Model:
             RuntimeError: If an error occurs during the transcription process.
         """
 
+        # Decode the stored audio, which may be compressed, to Whisper's 16 kHz mono samples
+        audio = audio_loader.load_audio(audio_filepath, whisper.audio.SAMPLE_RATE)
+
+        # Detect the language on the first 30 seconds and pin it, so the best model for it is used throughout
+        language = self.detect_languages([audio])[0]
+
         # Transcribe the audio including the timestamps to allow analysis in the analytics class
-        result = self.transcription_model.transcribe(audio=audio_filepath, word_timestamps=True)
+        result = self.get_model_for_language(language).transcribe(
+            audio=audio,
+            language=language,
+            word_timestamps=True,
+            beam_size=self.beam_size,
+            temperature=FALLBACK_TEMPERATURES if self.temperature_fallback else 0.0,
+        )
 
         transcription = result["text"].strip()  # Clean up any leading/trailing whitespace
         language = result["language"] # Get the language from the audio recording / transcription
@@ -64,6 +189,169 @@ class Model:
 
         return filepath, segments, word_count, language
 
+    def transcribe_raw_audio_batch(self, audio_filepaths, batch_size=8):
+        """
+        Transcribes several raw audio files and returns the same results as `transcribe_raw_audio` for each file.
+
+        Clips of at most 30 seconds fit into a single Whisper window. They are grouped into batches whose padded
+        log-mel spectrograms run through the encoder together and are decoded together. Longer clips and clips whose
+        batched decoding fails Whisper's quality thresholds are transcribed separately with `transcribe_raw_audio`,
+        which applies the temperature fallback.
+
+        Args:
+            audio_filepaths (list of str): The full file paths of the audio files to transcribe.
+            batch_size (int): The maximum number of clips decoded together. Defaults to 8.
+
+        Returns:
+            list: For each audio file, in the given order, either the tuple returned by `transcribe_raw_audio`
+                  or the exception which occurred while transcribing the file.
+        """
+        results = [None] * len(audio_filepaths)
+        short_clips = []
+
+        # Load the audio and separate the clips fitting into a single Whisper window
+        for index, audio_filepath in enumerate(audio_filepaths):
+            try:
+                audio = audio_loader.load_audio(audio_filepath, whisper.audio.SAMPLE_RATE)
+            except Exception as e:
+                results[index] = e
+                continue
+
+            if len(audio) <= N_SAMPLES:
+                short_clips.append((index, audio))
+
+        # Group the clips by their language, so each batch is decoded with the best model for its language
+        clips_by_language = {}
+        for batch_start in range(0, len(short_clips), batch_size):
+            batch = short_clips[batch_start:batch_start + batch_size]
+            try:
+                languages = self.detect_languages([audio for _, audio in batch])
+            except Exception:
+                continue  # Leave the batch to the separate transcription below
+            for clip, language in zip(batch, languages):
+                clips_by_language.setdefault(language, []).append(clip)
+
+        for language, clips in clips_by_language.items():
+            for batch_start in range(0, len(clips), batch_size):
+                batch = clips[batch_start:batch_start + batch_size]
+                try:
+                    decoded = self._decode_batch([audio for _, audio in batch], language)
+                except Exception:
+                    continue  # Leave the batch to the separate transcription below
+
+                for (index, audio), result in zip(batch, decoded):
+                    if result is not None:
+                        transcription, segments, language = result
+                        filepath = self.save_transcription_to_file(transcription, audio_filepaths[index])
+                        results[index] = (filepath, segments, len(transcription.split()), language)
+
+        # Transcribe long clips and clips which failed in the batch separately
+        for index, audio_filepath in enumerate(audio_filepaths):
+            if results[index] is None:
+                try:
+                    results[index] = self.transcribe_raw_audio(audio_filepath)
+                except Exception as e:
+                    results[index] = e
+
+        return results
+
+    def _decode_batch(self, audios, language=None):
+        """
+        Decodes a batch of audio clips of at most 30 seconds with a single Whisper encoder and decoder pass.
+
+        Args:
+            audios (list of np.ndarray): The clips as 16 kHz mono float32 samples.
+            language (str): The language of all clips, see `get_model_for_language`. Defaults to None, which lets
+                            Whisper detect the language of each clip.
+
+        Returns:
+            list: For each clip either a tuple of the transcribed text, its segments in the format of
+                  `transcribe_raw_audio` and the detected language, or None if the decoding failed Whisper's
+                  quality thresholds and needs the temperature fallback.
+        """
+        model = self.get_model_for_language(language)
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels) for audio in audios
+        ]).to(model.device)
+
+        options = whisper.DecodingOptions(task="transcribe", language=language, temperature=0.0,
+                                          beam_size=self.beam_size, fp16=model.device.type != "cpu")
+        decoded = whisper.decode(model, mel, options)
+
+        results = []
+        for audio, clip_mel, result in zip(audios, mel, decoded):
+            duration = len(audio) / whisper.audio.SAMPLE_RATE
+
+            # Silence: Whisper's transcribe skips the window
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+                results.append(("", [], result.language))
+                continue
+
+            # Failed decoding: Whisper's transcribe retries with a higher temperature
+            failed = result.compression_ratio > COMPRESSION_RATIO_THRESHOLD or result.avg_logprob < LOGPROB_THRESHOLD
+            if failed and self.temperature_fallback:
+                results.append(None)
+                continue
+
+            tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                                      language=result.language, task="transcribe")
+            segments = self._segments_from_tokens(tokenizer, result.tokens, duration)
+            try:
+                add_word_timestamps(segments=segments, model=model, tokenizer=tokenizer, mel=clip_mel,
+                                    num_frames=len(audio) // HOP_LENGTH, last_speech_timestamp=0.0)
+            except Exception:
+                pass  # Word timings are optional, the segments stay usable without them
+
+            results.append((result.text.strip(), segments, result.language))
+
+        return results
+
+    @staticmethod
+    def _segments_from_tokens(tokenizer, tokens, duration):
+        """
+        Splits the decoded tokens of a single Whisper window into segments at the timestamp tokens.
+
+        Args:
+            tokenizer (whisper.tokenizer.Tokenizer): The tokenizer used for decoding.
+            tokens (list of int): The decoded tokens including timestamp tokens.
+            duration (float): The duration of the clip in seconds, used as end of an unterminated segment.
+
+        Returns:
+            list[dict]: The segments with "id", "start", "end", "text" and "tokens" keys.
+        """
+        segments = []
+        start = None
+        text_tokens = []
+
+        def add_segment(end):
+            segments.append({
+                "id": len(segments),
+                "start": start or 0.0,
+                "end": min(end, duration),
+                "text": tokenizer.decode(text_tokens),
+                "tokens": list(text_tokens),
+            })
+
+        for token in tokens:
+            if token < tokenizer.timestamp_begin:
+                text_tokens.append(token)
+                continue
+
+            time = (token - tokenizer.timestamp_begin) * TIME_PRECISION
+            if text_tokens:
+                # A timestamp after text closes the current segment
+                add_segment(time)
+                start = None
+                text_tokens = []
+            else:
+                # A timestamp before text opens the next segment
+                start = time
+
+        if text_tokens:
+            add_segment(duration)
+
+        return segments
+
     @staticmethod
     def save_transcription_to_file(transcription, audio_filepath):
         """
@@ -92,7 +380,7 @@ class Model:
         """
 
         # Extract only the filename of the audio recording including timestamp
-        audio_filename = audio_filepath.replace('src/static/output/raw_audio/', '')[:-4]
+        audio_filename = utils.get_audio_filename(audio_filepath)
         # Generate the file path for the transcription file
         recording_filepath = utils.generate_file_path("transcription", audio_filename)
 
@@ -101,3 +389,46 @@ class Model:
             file.write(transcription)
 
         return recording_filepath
+
+    @staticmethod
+    def save_segments_to_file(segments, audio_filepath):
+        """
+        Saves the transcription segments so analytics, exports and searches can use them without transcribing again.
+
+        The segments and word timings are stored in a compact columnar .npz file, see `segment_store.save_segments`.
+
+        Args:
+            segments (list[dict]): The transcription segments as returned by `transcribe_raw_audio`.
+            audio_filepath (str): The path to the source audio file, used to derive the segments file name.
+
+        Returns:
+            str: The file path of the saved .npz file.
+        """
+
+        # Extract only the filename of the audio recording including timestamp
+        audio_filename = utils.get_audio_filename(audio_filepath)
+        # Generate the file path for the segments file
+        segments_filepath = utils.generate_file_path("segments", audio_filename)
+
+        segment_store.save_segments(segments, segments_filepath)
+
+        return segments_filepath
+
+    @staticmethod
+    def load_segments_from_file(segments_filepath):
+        """
+        Loads transcription segments previously stored with `save_segments_to_file`.
+
+        Segments of older recordings, which were stored as .json files, are loaded as well.
+
+        Args:
+            segments_filepath (str): The path to the .npz or .json segments file.
+
+        Returns:
+            list[dict]: The transcription segments with "id", "start", "end", "text" and "words" keys.
+        """
+        if segments_filepath.endswith('.json'):
+            with open(segments_filepath, 'r') as file:
+                return json.load(file)
+
+        return segment_store.SegmentStore(segments_filepath).get_segments()
@@ -1,5 +1,14 @@
 import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
 from transformers import BartForConditionalGeneration, BartTokenizer
+import compiled_models
+import summary_cache
+import cancellation
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"  # Avoid deadlock warnings
 
@@ -10,33 +19,83 @@ models = {
 
 model_name = 'BART'
 
+# Languages the model was trained on. Texts in other languages are not summarized or improved by the model.
+SUPPORTED_LANGUAGES = ("en",)
+
+# Maximum number of sentences improved together in one padded batch
+IMPROVE_BATCH_SIZE = 8
+
+# Width in tokens of the length buckets of the sentences. Sentences are only batched within their bucket, whose
+# bounds determine the output length, so a sentence is improved the same way whichever batch it is part of
+IMPROVE_LENGTH_BUCKET = 8
+
+# Improved sentences by hash of model, decoding parameters and sentence, evicting the least recently used sentences
+SENTENCE_CACHE_SIZE = 4096
+_sentence_cache = OrderedDict()
+_sentence_cache_lock = threading.Lock()
+
+# Number of active `bypass_caches` blocks of this process, in which summaries and sentences are always generated
+_cache_bypasses = 0
+
+@contextmanager
+def bypass_caches():
+    """
+    Generates all summaries and improved sentences of this process within the block with the model, without reading
+    or storing cached ones, e.g. so a benchmark measures the model instead of cache lookups.
+    """
+    global _cache_bypasses
+    with _sentence_cache_lock:
+        _cache_bypasses += 1
+    try:
+        yield
+    finally:
+        with _sentence_cache_lock:
+            _cache_bypasses -= 1
+
+@lru_cache(maxsize=None)
 def load_model_and_tokenizer():
+    # The model and tokenizer are loaded once per process and shared by all calls
     if model_name == 'BART':
         model = BartForConditionalGeneration.from_pretrained(models['BART'])
         tokenizer = BartTokenizer.from_pretrained(models['BART'])
+        # Use the compiled encoder if compiled models are enabled and it was compiled with `flask models compile`
+        compiled_models.load_bart_encoder(model, models['BART'])
+        # Stop the generation of a cancelled pipeline at its next decoding step
+        cancellation.install_checks(model.get_decoder())
     else:
         raise ValueError(f"Model {model_name} is not supported.")
     return model, tokenizer
 
-def generate_summary(filepath, min_length, max_length):
+def generate_summary(filepath, min_length, max_length, num_beams=4):
     """
     Generates a summary of the given text file between min_length and max_length using the selected model.
 
+    Summaries are cached by the hash of the text, the model and the parameters, see `summary_cache`.
+
     Args:
         filepath (str): Path to the file to summarize.
         min_length (int): Minimum number of words in the summary.
         max_length (int): Maximum number of words in the summary.
+        num_beams (int): Number of beams of the beam search. 1 decodes greedily. Defaults to 4.
 
     Returns:
         str: Generated summary text.
     """
-    # Load the model and tokenizer
-    model, tokenizer = load_model_and_tokenizer()
-
     # Load text from the file
     with open(filepath, 'r') as file:
         text = file.read()
 
+    # Reuse the summary of the same text with the same parameters, e.g. on a retried analysis or a common phrase
+    use_cache = not _cache_bypasses
+    cache_key = summary_cache.get_key(text, models[model_name], min_length, max_length, num_beams)
+    summary = summary_cache.get(cache_key) if use_cache else None
+    if summary is not None:
+        return summary
+
+    # Load the model and tokenizer
+    cancellation.check()
+    model, tokenizer = load_model_and_tokenizer()
+
     # Tokenize the input text
     inputs = tokenizer(text, return_tensors="pt", max_length=1024, truncation=True)
 
@@ -45,45 +104,154 @@ def generate_summary(filepath, min_length, max_length):
         inputs["input_ids"],
         max_length=max_length,
         min_length=min_length,
-        num_beams=4,
-        early_stopping=True
+        num_beams=num_beams,
+        early_stopping=num_beams > 1
     )
 
     # Decode the summary
-    summary = tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+    summary = tokenizer.decode(summary_ids[0], skip_special_tokens=True).strip()
+
+    if use_cache:
+        summary_cache.put(cache_key, summary)
+    return summary
+
+def split_sentences(text, max_words=150):
+    """
+    Splits a text into sentences, further splitting sentences which are too long for a single model input.
+
+    Transcripts without punctuation would otherwise form a single sentence which exceeds the model's input length.
+
+    Args:
+        text (str): The text to split.
+        max_words (int): Maximum number of words per sentence. Defaults to 150.
+
+    Returns:
+        list of str: The sentences in their original order.
+    """
+    sentences = []
+    for sentence in re.split(r'(?<=[.!?])\s+', text.strip()):
+        words = sentence.split()
+        for start in range(0, len(words), max_words):
+            sentences.append(' '.join(words[start:start + max_words]))
+    return sentences
+
+def get_length_bounds(token_count):
+    """
+    Returns the minimum and maximum output length of a sentence with a number of input tokens: the bounds of its
+    length bucket of `IMPROVE_LENGTH_BUCKET` tokens, so the output length stays close to the input length.
+
+    Args:
+        token_count (int): The number of tokens of the sentence, including the special tokens.
 
-    return summary.strip()
+    Returns:
+        tuple: The minimum and maximum length in tokens.
+    """
+    bucket = max(token_count - 1, 0) // IMPROVE_LENGTH_BUCKET
+    shortest, longest = bucket * IMPROVE_LENGTH_BUCKET + 1, (bucket + 1) * IMPROVE_LENGTH_BUCKET
+    # Allow the output to grow longer to capture rewritten improvements
+    return max(int(shortest * 0.8), 1), longest + 20
+
+def improve_sentences(sentences, num_beams=4, length_bounds=None):
+    """
+    Improves a batch of sentences in a single padded pass through the selected model.
 
-def improve_text(filepath: str) -> str:
+    Args:
+        sentences (list of str): The sentences to improve, ideally of similar length to limit the padding.
+        num_beams (int): Number of beams of the beam search. 1 decodes greedily. Defaults to 4.
+        length_bounds (tuple): The minimum and maximum output length, see `get_length_bounds`. Defaults to None,
+                               the bounds of the shortest and the longest sentence of the batch.
+
+    Returns:
+        list of str: The improved sentences in the same order.
+    """
+    model, tokenizer = load_model_and_tokenizer()
+
+    # Tokenize the batch, padding all sentences to the longest one
+    inputs = tokenizer(sentences, return_tensors="pt", padding=True, max_length=1024, truncation=True)
+    if length_bounds is None:
+        input_lengths = inputs["attention_mask"].sum(dim=1)
+        length_bounds = (get_length_bounds(int(input_lengths.min()))[0],
+                         get_length_bounds(int(input_lengths.max()))[1])
+    min_length, max_length = length_bounds
+
+    # Generate improved sentences whose length stays close to the input length
+    improved_ids = model.generate(
+        inputs["input_ids"],
+        attention_mask=inputs["attention_mask"],
+        max_length=max_length,
+        min_length=min_length,
+        num_beams=num_beams,
+        early_stopping=num_beams > 1
+    )
+
+    return [improved.strip() for improved in tokenizer.batch_decode(improved_ids, skip_special_tokens=True)]
+
+def improve_text(filepath: str, num_beams: int = 4) -> str:
     """
     Improves grammar, clarity, and coherence of the entire file text using the selected model.
 
+    The text is improved sentence by sentence, so long texts are processed completely instead of being truncated
+    to the model's input length, and each generation stays short. Sentences of the same length bucket are batched
+    with padding. The batches run one after another, as each of them already uses all torch threads of the
+    pipeline, see `cpu_scheduler`. Improved sentences are cached by their hash, so recurring sentences
+    (e.g. greetings or boilerplate) are only generated once.
+
     Args:
         filepath (str): Path to the file to process and improve.
+        num_beams (int): Number of beams of the beam search. 1 decodes greedily. Defaults to 4.
 
     Returns:
         str: Improved full text as a single string.
     """
-    # Load the model and tokenizer
-    model, tokenizer = load_model_and_tokenizer()
-
     # Load text from the file
     with open(filepath, 'r') as file:
         text = file.read()
 
-    # Tokenize the input text
-    inputs = tokenizer(text, return_tensors="pt", max_length=1024, truncation=True)
+    sentences = split_sentences(text)
+    if not sentences:
+        return ""
 
-    # Generate improved text
-    improved_ids = model.generate(
-        inputs["input_ids"],
-        max_length=len(text.split()) + 50,  # Allow the output to grow longer to capture rewritten improvements
-        min_length=len(text.split()) - 50,
-        num_beams=4,
-        early_stopping=True
-    )
+    def get_cache_key(sentence):
+        return hashlib.sha256(f"{models[model_name]}|{num_beams}|{sentence}".encode("utf-8")).hexdigest()
+
+    # Collect the distinct sentences which were not improved before
+    use_cache = not _cache_bypasses
+    improved = {}
+    pending = []
+    for sentence in sentences:
+        key = get_cache_key(sentence)
+        if key in improved:
+            continue
+        with _sentence_cache_lock:
+            if use_cache and key in _sentence_cache:
+                _sentence_cache.move_to_end(key)
+                improved[key] = _sentence_cache[key]
+                continue
+        improved[key] = None
+        pending.append(sentence)
+
+    # Group the sentences of a length bucket into batches, which limits the padding and makes the output length
+    # of a sentence independent of the other sentences of its batch, as the improved sentences are cached
+    buckets = {}
+    if pending:
+        _, tokenizer = load_model_and_tokenizer()
+        token_counts = [len(ids) for ids in tokenizer(pending, max_length=1024, truncation=True)["input_ids"]]
+        for sentence, token_count in sorted(zip(pending, token_counts), key=lambda item: item[1]):
+            buckets.setdefault(get_length_bounds(token_count), []).append(sentence)
+    batches = [(bucket[start:start + IMPROVE_BATCH_SIZE], length_bounds) for length_bounds, bucket in buckets.items()
+               for start in range(0, len(bucket), IMPROVE_BATCH_SIZE)]
 
-    # Decode the improved text
-    improved_text = tokenizer.decode(improved_ids[0], skip_special_tokens=True)
+    # Improve the batches one after another, parallel batches would oversubscribe the thread budget of the pipeline
+    for batch, length_bounds in batches:
+        cancellation.check()
+        for sentence, improved_sentence in zip(batch, improve_sentences(batch, num_beams, length_bounds)):
+            key = get_cache_key(sentence)
+            improved[key] = improved_sentence
+            if not use_cache:
+                continue
+            with _sentence_cache_lock:
+                _sentence_cache[key] = improved_sentence
+                if len(_sentence_cache) > SENTENCE_CACHE_SIZE:
+                    _sentence_cache.popitem(last=False)  # Evict the least recently used sentence
 
-    return improved_text.strip()
+    return ' '.join(improved[get_cache_key(sentence)] for sentence in sentences).strip()
@@ -0,0 +1,194 @@
+import os
+import struct
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Format tags of the fmt chunk. Extensible files store the actual format in the first two bytes of their sub-format.
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Sample types which can be memory-mapped, by format and bytes per sample. 24-bit PCM has no NumPy equivalent.
+SAMPLE_DTYPES = {
+    (WAVE_FORMAT_PCM, 1): np.dtype('u1'),
+    (WAVE_FORMAT_PCM, 2): np.dtype('<i2'),
+    (WAVE_FORMAT_PCM, 4): np.dtype('<i4'),
+    (WAVE_FORMAT_IEEE_FLOAT, 4): np.dtype('<f4'),
+    (WAVE_FORMAT_IEEE_FLOAT, 8): np.dtype('<f8'),
+}
+
+# Number of parsed WAV files kept open. A file is reparsed if it was modified since it was opened.
+WAV_CACHE_SIZE = 32
+
+_wav_cache = OrderedDict()
+_wav_cache_lock = threading.Lock()
+
+class WavFile:
+    """
+    Read-only access to the PCM payload of a WAV file.
+
+    The header is parsed once when the file is opened, and the samples are memory-mapped, so duration lookups
+    do not touch the file and reading a part of the recording only loads the accessed pages. The pages are
+    shared through the page cache by all processes reading the same file.
+    """
+
+    def __init__(self, filepath):
+        """
+        Parses the RIFF header of a WAV file.
+
+        Args:
+            filepath (str): The path of the WAV file.
+
+        Raises:
+            ValueError: If the file is not a WAV file or has no fmt or data chunk.
+        """
+        self.filepath = filepath
+        self.format_tag = None
+        self.data_offset = None
+        self.data_size = None
+        self._samples = None
+
+        file_size = os.path.getsize(filepath)
+        with open(filepath, 'rb') as file:
+            riff, _, wave = struct.unpack('<4sI4s', file.read(12))
+            if riff != b'RIFF' or wave != b'WAVE':
+                raise ValueError(f"{filepath} is not a WAV file.")
+
+            # Walk the chunks until the data chunk, the fmt chunk precedes it
+            while self.data_offset is None:
+                header = file.read(8)
+                if len(header) < 8:
+                    break
+                chunk_id, chunk_size = struct.unpack('<4sI', header)
+                chunk_start = file.tell()
+
+                if chunk_id == b'fmt ':
+                    fmt = file.read(chunk_size)
+                    (self.format_tag, self.channels, self.sample_rate, _,
+                     self.block_align, self.bits_per_sample) = struct.unpack('<HHIIHH', fmt[:16])
+                    if self.format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                        self.format_tag = struct.unpack('<H', fmt[24:26])[0]
+                elif chunk_id == b'data':
+                    self.data_offset = chunk_start
+                    # Recorders which were interrupted leave a size of zero or larger than the file
+                    self.data_size = min(chunk_size, file_size - chunk_start) if chunk_size else file_size - chunk_start
+
+                # Chunks are padded to an even number of bytes
+                file.seek(chunk_start + chunk_size + (chunk_size & 1))
+
+        if self.format_tag is None or self.data_offset is None:
+            raise ValueError(f"{filepath} has no fmt or data chunk.")
+
+        self.frame_count = self.data_size // self.block_align
+        self.duration = self.frame_count / float(self.sample_rate)
+
+    @property
+    def sample_width(self):
+        """
+        Returns the number of bytes per sample of one channel.
+        """
+        return self.block_align // self.channels
+
+    @property
+    def supports_memory_map(self):
+        """
+        Returns whether the sample format can be memory-mapped.
+        """
+        return (self.format_tag, self.sample_width) in SAMPLE_DTYPES and self.frame_count > 0
+
+    @property
+    def samples(self):
+        """
+        Returns the samples as a read-only memory-mapped array of shape (frames, channels).
+
+        Raises:
+            ValueError: If the sample format cannot be memory-mapped.
+        """
+        if self._samples is None:
+            if not self.supports_memory_map:
+                raise ValueError(f"Cannot memory-map {self.bits_per_sample}-bit samples with format tag "
+                                 f"{self.format_tag} of {self.filepath}.")
+            dtype = SAMPLE_DTYPES[(self.format_tag, self.sample_width)]
+            self._samples = np.memmap(self.filepath, dtype=dtype, mode='r', offset=self.data_offset,
+                                      shape=(self.frame_count, self.channels))
+        return self._samples
+
+    def get_frame(self, time):
+        """
+        Returns the index of the frame at a time, clipped to the recording.
+
+        Args:
+            time (float): The time in seconds.
+        """
+        return min(max(int(round(time * self.sample_rate)), 0), self.frame_count)
+
+    def slice(self, start=0.0, end=None):
+        """
+        Returns the samples of a time range without copying them.
+
+        Args:
+            start (float): The start of the range in seconds. Defaults to the start of the recording.
+            end (float): The end of the range in seconds. Defaults to the end of the recording.
+
+        Returns:
+            np.memmap: The samples of the range with shape (frames, channels).
+        """
+        end_frame = self.frame_count if end is None else self.get_frame(end)
+        return self.samples[self.get_frame(start):end_frame]
+
+    def read_mono(self, start_frame=0, end_frame=None):
+        """
+        Reads a range of frames as mono float32 samples between -1 and 1, like librosa does.
+
+        Only the requested range is copied and converted, so long recordings can be read in blocks.
+
+        Args:
+            start_frame (int): The first frame. Defaults to 0.
+            end_frame (int): The frame after the last one. Defaults to the end of the recording.
+
+        Returns:
+            np.ndarray: The averaged samples of all channels.
+        """
+        block = self.samples[start_frame:end_frame]
+        dtype = block.dtype
+
+        if dtype.kind == 'f':
+            block = block.astype(np.float32)
+        elif dtype.kind == 'u':
+            # 8-bit PCM is unsigned with its zero line at 128
+            block = (block.astype(np.float32) - 128) / 128
+        else:
+            block = block.astype(np.float32) / float(2 ** (8 * dtype.itemsize - 1))
+
+        return block.mean(axis=1) if self.channels > 1 else block[:, 0]
+
+def open_wav(filepath):
+    """
+    Returns the parsed WAV file of a path, reusing it as long as the file is unchanged.
+
+    Args:
+        filepath (str): The path of the WAV file.
+
+    Returns:
+        WavFile: The parsed file.
+
+    Raises:
+        ValueError: If the file is not a valid WAV file.
+    """
+    stat = os.stat(filepath)
+    key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+
+    with _wav_cache_lock:
+        if key in _wav_cache:
+            _wav_cache.move_to_end(key)
+            return _wav_cache[key]
+
+    wav_file = WavFile(filepath)
+
+    with _wav_cache_lock:
+        _wav_cache[key] = wav_file
+        while len(_wav_cache) > WAV_CACHE_SIZE:
+            _wav_cache.popitem(last=False)
+
+    return wav_file
@@ -17,3 +17,84 @@ class Config:
     # Setting this to False reduces overhead but disables certain advanced features.
     # Recommended to keep it False unless absolutely necessary.
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Determines when the expensive analytics (pitch, energy, improved text and summary) are generated.
+    # "eager" generates them during the upload, "lazy" stores only the transcription and cheap metadata and
+    # generates the remaining analytics on first access of the recording through /get-analytics.
+    ANALYTICS_MODE = os.getenv("ANALYTICS_MODE", "eager")
+
+    # Maximum number of short clips (up to 30 seconds) which Whisper encodes and decodes together in a batch upload.
+    TRANSCRIPTION_BATCH_SIZE = int(os.getenv("TRANSCRIPTION_BATCH_SIZE", "8"))
+
+    # Default quality profile of the analysis pipeline ("fast", "balanced" or "best"), see `profiles.QUALITY_PROFILES`.
+    # A request can select another profile with the 'profile' form field.
+    QUALITY_PROFILE = os.getenv("QUALITY_PROFILE", "balanced")
+
+    # Output format ("png", "webp" or "svg") and resolution of the analysis graphics.
+    # WebP and SVG are considerably smaller than PNG. Changing them marks the stored graphics as stale.
+    CHART_FORMAT = os.getenv("CHART_FORMAT", "png")
+    CHART_DPI = int(os.getenv("CHART_DPI", "150"))
+
+    # Codec in which uploaded recordings are stored ("wav", "flac" or "opus"), see `audio_loader.AUDIO_CODECS`.
+    # FLAC is lossless, Opus is lossy but much smaller than WAV.
+    # Existing recordings are converted with `flask audio migrate-codec`.
+    AUDIO_STORAGE_CODEC = os.getenv("AUDIO_STORAGE_CODEC", "wav")
+
+    # Seconds for which browsers may reuse a downloaded recording before revalidating it with its ETag.
+    AUDIO_CACHE_MAX_AGE = int(os.getenv("AUDIO_CACHE_MAX_AGE", "3600"))
+
+    # Minimum duration in seconds of recordings for which /audio serves compressed previews, and their bitrate.
+    # Shorter recordings are always served as stored.
+    AUDIO_PREVIEW_MIN_DURATION = float(os.getenv("AUDIO_PREVIEW_MIN_DURATION", "600"))
+    AUDIO_PREVIEW_BITRATE = os.getenv("AUDIO_PREVIEW_BITRATE", "24k")
+
+    # How uploads through /store_and_analyze are processed. "inline" transcribes and analyzes them within the
+    # request, "queue" stores them and queues a job for the workers started with `flask jobs work`, which may run
+    # on other machines sharing the database.
+    PROCESSING_MODE = os.getenv("PROCESSING_MODE", "inline")
+
+    # Seconds a worker holds the lease of a job without renewing it, and attempts per job before it fails.
+    # Jobs of crashed workers are taken over by other workers once their lease expired.
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+    # Seconds of waiting which make up for one second of estimated processing in the claim order of the jobs. Short
+    # jobs overtake longer jobs queued up to their weighted cost earlier, and jobs of users with many pending jobs
+    # are pushed back by their weighted backlog. 0 claims the jobs in the order they were queued.
+    JOB_COST_WEIGHT = float(os.getenv("JOB_COST_WEIGHT", "1.0"))
+
+    # Admission control of /store_and_analyze per server process: the maximum number of pipelines running at the
+    # same time, the number of uploads waiting for a free pipeline and the seconds they wait before they are
+    # rejected with 429 Too Many Requests.
+    MAX_CONCURRENT_PIPELINES = int(os.getenv("MAX_CONCURRENT_PIPELINES", "2"))
+    MAX_QUEUED_PIPELINES = int(os.getenv("MAX_QUEUED_PIPELINES", "8"))
+    ADMISSION_TIMEOUT = float(os.getenv("ADMISSION_TIMEOUT", "300"))
+
+    # Seconds of audio each user may upload per day. 0 disables the quota.
+    USER_DAILY_AUDIO_SECONDS = float(os.getenv("USER_DAILY_AUDIO_SECONDS", "0"))
+
+    # Number of server processes sharing the machine, e.g. the gunicorn workers (which gunicorn also reads from
+    # WEB_CONCURRENCY). The cores are partitioned among them and their concurrent pipelines, see `cpu_scheduler`.
+    # TORCH_THREADS overrides the torch threads per pipeline of a server process, 0 derives them from the cores.
+    SERVER_WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+    TORCH_THREADS = int(os.getenv("TORCH_THREADS", "0"))
+
+    # Whether the worker processes of a bulk import are pinned to their share of the cores (Linux only).
+    CPU_AFFINITY = os.getenv("CPU_AFFINITY", "false").lower() == "true"
+
+    # Whether the models load the graphs compiled with `flask models compile` from COMPILED_MODELS_DIR where they
+    # exist. Artifacts compiled with other versions of torch, whisper or transformers are ignored.
+    USE_COMPILED_MODELS = os.getenv("USE_COMPILED_MODELS", "false").lower() == "true"
+    COMPILED_MODELS_DIR = os.getenv("COMPILED_MODELS_DIR", "compiled_models")
+
+    # SQLite file caching the generated titles and summaries across restarts and processes, and its maximum size in
+    # bytes. An empty path only caches them in the memory of each process.
+    SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "summary_cache.sqlite3")
+    SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(64 * 2**20)))
+
+    # Profiling of the analysis pipeline, see `profiling`. Uploads are profiled if they carry PROFILING_ADMIN_TOKEN
+    # in the X-Profile-Token header, which also grants access to /admin/profiles, or with the probability
+    # PROFILING_SAMPLE_RATE. An empty token disables the header and the admin endpoints.
+    PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+    PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+    PROFILES_DIR = os.getenv("PROFILES_DIR", "profiles")
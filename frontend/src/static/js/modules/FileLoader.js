@@ -56,10 +56,10 @@ export async function loadFileList() {
             deleteButton.textContent = '🗑️';
             deleteButton.onclick = () => showDeleteConfirmationModal(audioPath);
 
-            // Create the audio file link
+            // Create the audio file link, served by the range-capable audio endpoint so players can seek
             const audioLink = document.createElement('a');
             audioLink.className = 'audio-link';
-            audioLink.href = `${audioPath.replace('src/', '')}`;
+            audioLink.href = `/audio?recording=${encodeURIComponent(audioPath)}`;
             audioLink.textContent = audioPath.split('/').pop();
             audioLink.target = '_blank';
 
@@ -70,12 +70,16 @@ export async function loadFileList() {
             transcriptionLink.textContent = transcriptionPath.split('/').pop();
             transcriptionLink.target = '_blank';
 
-            // Create the improved text file link
+            // Create the improved text file link (not yet generated for lazily analyzed recordings)
             const improvedTextLink = document.createElement('a');
             improvedTextLink.className = 'improved-text-link';
-            improvedTextLink.href = `${improvedTextPath.replace('src/', '')}`;
-            improvedTextLink.textContent = improvedTextPath.split('/').pop();
-            improvedTextLink.target = '_blank';
+            if (improvedTextPath) {
+                improvedTextLink.href = `${improvedTextPath.replace('src/', '')}`;
+                improvedTextLink.textContent = improvedTextPath.split('/').pop();
+                improvedTextLink.target = '_blank';
+            } else {
+                improvedTextLink.textContent = '-';
+            }
 
             // Create a span element for date/time
             const dateTimeElement = document.createElement('span');
@@ -89,12 +89,29 @@ export function setupAudioRecording(startButton, pauseButton, stopButton, audioF
             // Send audio Blob to the backend
             const formData = new FormData();
             formData.append('audio', audioBlob, filename); // Send original format
+            // Identify the upload, so its analysis can be cancelled when the page is closed
+            pendingUpload = { uploadId: createUploadId(), filePath: null };
+            formData.append('upload_id', pendingUpload.uploadId);
 
             fetch('/store_and_analyze', {
                 method: 'POST',
                 body: formData,
             })
-                .then(response => {
+                .then(async response => {
+                    if (response.status === 202) {
+                        // Recording was queued, wait until a worker transcribed and analyzed it
+                        const data = await response.json();
+                        pendingUpload.filePath = data.dropdown_value;
+                        if (!await waitForJob(data.status_url)) {
+                            pendingUpload = null;
+                            hideLoadingOverlay();
+                            alert('The analysis of the audio recording failed.');
+                            return;
+                        }
+                        response = { ok: true, json: async () => data };
+                    }
+
+                    pendingUpload = null;
                     hideLoadingOverlay(); // Hide overlay after response
 
                     if (response.ok) {
@@ -108,6 +125,11 @@ export function setupAudioRecording(startButton, pauseButton, stopButton, audioF
                             await setAnalytics();
 
                         });
+                    } else if (response.status === 429) {
+                        // Rejected by the admission control, the server is busy or the daily quota is used up
+                        const data = await response.json();
+                        const retryMinutes = Math.ceil((data.retry_after || 60) / 60);
+                        alert(`${data.error} Please try again in about ${retryMinutes} minute(s).`);
                     } else if (response.status === 422) {
                         alert('Audio recording failed. Is your microphone on and working? ' +
                             'If the error persists, please contact the developer of this website.');
@@ -117,6 +139,7 @@ export function setupAudioRecording(startButton, pauseButton, stopButton, audioF
                     }
                 })
                 .catch(error => {
+                    pendingUpload = null;
                     hideLoadingOverlay(); // Hide overlay on error
                     console.error('Error uploading audio file:', error);
                     alert('An error occurred while uploading the audio file.');
@@ -127,14 +150,80 @@ export function setupAudioRecording(startButton, pauseButton, stopButton, audioF
         }
     }
 
+    // Polls the status of a queued job until it is done (true) or failed or cancelled (false)
+    async function waitForJob(statusUrl, intervalMs = 2000) {
+        while (true) {
+            const response = await fetch(statusUrl);
+            if (!response.ok) {
+                return false;
+            }
+            const { data } = await response.json();
+            if (data.status === 'done' || data.status === 'failed' || data.status === 'cancelled') {
+                return data.status === 'done';
+            }
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+        }
+    }
+
+    // The upload whose analysis is in progress, cancelled when the page is closed
+    let pendingUpload = null;
+
+    function createUploadId() {
+        return window.crypto && crypto.randomUUID
+            ? crypto.randomUUID()
+            : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    }
+
+    // Cancel the analysis of a pending upload when the page is closed, freeing the server for other uploads.
+    // sendBeacon delivers the request even though the page is being unloaded.
+    window.addEventListener('pagehide', () => {
+        if (!pendingUpload) {
+            return;
+        }
+        const cancelData = new FormData();
+        cancelData.append('upload_id', pendingUpload.uploadId);
+        if (pendingUpload.filePath) {
+            cancelData.append('filePath', pendingUpload.filePath);
+        }
+        navigator.sendBeacon('/cancel-upload', cancelData);
+    });
+
+    let admissionPoller = null;
+
+    // Shows the position of the recording in the wait queue of the analysis while the overlay is visible
+    async function updateQueuePosition(message, defaultText) {
+        try {
+            const response = await fetch('/admission');
+            if (!response.ok) {
+                return;
+            }
+            const { data } = await response.json();
+            message.textContent = data.positions.length
+                ? `Waiting for a free slot (position ${data.positions[0]} of ${data.queued}, ` +
+                  `about ${Math.ceil(data.estimated_wait_seconds / 60)} minute(s))...`
+                : defaultText;
+        } catch (error) {
+            console.error('Error fetching the queue position:', error);
+        }
+    }
+
     function showLoadingOverlay() {
         const overlay = document.getElementById('loadingOverlay');
         overlay.style.display = 'flex'; // Show overlay
+
+        const message = overlay.querySelector('p');
+        const defaultText = message.dataset.defaultText || message.textContent;
+        message.dataset.defaultText = defaultText;
+        admissionPoller = setInterval(() => updateQueuePosition(message, defaultText), 3000);
     }
 
     function hideLoadingOverlay() {
         const overlay = document.getElementById('loadingOverlay');
         overlay.style.display = 'none'; // Hide overlay
+
+        clearInterval(admissionPoller);
+        const message = overlay.querySelector('p');
+        message.textContent = message.dataset.defaultText || message.textContent;
     }
 
     // Attach event listeners to buttons
@@ -1,6 +1,18 @@
 import os
+import glob
 from datetime import datetime
 
+# File name templates of the output files generated for an audio recording, stored in a directory per file type
+OUTPUT_FILETYPES = {
+    "raw_audio": "{filename}.wav",
+    "transcription": "transcription_of_{filename}.txt",
+    "speed_graphics": "speed_graphics_of_{filename}.png",
+    "pitch_graphics": "pitch_graphics_of_{filename}.png",
+    "energy_graphics": "energy_graphics_of_{filename}.png",
+    "improved_text": "improved_text_of_{filename}.txt",
+    "segments": "segments_of_{filename}.npz",
+}
+
 def generate_output_directory(directory_path):
     """
     Generates output directory for given directory path.
@@ -8,7 +20,7 @@ def generate_output_directory(directory_path):
 
     os.makedirs(directory_path, exist_ok=True)
 
-def generate_file_path(dir_name, filename=None):
+def generate_file_path(dir_name, filename=None, extension=None):
     """
     Returns a relative path and name under which a file shall be stored including the time stamp.
 
@@ -17,6 +29,7 @@ def generate_file_path(dir_name, filename=None):
         filename (str): Name which shall be used to generate new filename.
                         For 'transcription' and 'speed_graphics' this is only part of the name
                         to relate these files to the underlying audio recording.
+        extension (str): Extension replacing the default extension of the file type, e.g. "svg" for graphics.
 
     Returns:
         str: A relative storage path depending on the type of file ("src/static/output/...").
@@ -24,17 +37,15 @@ def generate_file_path(dir_name, filename=None):
 
     timestamp = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
     valid_filetypes = {
-        "raw_audio": f"{filename}.wav",
-        "transcription": f"transcription_of_{filename}.txt",
-        "speed_graphics": f"speed_graphics_of_{filename}.png",
-        "pitch_graphics": f"pitch_graphics_of_{filename}.png",
-        "energy_graphics": f"energy_graphics_of_{filename}.png",
-        "improved_text": f"improved_text_of_{filename}.txt",
+        file_type: template.format(filename=filename) for file_type, template in OUTPUT_FILETYPES.items()
     }
 
     filename = valid_filetypes.get(dir_name, f"corrupted_{timestamp}.txt")
     directory_path = f"src/static/output/{dir_name if dir_name in valid_filetypes else 'corrupted'}"
 
+    if extension and dir_name in valid_filetypes:
+        filename = f"{os.path.splitext(filename)[0]}.{extension}"
+
     generate_output_directory(directory_path)
 
     if dir_name not in valid_filetypes:
@@ -51,4 +62,34 @@ def get_default_audio_filename():
     """
 
     timestamp = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
-    return f"audio_recording_{timestamp}"
\ No newline at end of file
+    return f"audio_recording_{timestamp}"
+
+def get_audio_filename(audio_filepath):
+    """
+    Returns the name of an audio recording without directory and extension, as used in `generate_file_path`.
+
+    Args:
+        audio_filepath (str): The path of the stored audio file, e.g. "src/static/output/raw_audio/talk.flac".
+
+    Returns:
+        str: The name of the recording, e.g. "talk".
+    """
+
+    return os.path.splitext(os.path.basename(audio_filepath))[0]
+
+def remove_output_files(filename):
+    """
+    Removes all output files generated for an audio recording, including the audio file itself.
+
+    Files are matched regardless of their extension, as e.g. graphics may be stored in different formats.
+
+    Args:
+        filename (str): Name of the audio recording without directory and extension, as used in `generate_file_path`.
+    """
+
+    for dir_name, template in OUTPUT_FILETYPES.items():
+        base_name = os.path.splitext(template.format(filename=filename))[0]
+        for file_path in glob.glob(os.path.join(f"src/static/output/{dir_name}", glob.escape(base_name) + ".*")):
+            # Only remove files with a single extension, "talk.*" also matches the files of a recording "talk.mp3"
+            if get_audio_filename(file_path) == base_name:
+                os.remove(file_path)